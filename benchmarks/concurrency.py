@@ -0,0 +1,146 @@
+"""并发写入的压力测试
+
+N 个进程同时对不同的模块执行 moman add, 同时有线程不加锁地反复读取 modular 文件,
+最后检查每一次添加都保存在 modular.json, modular.yaml 以及对应的 module.yaml 中, 结果以 JSON 输出
+
+python benchmarks/concurrency.py --writers 16 --rounds 5
+python benchmarks/concurrency.py --src /path/to/other/checkout/src
+"""
+
+from typing import Any, Dict, List
+from pathlib import Path
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate import MomanBenchProject, generate_project, implement_name  # noqa: E402
+
+
+def package_name(writer: int, round_index: int) -> str:
+    return "stress-w%d-r%d" % (writer, round_index)
+
+
+def run_writer(path: Path, env: Dict[str, str], implement: str, writer: int, rounds: int) -> List[int]:
+    """依次执行 rounds 次 moman add, 返回每次的退出码"""
+    codes: List[int] = []
+    for round_index in range(rounds):
+        result = subprocess.run(
+            [sys.executable, "-m", "moman_bin.main", "add", "-n", implement, "-p", package_name(writer, round_index)],
+            cwd=path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        codes.append(result.returncode)
+    return codes
+
+
+def read_loop(path: Path, stopped: threading.Event, stats: Dict[str, int]):
+    """不加锁地读取 modular 文件, 统计读到不完整内容的次数"""
+    json_file = path.joinpath(".moman", "modular.json")
+    yaml_file = path.joinpath(".moman", "modular.yaml")
+    while not stopped.is_set():
+        for file, load in ((json_file, json.loads), (yaml_file, yaml.safe_load)):
+            stats["reads"] += 1
+            try:
+                data = load(file.read_text())
+                if not isinstance(data, dict):
+                    stats["torn_reads"] += 1
+            except (ValueError, yaml.YAMLError, FileNotFoundError):
+                stats["torn_reads"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run concurrent moman writers and check no update is lost")
+    parser.add_argument("--writers", type=int, default=16, help="number of concurrent writer processes")
+    parser.add_argument("--rounds", type=int, default=5, help="moman add commands run by each writer")
+    parser.add_argument("--interfaces", type=int, default=10)
+    parser.add_argument("--implements", type=int, default=4)
+    parser.add_argument("--src", help="the src folder of the moman to test, this checkout by default")
+    parser.add_argument("--path", help="where to generate the project, a temporary folder by default")
+    args = parser.parse_args()
+
+    src = Path(args.src) if args.src is not None else Path(__file__).resolve().parent.parent.joinpath("src")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(src.resolve()), env.get("PYTHONPATH", "")]))
+    # 每条命令都在独立的进程中执行
+    env["MOMAN_NO_DAEMON"] = "1"
+
+    project = MomanBenchProject(args.interfaces, args.implements, 2, 3, 0.2, 0)
+
+    with tempfile.TemporaryDirectory(prefix="moman-stress-") as temp_folder:
+        path = Path(args.path if args.path is not None else temp_folder).absolute()
+        generate_project(path, project)
+        subprocess.run([sys.executable, "-m", "moman_bin.main", "modular"], cwd=path, env=env,
+                       stdout=subprocess.DEVNULL, check=True)
+
+        # 每个 writer 修改不同的模块, 模块数量不足时多个 writer 修改同一个模块
+        implements = [
+            implement_name(index % args.interfaces, (index // args.interfaces) % args.implements)
+            for index in range(args.writers)
+        ]
+
+        stats = {"reads": 0, "torn_reads": 0}
+        stopped = threading.Event()
+        reader = threading.Thread(target=read_loop, args=(path, stopped, stats))
+        reader.start()
+
+        codes: Dict[int, List[int]] = {}
+        threads = [
+            threading.Thread(target=lambda w=writer: codes.__setitem__(
+                w, run_writer(path, env, implements[w], w, args.rounds)
+            ))
+            for writer in range(args.writers)
+        ]
+        begin = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - begin
+        stopped.set()
+        reader.join()
+
+        modular = json.loads(path.joinpath(".moman", "modular.json").read_text())["modular"]["modules"]
+        exported = yaml.safe_load(path.joinpath(".moman", "modular.yaml").read_text())["modules"]
+
+        missing: Dict[str, List[str]] = {"modular.json": [], "modular.yaml": [], "module.yaml": []}
+        for writer in range(args.writers):
+            implement = implements[writer]
+            module_file = Path(modular[implement]["path"]).joinpath("module.yaml")
+            module_packages = yaml.safe_load(module_file.read_text()).get("python-packages", None) or []
+            for round_index in range(args.rounds):
+                package = package_name(writer, round_index)
+                if package not in modular[implement]["python-packages"]:
+                    missing["modular.json"].append(package)
+                if package not in exported[implement]["python-packages"]:
+                    missing["modular.yaml"].append(package)
+                if package not in module_packages:
+                    missing["module.yaml"].append(package)
+
+    failed_commands = sum(1 for writer_codes in codes.values() for code in writer_codes if code != 0)
+    lost = sum(len(packages) for packages in missing.values())
+    result: Dict[str, Any] = {
+        "writers": args.writers,
+        "rounds": args.rounds,
+        "updates": args.writers * args.rounds,
+        "elapsed_s": elapsed,
+        "failed_commands": failed_commands,
+        "lost_updates": {file: len(packages) for file, packages in missing.items()},
+        "reads": stats["reads"],
+        "torn_reads": stats["torn_reads"],
+    }
+    print(json.dumps(result, indent=2, sort_keys=True))
+
+    if lost > 0 or failed_commands > 0 or stats["torn_reads"] > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
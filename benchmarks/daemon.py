@@ -0,0 +1,95 @@
+"""比较 CLI 命令在有无 daemon 时的端到端延迟
+
+每条命令都启动新的 python 进程执行, 与在终端中执行 moman 的开销一致, 结果以 JSON 输出
+
+python benchmarks/daemon.py --repeat 20
+"""
+
+from typing import Any, Dict, List
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_FOLDER = Path(__file__).resolve().parent.parent.joinpath("src")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate import MomanBenchProject, generate_project, implement_name  # noqa: E402
+
+
+def run_moman(path: Path, argv: List[str], env: Dict[str, str]) -> float:
+    begin = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "moman_bin.main", *argv],
+        cwd=path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+    )
+    return time.perf_counter() - begin
+
+
+def measure(path: Path, argv: List[str], env: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    # 第一次执行会写入缓存, 不计入结果
+    run_moman(path, argv, env)
+    samples = sorted(run_moman(path, argv, env) for _ in range(repeat))
+    return {
+        "p50_ms": statistics.median(samples) * 1e3,
+        "p90_ms": samples[int(len(samples) * 0.9) - 1] * 1e3,
+        "min_ms": samples[0] * 1e3,
+        "runs": repeat,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare the cli latency with and without the daemon")
+    parser.add_argument("--interfaces", type=int, default=50)
+    parser.add_argument("--implements", type=int, default=4)
+    parser.add_argument("--fan-out", type=int, default=2)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20, help="runs of each command")
+    parser.add_argument("--path", help="where to generate the project, a temporary folder by default")
+    args = parser.parse_args()
+
+    project = MomanBenchProject(args.interfaces, args.implements, args.fan_out, args.depth, 0.2, args.seed)
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_FOLDER), env.get("PYTHONPATH", "")]))
+    local_env = {**env, "MOMAN_NO_DAEMON": "1"}
+
+    with tempfile.TemporaryDirectory(prefix="moman-bench-") as temp_folder:
+        path = Path(args.path if args.path is not None else temp_folder).absolute()
+        generate_project(path, project)
+        run_moman(path, ["modular"], local_env)
+
+        # 重复执行时依赖已经存在, 只测试读取和校验项目模型的开销
+        commands = {
+            "modular": ["modular"],
+            "add": ["add", "-n", implement_name(0, 0), "-p", "bench-package"],
+        }
+
+        results: Dict[str, Any] = {}
+        for name, argv in commands.items():
+            results["%s_local" % name] = measure(path, argv, local_env, args.repeat)
+
+        run_moman(path, ["daemon", "start"], env)
+        try:
+            for name, argv in commands.items():
+                results["%s_daemon" % name] = measure(path, argv, env, args.repeat)
+        finally:
+            run_moman(path, ["daemon", "stop"], env)
+
+    print(json.dumps({
+        "python": platform.python_version(),
+        "project": {**project.to_dict(), "modules": project.module_count},
+        "results": results,
+    }, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""生成用于性能测试的 moman 项目
+
+python benchmarks/generate.py /tmp/moman-bench --interfaces 50 --implements 4 --fan-out 2 --depth 5
+"""
+
+from typing import Any, Dict, List
+from pathlib import Path
+import argparse
+import random
+import shutil
+
+MOMAN_BENCH_ENTRY_NAME = "entry"
+
+INTERFACE_TEMPLATE = """\
+from abc import abstractmethod
+from moman.interface import MomanModuleInterface
+
+{upper_name}_INTERFACE_NAME = "{name}"
+
+
+class {class_name}Interface(MomanModuleInterface):
+    def __init__(self, implement_name: str):
+        super().__init__({upper_name}_INTERFACE_NAME, implement_name)
+
+    @staticmethod
+    def get_interface_name() -> str:
+        return {upper_name}_INTERFACE_NAME
+
+    @abstractmethod
+    def handle(self, value: int) -> int:
+        pass
+"""
+
+IMPLEMENT_TEMPLATE = """\
+from typing import override
+from modules.{interface_name}.interface import {interface_class_name}Interface
+
+
+class {class_name}Implement({interface_class_name}Interface):
+    def __init__(self):
+        super().__init__("{name}")
+
+    @override
+    def on_start(self):
+        pass
+
+    @override
+    def on_stop(self):
+        pass
+
+    @override
+    def handle(self, value: int) -> int:
+        return value + 1
+"""
+
+ENTRY_TEMPLATE = """\
+from typing import override
+from moman.interface import MomanModuleInterface
+
+
+class EntryImplement(MomanModuleInterface):
+    def __init__(self):
+        super().__init__("entry", "entry")
+
+    @override
+    def on_start(self):
+        pass
+
+    @override
+    def on_stop(self):
+        pass
+"""
+
+
+class MomanBenchProject:
+    """生成项目的参数
+
+    Args:
+        interfaces (int): 接口数量
+        implements (int): 每个接口的实现数量
+        fan_out (int): 每个模块依赖的模块数量
+        depth (int): 依赖层级数量, 接口按照顺序平均分配到每一层, 模块只依赖下一层的模块
+        diamond (float): 依赖指向下一层共享模块的比例, 用于构造菱形依赖
+        seed (int): 随机数种子, 相同参数生成的项目完全一致
+    """
+
+    interfaces: int
+    implements: int
+    fan_out: int
+    depth: int
+    diamond: float
+    seed: int
+
+    def __init__(
+        self, interfaces: int = 20, implements: int = 3, fan_out: int = 2,
+        depth: int = 4, diamond: float = 0.2, seed: int = 0
+    ):
+        self.interfaces = interfaces
+        self.implements = implements
+        self.fan_out = fan_out
+        self.depth = max(1, min(depth, interfaces))
+        self.diamond = diamond
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "interfaces": self.interfaces,
+            "implements": self.implements,
+            "fan_out": self.fan_out,
+            "depth": self.depth,
+            "diamond": self.diamond,
+            "seed": self.seed,
+        }
+
+    @property
+    def module_count(self) -> int:
+        return self.interfaces * self.implements + 1
+
+
+def interface_name(index: int) -> str:
+    return "if%d" % index
+
+
+def implement_name(interface_index: int, implement_index: int) -> str:
+    return "impl%d_%d" % (interface_index, implement_index)
+
+
+def generate_project(path: Path, project: MomanBenchProject) -> Dict[str, List[str]]:
+    """在指定目录生成项目, 目录已经存在时会被删除
+
+    Returns:
+        Dict[str, List[str]]: 每个模块的依赖列表
+    """
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+
+    rng = random.Random(project.seed)
+
+    # 接口按照顺序平均分配到每一层
+    levels: List[List[int]] = [[] for _ in range(project.depth)]
+    for index in range(project.interfaces):
+        levels[index * project.depth // project.interfaces].append(index)
+
+    level_implements: List[List[str]] = [
+        [implement_name(i, j) for i in level for j in range(project.implements)]
+        for level in levels
+    ]
+
+    def pick_deps(level: int) -> List[str]:
+        if level >= len(level_implements):
+            return []
+
+        candidates = level_implements[level]
+        # 指向共享模块的依赖会和其他模块形成菱形
+        shared = candidates[:max(1, project.fan_out)]
+        deps: List[str] = []
+        for _ in range(min(project.fan_out, len(candidates))):
+            pool = shared if rng.random() < project.diamond else candidates
+            dep = rng.choice(pool)
+            if dep not in deps:
+                deps.append(dep)
+        return deps
+
+    dependencies: Dict[str, List[str]] = {MOMAN_BENCH_ENTRY_NAME: pick_deps(0)}
+
+    interface_names = [interface_name(index) for index in range(project.interfaces)]
+    path.joinpath("module.yaml").write_text(
+        'type: "root"\nname: "bench"\n\nentry: "%s"\ninterfaces: [%s]\n'
+        % (MOMAN_BENCH_ENTRY_NAME, ", ".join(interface_names))
+    )
+
+    entry_folder = path.joinpath(MOMAN_BENCH_ENTRY_NAME)
+    entry_folder.mkdir()
+    entry_folder.joinpath("__init__.py").write_text(ENTRY_TEMPLATE)
+    entry_folder.joinpath("module.yaml").write_text(
+        'type: "entry"\nname: "%s"\n\ndependencies: [%s]\npython-packages: []\nconfig: {}\n'
+        % (MOMAN_BENCH_ENTRY_NAME, ", ".join(dependencies[MOMAN_BENCH_ENTRY_NAME]))
+    )
+
+    for level, interface_indexes in enumerate(levels):
+        for i in interface_indexes:
+            name = interface_names[i]
+            interface_folder = path.joinpath("modules", name)
+            interface_folder.mkdir(parents=True)
+            interface_folder.joinpath("interface.py").write_text(INTERFACE_TEMPLATE.format(
+                name=name, upper_name=name.upper(), class_name=name.capitalize()
+            ))
+
+            for j in range(project.implements):
+                impl = implement_name(i, j)
+                deps = pick_deps(level + 1)
+                dependencies[impl] = deps
+
+                implement_folder = interface_folder.joinpath(impl)
+                implement_folder.mkdir()
+                implement_folder.joinpath("__init__.py").write_text(IMPLEMENT_TEMPLATE.format(
+                    name=impl, class_name=impl.capitalize(),
+                    interface_name=name, interface_class_name=name.capitalize(),
+                ))
+                implement_folder.joinpath("module.yaml").write_text(
+                    'type: "implement"\nname: "%s"\ninterface: "%s"\n\n'
+                    "dependencies: [%s]\npython-packages: []\n"
+                    "config:\n  name: string\n  size: number\n"
+                    % (impl, name, ", ".join(deps))
+                )
+
+    return dependencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate a synthetic moman project")
+    parser.add_argument("path")
+    parser.add_argument("--interfaces", type=int, default=20)
+    parser.add_argument("--implements", type=int, default=3)
+    parser.add_argument("--fan-out", type=int, default=2)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--diamond", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    project = MomanBenchProject(
+        args.interfaces, args.implements, args.fan_out, args.depth, args.diamond, args.seed
+    )
+    generate_project(Path(args.path), project)
+    print("generated %d modules in %s" % (project.module_count, args.path))
+
+
+if __name__ == "__main__":
+    main()
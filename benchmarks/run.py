@@ -0,0 +1,293 @@
+"""moman 工具链的性能测试
+
+在生成的项目上依次测试 modular / from_path / to_path / add / get_module / build, 结果以 JSON 输出
+
+python benchmarks/run.py --output result.json
+python benchmarks/run.py --baseline result.json --threshold 0.2
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+from pathlib import Path
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+# 测试当前源码目录中的 moman, 而不是已经安装的版本
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.joinpath("src")))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate import MomanBenchProject, generate_project  # noqa: E402
+
+from moman.manager.wrapper import register_wrapper_manager  # noqa: E402
+
+from moman_bin import constants, utils  # noqa: E402
+from moman_bin.info.modular import MomanModularInfo  # noqa: E402
+from moman_bin.handler.add.handler import MomanAddHandler, MomanAddConfig  # noqa: E402
+from moman_bin.handler.modular import MomanModularHandler, MomanModularConfig  # noqa: E402
+from moman_bin.handler.build.loader import MomanModuleFinder  # noqa: E402
+from moman_bin.handler.build.loop import MomanEventLoop  # noqa: E402
+from moman_bin.handler.build.manger import MomanModuleManagerWrapper  # noqa: E402
+from moman_bin.handler.build.plan import MomanBuildPlan  # noqa: E402
+from moman_bin.handler.build.runner import MomanBuildRunner  # noqa: E402
+
+MOMAN_BENCH_VERSION = 1
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽命令执行过程中的日志输出, 输出的格式化开销仍然计算在内"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Callable[[], Any] | None = None) -> Dict[str, Any]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        begin = time.perf_counter()
+        with quiet():
+            func()
+        samples.append(time.perf_counter() - begin)
+
+    return {
+        "median_ms": statistics.median(samples) * 1e3,
+        "min_ms": min(samples) * 1e3,
+        "runs": repeat,
+    }
+
+
+def unload_project_modules(info: MomanModularInfo):
+    """移除已经加载的项目模块, 使每次 build 都重新执行模块文件"""
+    for name in list(sys.modules.keys()):
+        if name == constants.MOMAN_MODULES_FOLDER or name.startswith(constants.MOMAN_MODULES_FOLDER + ".") \
+                or name == info.entry_name:
+            del sys.modules[name]
+
+
+def bench_modular(path: Path, repeat: int) -> Dict[str, Any]:
+    cache_file = path.joinpath(constants.MOMAN_MODULAR_CACHE_FILE)
+
+    def remove_cache():
+        if cache_file.exists():
+            cache_file.unlink()
+
+    def invoke():
+        MomanModularHandler().invoke(MomanModularConfig(path))
+
+    return {
+        "modular_cold": measure(invoke, repeat, remove_cache),
+        "modular_warm": measure(invoke, repeat),
+    }
+
+
+def bench_modular_info(path: Path, repeat: int) -> Dict[str, Any]:
+    info = MomanModularInfo.from_path(path)
+    modular_files = [
+        path.joinpath(constants.MOMAN_MODULAR_FILE), path.joinpath(constants.MOMAN_MODULAR_JSON_FILE)
+    ]
+
+    def remove_files():
+        for file in modular_files:
+            if file.exists():
+                file.unlink()
+
+    result = {
+        "from_path": measure(lambda: MomanModularInfo.from_path(path), repeat),
+        "to_path_unchanged": measure(lambda: info.to_path(path), repeat),
+        "to_path_write": measure(lambda: info.to_path(path), repeat, remove_files),
+    }
+    info.to_path(path)
+    return result
+
+
+def bench_add(path: Path, repeat: int) -> Dict[str, Any]:
+    info = MomanModularInfo.from_path(path)
+    names = [name for name in info.modules.keys() if name != info.entry_name]
+    counter = [0]
+
+    def invoke():
+        # 每次向不同的模块添加新的库, 保证每次都会写入
+        index = counter[0]
+        counter[0] += 1
+        name = names[index % len(names)]
+        MomanAddHandler().invoke(MomanAddConfig(path, name, [], ["bench-package-%d" % index]))
+
+    return {"add_package": measure(invoke, repeat)}
+
+
+def create_manager(path: Path, info: MomanModularInfo, event_loop: MomanEventLoop) -> MomanModuleManagerWrapper:
+    config_map = utils.read_yaml(path.joinpath(constants.MOMAN_CONFIG_NAME))
+    manager = MomanModuleManagerWrapper(info.modules, config_map, event_loop)
+    register_wrapper_manager(manager)
+    return manager
+
+
+def bench_get_module(path: Path, seconds: float) -> Dict[str, Any]:
+    info = MomanModularInfo.from_path(path)
+    edges: List[Tuple[str, str, str]] = []
+    for name, (module_config, _) in info.modules.items():
+        for dep in module_config.dependencies.keys():
+            dep_config, _ = info.modules[dep]
+            edges.append((name, dep_config.interface, dep))
+
+    MomanModuleFinder(path, info).install()
+    event_loop = MomanEventLoop()
+    try:
+        # 第一轮完成导入和构造, 之后只测试缓存命中的情况
+        with quiet():
+            manager = create_manager(path, info, event_loop)
+            for p_implement, c_interface, c_implement in edges:
+                manager.get_module(p_implement, c_interface, c_implement)
+
+        count = 0
+        begin = time.perf_counter()
+        while time.perf_counter() - begin < seconds:
+            for p_implement, c_interface, c_implement in edges:
+                manager.get_module(p_implement, c_interface, c_implement)
+            count += len(edges)
+        cost = time.perf_counter() - begin
+    finally:
+        event_loop.close()
+        MomanModuleFinder.uninstall()
+
+    return {"get_module": {"ops_per_sec": count / cost, "edges": len(edges)}}
+
+
+def bench_build(path: Path, repeat: int, parallel: int) -> Dict[str, Any]:
+    info = MomanModularInfo.from_path(path)
+    plan = MomanBuildPlan.from_modules(info.modules, info.entry_name)
+    MomanModuleFinder(path, info).install()
+
+    start_samples: List[float] = []
+    stop_samples: List[float] = []
+    for _ in range(repeat):
+        unload_project_modules(info)
+        event_loop = MomanEventLoop()
+        try:
+            with quiet():
+                manager = create_manager(path, info, event_loop)
+                runner = MomanBuildRunner(manager, info, plan, parallel)
+
+                begin = time.perf_counter()
+                runner.start()
+                start_samples.append(time.perf_counter() - begin)
+
+                begin = time.perf_counter()
+                runner.stop()
+                stop_samples.append(time.perf_counter() - begin)
+        finally:
+            event_loop.close()
+
+    MomanModuleFinder.uninstall()
+
+    def summary(samples: List[float]) -> Dict[str, Any]:
+        return {
+            "median_ms": statistics.median(samples) * 1e3,
+            "min_ms": min(samples) * 1e3,
+            "runs": repeat,
+        }
+
+    return {
+        "build_start": {**summary(start_samples), "modules": len(plan.order)},
+        "build_stop": summary(stop_samples),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """与基线比较, 返回变慢超过阈值的测试项"""
+    regressions: List[str] = []
+    base_results = baseline.get("results", {})
+    print("%-20s %12s %12s %8s" % ("benchmark", "baseline", "current", "ratio"))
+    for name, value in results.items():
+        base_value = base_results.get(name, None)
+        if base_value is None:
+            print("%-20s %12s %12s %8s" % (name, "-", "-", "new"))
+            continue
+
+        # 吞吐量越大越好, 耗时越小越好, 统一转换成耗时的比例
+        if "ops_per_sec" in value:
+            current, base = value["ops_per_sec"], base_value["ops_per_sec"]
+            ratio = base / current if current > 0 else float("inf")
+            unit = "ops/s"
+        else:
+            current, base = value["median_ms"], base_value["median_ms"]
+            ratio = current / base if base > 0 else float("inf")
+            unit = "ms"
+
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print("%-20s %12s %12s %7.2fx%s" % (
+            name, "%.2f%s" % (base, unit), "%.2f%s" % (current, unit), ratio, flag
+        ))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the moman toolchain on a generated project")
+    parser.add_argument("--interfaces", type=int, default=50)
+    parser.add_argument("--implements", type=int, default=4)
+    parser.add_argument("--fan-out", type=int, default=2)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--diamond", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each benchmark, the median is reported")
+    parser.add_argument("--parallel", type=int, default=1, help="parallel value used by the build benchmark")
+    parser.add_argument("--path", help="where to generate the project, a temporary folder by default")
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--baseline", help="compare the results with a saved json file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    project = MomanBenchProject(
+        args.interfaces, args.implements, args.fan_out, args.depth, args.diamond, args.seed
+    )
+
+    with tempfile.TemporaryDirectory(prefix="moman-bench-") as temp_folder:
+        path = Path(args.path if args.path is not None else temp_folder).absolute()
+        generate_project(path, project)
+        sys.path.append(str(path))
+
+        results: Dict[str, Any] = {}
+        results.update(bench_modular(path, args.repeat))
+        results.update(bench_modular_info(path, args.repeat))
+        results.update(bench_get_module(path, 1.0))
+        results.update(bench_build(path, args.repeat, args.parallel))
+        # add 会修改项目, 放在最后执行
+        results.update(bench_add(path, args.repeat))
+
+    output = {
+        "version": MOMAN_BENCH_VERSION,
+        "python": platform.python_version(),
+        "project": {**project.to_dict(), "modules": project.module_count},
+        "results": results,
+    }
+    text = json.dumps(output, indent=2, sort_keys=True)
+    if args.output is not None:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline is not None:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("project", {}) != output["project"]:
+            print("warning: baseline was generated with different project parameters")
+        regressions = compare(results, baseline, args.threshold)
+        if len(regressions) > 0:
+            print("regressions: %s" % ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from typing import Any, Dict, Iterator, Mapping
+from types import MappingProxyType
+
+
+class MomanModuleConfigSnapshot:
+    """模块配置的只读快照, 在 build 时完成校验和类型转换
+
+    配置项直接保存为实例属性, 通过 config.key 读取, 不经过任何查找逻辑;
+    名称不是合法标识符的配置项通过 config["key"] 读取。
+    list 和 dict 类型的配置分别冻结为 tuple 和只读的 mapping
+    """
+
+    def __init__(self, values: Dict[str, Any]):
+        self.__dict__.update({key: freeze(value) for key, value in values.items()})
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("config snapshot is read-only, key: %s" % name)
+
+    def __delattr__(self, name: str):
+        raise AttributeError("config snapshot is read-only, key: %s" % name)
+
+    def __getattr__(self, name: str) -> Any:
+        # 只有实例属性中不存在时才会调用
+        raise AttributeError("config not found, key: %s" % name)
+
+    # 只定义特殊方法, 它们通过类型查找, 不会被同名的配置项覆盖
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self.__dict__[key]
+        except KeyError:
+            raise KeyError("config not found, key: %s" % key) from None
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__dict__
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__dict__)
+
+    def __len__(self) -> int:
+        return len(self.__dict__)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MomanModuleConfigSnapshot):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self) -> str:
+        return "MomanModuleConfigSnapshot(%s)" % ", ".join(
+            "%s=%r" % (key, value) for key, value in self.__dict__.items()
+        )
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, list | tuple):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """将冻结的配置还原为新的 list 和 dict, 修改返回值不会影响快照"""
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    return value
@@ -1,26 +1,40 @@
 from abc import ABCMeta, abstractmethod
-from typing import TypeVar, Any
+from typing import TypeVar, Any, Callable, Coroutine, List
 from types import NoneType
+import asyncio
+import functools
+
+from moman.config import MomanModuleConfigSnapshot, thaw
+
+T = TypeVar("T")
 
 
 class MomanModuleInterface(metaclass=ABCMeta):
     __interface_name: str
     __implement_name: str
+    # 第一次访问 config 时从 manager 获取, 之后直接使用
+    __config: MomanModuleConfigSnapshot | NoneType
 
     def __init__(self, interface_name: str, implement_name: str):
         self.__interface_name = interface_name
         self.__implement_name = implement_name
+        self.__config = None
 
-    # 模块启动时的钩子函数
+    # 模块启动时的钩子函数, 可以定义为 async def, 此时在 moman 的事件循环中执行
     @abstractmethod
     def on_start(self):
         pass
 
-    # 模块停止时的钩子函数
+    # 模块停止时的钩子函数, 可以定义为 async def
     @abstractmethod
     def on_stop(self):
         pass
 
+    # config.yaml 在运行过程中发生变化时的钩子函数, 可以定义为 async def
+    # 调用时 self.config 已经是新的配置; 没有重写时会重启该模块以及依赖它的模块
+    def on_config_change(self, changed_keys: List[str]):
+        pass
+
     # 用于获取依赖模块
     def get_module(self, interface: type["InterfaceT"],
                    implement: str | NoneType = None) -> "InterfaceT":
@@ -32,12 +46,33 @@ class MomanModuleInterface(metaclass=ABCMeta):
             self.__implement_name, interface.get_interface_name(), implement
         )
 
+    # 兼容按照名称读取配置, 推荐直接使用 self.config.key
+    # 与之前的行为一致, list 和 dict 类型的配置返回可以修改的副本, 每次调用都会重新复制
     def get_config(self, key: str, default: Any | NoneType = None) -> Any:
+        config = self.config
+        return thaw(config[key]) if key in config else default
+
+    # 在同步代码中调用异步方法, 协程在 moman 的事件循环中执行并等待结果
+    def call_async(self, coroutine: Coroutine[Any, Any, T]) -> T:
         from ..manager import MomanModuleManager
 
-        return MomanModuleManager.instance().get_config(
-            self.__implement_name, key, default
-        )
+        loop = MomanModuleManager.instance().get_event_loop()
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        # 在事件循环中阻塞等待会导致死锁, 此时应该直接 await
+        if running_loop is loop:
+            coroutine.close()
+            raise RuntimeError("call_async can not be used inside the moman event loop, use await instead")
+
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    # 在异步代码中调用同步方法, 方法在线程池中执行, 避免阻塞事件循环
+    async def call_sync(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
 
     @property
     def interface_name(self) -> str:
@@ -47,6 +82,22 @@ class MomanModuleInterface(metaclass=ABCMeta):
     def implement_name(self) -> str:
         return self.__implement_name
 
+    # 配置更新之后由 moman 调用, 下次访问 config 时重新获取
+    def reset_config(self):
+        self.__config = None
+
+    # 校验并转换类型之后的只读配置, 通过 self.config.key 读取
+    @property
+    def config(self) -> MomanModuleConfigSnapshot:
+        config = self.__config
+        if config is None:
+            from ..manager import MomanModuleManager
+
+            config = self.__config = MomanModuleManager.instance().get_config_snapshot(
+                self.__implement_name
+            )
+        return config
+
 
 ENTRY_INTERFACE_NAME = "entry"
 
@@ -2,7 +2,9 @@ from typing import Any
 from types import NoneType
 from abc import ABCMeta, abstractmethod
 from pathlib import Path
+import asyncio
 
+from moman.config import MomanModuleConfigSnapshot
 from moman.interface import MomanModuleInterface
 
 
@@ -26,12 +28,22 @@ class MomanModuleManager(metaclass=ABCMeta):
     ) -> Any:
         pass
 
+    # 获取模块校验之后的只读配置
+    @abstractmethod
+    def get_config_snapshot(self, implement: str) -> MomanModuleConfigSnapshot:
+        pass
+
     @abstractmethod
     def get_entry_module(
         self, entry_name: str, entry_path: Path
     ) -> MomanModuleInterface:
         pass
 
+    # 整个运行过程共享的事件循环, 异步模块的生命周期函数都在其中执行
+    @abstractmethod
+    def get_event_loop(self) -> asyncio.AbstractEventLoop:
+        pass
+
     @staticmethod
     def instance() -> "MomanModuleManager":
         from .wrapper import moman_manager_wrapper
@@ -1,7 +1,8 @@
-from typing import Any
+from typing import Any, List
 from argparse import ArgumentParser
 from pathlib import Path
 import os
+import sys
 
 from moman_bin.errors import MomanBinError
 from moman_bin.utils import MomanLogger
@@ -11,7 +12,8 @@ class MomanCliExecutor:
     __parser: ArgumentParser
 
     def __init__(self):
-        parser = ArgumentParser()
+        # daemon 中的程序名称与命令行不同, 固定名称使两者的帮助信息一致
+        parser = ArgumentParser(prog="moman")
 
         sub_parsers = parser.add_subparsers()
 
@@ -33,6 +35,10 @@ class MomanCliExecutor:
         )
         parser_interface.add_argument("-n", "--new", action="store_true")
         parser_interface.add_argument("-d", "--delete", action="store_true")
+        parser_interface.add_argument(
+            "--async", dest="use_async", action="store_true",
+            help="generate async abstract methods"
+        )
         parser_interface.add_argument("name")
         parser_interface.set_defaults(func=self.__execute_interface)
 
@@ -44,6 +50,14 @@ class MomanCliExecutor:
         parser_implement.add_argument("-n", "--new", action="store_true")
         parser_implement.add_argument("-d", "--delete", action="store_true")
         parser_implement.add_argument("-i", "--interface")
+        parser_implement.add_argument(
+            "--async", dest="use_async", action="store_true",
+            help="generate async on_start / on_stop"
+        )
+        parser_implement.add_argument(
+            "--exec-interface", action="store_true",
+            help="execute interface.py when static analysis can not find the interface"
+        )
         parser_implement.add_argument("name")
         parser_implement.set_defaults(func=self.__execute_implement)
 
@@ -68,6 +82,26 @@ class MomanCliExecutor:
             help="normalize current project",
             description="normalize current project"
         )
+        parser_modular.add_argument(
+            "-j", "--jobs", type=int, default=1,
+            help="the number of processes used to parse module configs"
+        )
+        parser_modular.add_argument(
+            "--exec-interface", action="store_true",
+            help="execute interface.py when static analysis can not find the interface"
+        )
+        parser_modular.add_argument(
+            "--db", action="store_true",
+            help="keep the project model in .moman/modular.db for row level updates"
+        )
+        parser_modular.add_argument(
+            "--export", action="store_true",
+            help="export .moman/modular.yaml from .moman/modular.db without analyzing"
+        )
+        parser_modular.add_argument(
+            "--watch", action="store_true",
+            help="keep watching the project and update incrementally when module files change"
+        )
         parser_modular.set_defaults(func=self.__execute_modular)
 
         parser_build = sub_parsers.add_parser(
@@ -75,16 +109,94 @@ class MomanCliExecutor:
             help="build this project.",
             description="build this project."
         )
+        parser_build.add_argument(
+            "--plan", action="store_true",
+            help="print the start order of modules without starting them"
+        )
+        parser_build.add_argument(
+            "--parallel", type=int, default=1, metavar="N",
+            help="start independent modules of the same layer on N threads"
+        )
+        parser_build.add_argument(
+            "--timings", action="store_true",
+            help="print import / construct / on_start / on_stop time of each module"
+        )
+        parser_build.add_argument(
+            "--trace", metavar="FILE",
+            help="write a chrome trace event file of the module lifecycle"
+        )
+        parser_build.add_argument(
+            "--venv", action="store_true",
+            help="run in .moman/venv, packages are installed offline from the shared wheelhouse"
+        )
+        parser_build.add_argument(
+            "--watch", action="store_true",
+            help="keep modules running until interrupted and hot reload config.yaml when it changes"
+        )
+        parser_build.add_argument(
+            "--reload", action="store_true",
+            help="keep modules running until interrupted and reload an implement when its sources change"
+        )
         parser_build.set_defaults(func=self.__execute_build)
 
+        parser_graph = sub_parsers.add_parser(
+            "graph",
+            help="export the module dependency graph.",
+            description="export the modules reachable from the entry as DOT or JSON, "
+                        "annotated with the timings of the last build, its critical path "
+                        "and the modules never resolved at runtime."
+        )
+        parser_graph.add_argument(
+            "-f", "--format", choices=["dot", "json"], default="dot",
+            help="the output format, default dot"
+        )
+        parser_graph.add_argument("-o", "--output", help="write the graph to a file instead of stdout")
+        parser_graph.add_argument(
+            "--no-timings", action="store_true",
+            help="ignore .moman/timings.json, the critical path is the deepest dependency chain"
+        )
+        parser_graph.set_defaults(func=self.__execute_graph)
+
+        parser_batch = sub_parsers.add_parser(
+            "batch",
+            help="apply a list of interface / implement / add operations at once.",
+            description="apply a yaml or json list of interface / implement / add operations, "
+                        "the project is written once and nothing is written if any operation fails."
+        )
+        parser_batch.add_argument("file", help="the yaml or json file of operations")
+        parser_batch.set_defaults(func=self.__execute_batch)
+
+        parser_daemon = sub_parsers.add_parser(
+            "daemon",
+            help="manage the resident daemon of this project.",
+            description="manage the resident daemon of this project, "
+                        "commands are served by it while it is running."
+        )
+        parser_daemon.add_argument("action", choices=["start", "stop", "status"])
+        parser_daemon.add_argument(
+            "--foreground", action="store_true",
+            help="run the daemon in the current process instead of the background"
+        )
+        parser_daemon.set_defaults(func=self.__execute_daemon)
+
         self.__parser = parser
 
-    def exec(self):
+    def exec(self, argv: List[str] | None = None) -> bool:
+        """解析并执行子命令
+
+        Args:
+            argv (List[str] | None): 命令行参数, 为 None 时使用 sys.argv
+
+        Returns:
+            bool: 是否执行成功, 失败的原因已经输出
+        """
         try:
-            args = self.__parser.parse_args()
+            args = self.__parser.parse_args(argv)
             args.func(args)
         except MomanBinError as e:
             MomanLogger.error(str(e))
+            return False
+        return True
 
     def __execute_create(self, args: Any):
         from moman_bin.handler.create.handler import MomanCreateHandler, MomanCreateConfig
@@ -114,7 +226,7 @@ class MomanCliExecutor:
         if delete_flag:
             operate_type = MomanCmdOperateType.Remove
 
-        config = MomanInterfaceConfig(Path(os.curdir), name, operate_type)
+        config = MomanInterfaceConfig(Path(os.curdir), name, operate_type, args.use_async)
         MomanInterfaceHandler().invoke(config)
 
     def __execute_implement(self, args: Any):
@@ -137,7 +249,9 @@ class MomanCliExecutor:
         if delete_flag:
             operate_type = MomanCmdOperateType.Remove
 
-        config = MomanImplementConfig(Path(os.curdir), interface, name, operate_type)
+        config = MomanImplementConfig(
+            Path(os.curdir), interface, name, operate_type, args.exec_interface, args.use_async
+        )
         MomanImplementHandler().invoke(config)
 
     def __execute_add(self, args: Any):
@@ -150,11 +264,48 @@ class MomanCliExecutor:
         MomanAddHandler().invoke(config)
 
     def __execute_modular(self, args: Any):
-        from moman_bin.handler.modular import MomanModularHandler, MomanCmdBaseConfig
+        from moman_bin.handler.modular import MomanModularHandler, MomanModularConfig
 
-        MomanModularHandler().invoke(MomanCmdBaseConfig(Path(os.curdir)))
+        MomanModularHandler().invoke(MomanModularConfig(
+            Path(os.curdir), args.jobs, args.exec_interface, args.db, args.export, args.watch
+        ))
 
     def __execute_build(self, args: Any):
-        from moman_bin.handler.build.handler import MomanBuildHandler, MomanCmdBaseConfig
+        from moman_bin.handler.build.handler import MomanBuildHandler, MomanBuildConfig
+
+        trace_file = args.trace
+        if trace_file is not None:
+            trace_file = Path(trace_file)
+
+        # 在虚拟环境中重新执行时去掉 --venv, 其余参数保持不变
+        venv_argv = None
+        if args.venv:
+            venv_argv = [arg for arg in sys.argv[1:] if arg != "--venv"]
+
+        MomanBuildHandler().invoke(MomanBuildConfig(
+            Path(os.curdir), args.plan, args.parallel, args.timings, trace_file, venv_argv,
+            args.watch, args.reload
+        ))
+
+    def __execute_graph(self, args: Any):
+        from moman_bin.handler.graph import MomanGraphHandler, MomanGraphConfig, MomanGraphFormat
+
+        output = args.output
+        if output is not None:
+            output = Path(output)
+
+        MomanGraphHandler().invoke(MomanGraphConfig(
+            Path(os.curdir), MomanGraphFormat(args.format), output, not args.no_timings
+        ))
+
+    def __execute_batch(self, args: Any):
+        from moman_bin.handler.batch import MomanBatchHandler, MomanBatchConfig
+
+        MomanBatchHandler().invoke(MomanBatchConfig(Path(os.curdir), Path(args.file)))
+
+    def __execute_daemon(self, args: Any):
+        from moman_bin.handler.daemon import MomanDaemonHandler, MomanDaemonConfig, MomanDaemonAction
 
-        MomanBuildHandler().invoke(MomanCmdBaseConfig(Path(os.curdir)))
+        MomanDaemonHandler().invoke(MomanDaemonConfig(
+            Path(os.curdir), MomanDaemonAction(args.action), args.foreground
+        ))
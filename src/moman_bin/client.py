@@ -0,0 +1,111 @@
+# daemon 的轻量客户端, 在 CLI 启动时最先执行
+# 只能依赖标准库和 constants, 导入 yaml / termcolor 以及 handler 的开销正是 daemon 想要省掉的部分
+# 导入 typing 本身也需要十几毫秒, 因此这里使用内置类型标注
+
+import os
+import sys
+
+from moman_bin import constants
+
+# 设置之后总是在当前进程中执行命令
+MOMAN_NO_DAEMON_ENV = "MOMAN_NO_DAEMON"
+
+# 可以交给 daemon 执行的子命令
+MOMAN_DAEMON_COMMANDS = {"interface", "implement", "add", "remove", "modular", "batch", "graph"}
+# 需要长期运行或者会执行项目代码的参数, 带有这些参数的命令总是在当前进程中执行
+MOMAN_DAEMON_LOCAL_FLAGS = {"--watch", "--exec-interface"}
+
+
+class MomanDaemonConnectionError(Exception):
+    """请求已经发出, 但是没有收到完整的响应"""
+
+
+def recv_message(conn: object) -> dict:
+    """读取对端发送的一条消息, 对端发送完毕之后会关闭写端"""
+    import json
+
+    chunks: list[bytes] = []
+    while True:
+        chunk = conn.recv(64 * 1024)
+        if len(chunk) == 0:
+            break
+        chunks.append(chunk)
+
+    data = b"".join(chunks)
+    if len(data) == 0:
+        raise MomanDaemonConnectionError("empty message")
+    return json.loads(data)
+
+
+def send_message(conn: object, message: dict):
+    import json
+    import socket
+
+    conn.sendall(json.dumps(message).encode())
+    conn.shutdown(socket.SHUT_WR)
+
+
+def request_daemon(message: dict, timeout: float | None = None) -> dict | None:
+    """向当前目录中的 daemon 发送请求
+
+    socket 使用相对路径连接, 避免项目路径过长时超出 unix socket 的路径长度限制
+
+    Args:
+        message (dict): 请求内容
+        timeout (float | None): 等待响应的超时时间 (秒), None 表示一直等待
+
+    Returns:
+        dict | None: 响应内容, daemon 没有运行时返回 None
+    """
+    socket_file = constants.MOMAN_DAEMON_SOCKET_FILE
+    if not os.path.exists(socket_file):
+        return None
+
+    import socket
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            conn.connect(socket_file)
+        except (FileNotFoundError, ConnectionRefusedError):
+            # daemon 已经退出, 只留下了 socket 文件
+            return None
+
+        conn.settimeout(timeout)
+        try:
+            send_message(conn, message)
+            return recv_message(conn)
+        except (OSError, ValueError) as e:
+            raise MomanDaemonConnectionError(str(e)) from e
+    finally:
+        conn.close()
+
+
+def forward_to_daemon(argv: list[str]) -> int | None:
+    """daemon 正在运行时交给 daemon 执行命令, 并输出执行结果
+
+    Args:
+        argv (list[str]): 命令行参数, 不包含程序名称
+
+    Returns:
+        int | None: 命令的退出码, 需要在当前进程中执行时返回 None
+    """
+    if len(argv) == 0 or argv[0] not in MOMAN_DAEMON_COMMANDS:
+        return None
+    if any(arg in MOMAN_DAEMON_LOCAL_FLAGS for arg in argv) or os.environ.get(MOMAN_NO_DAEMON_ENV):
+        return None
+
+    try:
+        response = request_daemon({"op": "exec", "argv": argv, "tty": sys.stdout.isatty()})
+    except MomanDaemonConnectionError as e:
+        # 命令可能已经部分执行, 不能再在当前进程中重新执行
+        print("[error] daemon - connection lost while running the command: %s" % e, file=sys.stderr)
+        return 1
+
+    if response is None:
+        return None
+
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stdout.flush()
+    sys.stderr.write(response.get("stderr", ""))
+    return response.get("code", 0)
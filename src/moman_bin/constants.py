@@ -1,4 +1,5 @@
 MOMAN_GIT_IGNORE_FILE = ".gitignore"
+MOMAN_IGNORE_FILE = ".momanignore"
 
 MOMAN_CACHE_FOLDER = ".moman"
 MOMAN_MODULES_FOLDER = "modules"
@@ -11,6 +12,16 @@ MOMAN_MODULE_INIT_NAME = "__init__.py"
 MOMAN_INTERFACE_NAME = "interface.py"
 
 MOMAN_MODULAR_FILE = ".moman/modular.yaml"
+MOMAN_MODULAR_JSON_FILE = ".moman/modular.json"
+MOMAN_MODULAR_DB_FILE = ".moman/modular.db"
+MOMAN_MODULAR_CACHE_FILE = ".moman/cache.json"
+MOMAN_TIMINGS_FILE = ".moman/timings.json"
+MOMAN_REQUIREMENTS_FILE = ".moman/requirements.txt"
+MOMAN_PACKAGES_STATE_FILE = ".moman/packages.json"
+MOMAN_VENV_FOLDER = ".moman/venv"
+MOMAN_DAEMON_SOCKET_FILE = ".moman/daemon.sock"
+MOMAN_DAEMON_LOG_FILE = ".moman/daemon.log"
+MOMAN_LOCK_FILE = ".moman/lock"
 
 MOMAN_ENTRY_DEFAULT_NAME = "entry"
 
@@ -38,3 +38,13 @@ class MomanInterfaceError(MomanBinError):
 class MomanImplementError(MomanBinError):
     def __init__(self, message: str):
         super().__init__("implement", message)
+
+
+class MomanDaemonError(MomanBinError):
+    def __init__(self, message: str):
+        super().__init__("daemon", message)
+
+
+class MomanBatchError(MomanBinError):
+    def __init__(self, message: str):
+        super().__init__("batch", message)
@@ -4,10 +4,11 @@ import re
 
 from ..base import MomanCmdHandler, MomanCmdKind, MomanCmdBaseConfig
 
-from moman_bin import constants, utils
+from moman_bin import constants
 from moman_bin.errors import MomanBinError
 from moman_bin.info.config.module import MomanModuleDependency
-from moman_bin.info.modular import MomanModularInfo
+
+from ..transaction import MomanProjectTransaction
 
 
 class MomanAddError(MomanBinError):
@@ -48,21 +49,29 @@ class MomanAddHandler(MomanCmdHandler):
 
     @override
     def invoke(self, config: MomanCmdBaseConfig):
-        config: MomanAddConfig = config
+        transaction = MomanProjectTransaction(config.path)
+        try:
+            self.apply(config, transaction)
+            transaction.commit()
+        finally:
+            transaction.close()
+
+    def apply(self, config: MomanAddConfig, transaction: MomanProjectTransaction):
+        """在事务中执行命令, 修改在事务 commit 之后才会写入"""
         if len(config.dep_implements) > 0:
-            self.__invoke_add_dependency(config)
+            self.__invoke_add_dependency(config, transaction)
         if len(config.packages) > 0:
-            self.__invoke_add_package(config)
+            self.__invoke_add_package(config, transaction)
 
-    def __invoke_add_dependency(self, config: MomanAddConfig):
-        path = config.path
+    def __invoke_add_dependency(self, config: MomanAddConfig, transaction: MomanProjectTransaction):
         implement_name = config.implement_name
         dep_implements = config.dep_implements
 
-        modular = MomanModularInfo.from_path(path)
-        module_config, module_config_folder = modular.modules.get(implement_name, None)
-        if module_config is None:
+        store = transaction.store
+        module = store.get_module(implement_name)
+        if module is None:
             raise MomanAddError("implement {name} not found".format(name=config.implement_name))
+        module_config, module_config_folder = module
 
         temp_dep_implements: List[str] = []
         for add_dep in dep_implements:
@@ -79,33 +88,33 @@ class MomanAddHandler(MomanCmdHandler):
         # 先检查 dep 信息是否正确
         add_deps: List[MomanModuleDependency] = []
         for dep_implement in dep_implements:
-            module, module_path = modular.modules.get(dep_implement, (None, None))
-            if module is None:
+            dep_module = store.get_module(dep_implement)
+            if dep_module is None:
                 raise MomanAddError(
                     "implement module {name} not found".format(name=dep_implement)
                 )
+            module, module_path = dep_module
 
             # 为模块添加路径
             add_deps.append(MomanModuleDependency(module.name, module_path))
 
-        modular.add_module_deps(implement_name, add_deps)
-        modular.to_path(path)
+        store.add_module_deps(implement_name, add_deps)
 
         # 这里不能使用 yaml 修改, 会导致最终配置文件丢失格式
         module_config_file = module_config_folder.joinpath(constants.MOMAN_MODULE_CONFIG_NAME)
-        self.__insert_yaml_list(module_config_file, "dependencies", dep_implements)
+        self.__insert_yaml_list(transaction, module_config_file, "dependencies", dep_implements)
 
-    def __invoke_add_package(self, config: MomanAddConfig):
-        path = config.path
+    def __invoke_add_package(self, config: MomanAddConfig, transaction: MomanProjectTransaction):
         implement_name = config.implement_name
         packages = config.packages
 
-        modular = MomanModularInfo.from_path(path)
-        module_config, module_config_folder = modular.modules.get(implement_name, None)
-        if module_config is None:
+        store = transaction.store
+        module = store.get_module(implement_name)
+        if module is None:
             raise MomanAddError(
                 "implement module {name} not found".format(name=config.implement_name)
             )
+        module_config, module_config_folder = module
 
         temp_packages: List[str] = []
         for package in packages:
@@ -122,16 +131,17 @@ class MomanAddHandler(MomanCmdHandler):
         if len(packages) == 0:
             return
 
-        modular.add_packages(implement_name, packages)
-        modular.to_path(path)
+        store.add_packages(implement_name, packages)
 
         module_config_file = module_config_folder.joinpath(
             constants.MOMAN_MODULE_CONFIG_NAME
         )
-        self.__insert_yaml_list(module_config_file, "python-packages", packages)
+        self.__insert_yaml_list(transaction, module_config_file, "python-packages", packages)
 
-    def __insert_yaml_list(self, path: str, key: str, data_list: List[str]):
-        module_config_str = utils.read_file(path)
+    def __insert_yaml_list(
+        self, transaction: MomanProjectTransaction, path: Path, key: str, data_list: List[str]
+    ):
+        module_config_str = transaction.read_file(path)
 
         key_str = key + ":"
         key_strs = re.findall(key_str + r"\s*\[\]", module_config_str)
@@ -145,4 +155,4 @@ class MomanAddHandler(MomanCmdHandler):
                 key_str, key_str + "\n  - " + data, 1
             )
 
-        utils.write_file(path, module_config_str)
+        transaction.write_file(path, module_config_str)
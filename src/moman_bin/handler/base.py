@@ -12,6 +12,9 @@ class MomanCmdKind(Enum):
     Delete = "delete"  # TODO
     Remove = "remove"  # TODO
     Interface = "interface"
+    Daemon = "daemon"
+    Batch = "batch"
+    Graph = "graph"
 
 
 class MomanCmdOperateType(Enum):
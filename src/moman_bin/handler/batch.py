@@ -0,0 +1,149 @@
+from typing import override, Any, Callable, Dict, List, Tuple
+from pathlib import Path
+import json
+
+import yaml
+
+from .base import MomanCmdHandler, MomanCmdKind, MomanCmdBaseConfig, MomanCmdOperateType
+from .transaction import MomanProjectTransaction
+from .add.handler import MomanAddHandler, MomanAddConfig
+from .implement import MomanImplementHandler, MomanImplementConfig
+from .interface import MomanInterfaceHandler, MomanInterfaceConfig
+
+from moman_bin import utils
+from moman_bin.errors import MomanBinError, MomanBatchError
+
+# 每种操作允许的字段: 字段名称 -> (类型, 是否必须)
+MOMAN_BATCH_OPERATION_FIELDS: Dict[str, Dict[str, Tuple[type | Tuple[type, ...], bool]]] = {
+    "interface": {"name": (str, True), "async": (bool, False)},
+    "implement": {"name": (str, True), "interface": (str, True), "async": (bool, False)},
+    "add": {"name": (str, True), "deps": ((list, str), False), "packages": ((list, str), False)},
+}
+
+
+class MomanBatchConfig(MomanCmdBaseConfig):
+    __batch_file: Path
+
+    def __init__(self, path: Path, batch_file: Path):
+        super().__init__(path)
+        self.__batch_file = batch_file
+
+    @property
+    def batch_file(self) -> Path:
+        """操作列表文件, 后缀为 .json 时按照 json 解析, 否则按照 yaml 解析"""
+        return self.__batch_file
+
+
+class MomanBatchHandler(MomanCmdHandler):
+    """在一个事务中执行多条 interface / implement / add 操作
+
+    项目的模块信息只加载一次, 所有操作都在内存中完成并校验, 之后的操作能够看到之前操作的结果;
+    全部成功之后统一写入生成的文件, module.yaml 以及 modular 文件, 任意一条失败时不写入任何内容
+    """
+
+    def __init__(self):
+        super().__init__(MomanCmdKind.Batch)
+
+    @override
+    def invoke(self, config: MomanCmdBaseConfig):
+        config: MomanBatchConfig = config
+
+        # 先校验全部操作的格式, 再开始执行
+        operations = [
+            self.__parse_operation(config.path, index, operation)
+            for index, operation in enumerate(self.__read_operations(config.batch_file))
+        ]
+
+        transaction = MomanProjectTransaction(config.path)
+        try:
+            for index, (description, apply) in enumerate(operations):
+                try:
+                    apply(transaction)
+                except MomanBinError as e:
+                    raise MomanBatchError(
+                        "operation %d (%s) failed, nothing is written: %s" % (index + 1, description, e)
+                    )
+            transaction.commit()
+        finally:
+            transaction.close()
+
+        utils.MomanLogger.ok("applied %d operations" % len(operations))
+
+    def __read_operations(self, batch_file: Path) -> List[Any]:
+        if not batch_file.exists():
+            raise MomanBatchError("batch file not found, path: %s" % batch_file)
+
+        try:
+            if batch_file.suffix == ".json":
+                operations = utils.read_json(batch_file)
+            else:
+                operations = utils.read_yaml(batch_file)
+        except (ValueError, yaml.YAMLError) as e:
+            raise MomanBatchError("invalid batch file %s: %s" % (batch_file, e))
+
+        if operations is None:
+            return []
+        if not isinstance(operations, list):
+            raise MomanBatchError("batch file must contain a list of operations")
+        return operations
+
+    def __parse_operation(
+        self, path: Path, index: int, operation: Any
+    ) -> Tuple[str, Callable[[MomanProjectTransaction], None]]:
+        """校验单条操作并转换成对应命令的配置
+
+        Returns:
+            Tuple[str, Callable[[MomanProjectTransaction], None]]: 操作的描述, 在事务中执行操作的函数
+        """
+        if not isinstance(operation, dict):
+            raise MomanBatchError("operation %d must be a mapping" % (index + 1))
+
+        kind = operation.get("op", None)
+        fields = MOMAN_BATCH_OPERATION_FIELDS.get(kind, None)
+        if fields is None:
+            raise MomanBatchError("operation %d: unknown op %s, expected one of %s" % (
+                index + 1, json.dumps(kind), ", ".join(MOMAN_BATCH_OPERATION_FIELDS.keys())
+            ))
+
+        for key, value in operation.items():
+            if key == "op":
+                continue
+            if key not in fields:
+                raise MomanBatchError("operation %d (%s): unknown field %s" % (index + 1, kind, key))
+            field_type, _ = fields[key]
+            if not isinstance(value, field_type):
+                raise MomanBatchError("operation %d (%s): invalid value of %s: %s" % (
+                    index + 1, kind, key, json.dumps(value)
+                ))
+        for key, (_, required) in fields.items():
+            if required and key not in operation:
+                raise MomanBatchError("operation %d (%s): missing field %s" % (index + 1, kind, key))
+
+        name = operation["name"]
+        use_async = operation.get("async", False)
+        match kind:
+            case "interface":
+                interface_config = MomanInterfaceConfig(path, name, MomanCmdOperateType.Add, use_async)
+                return "interface %s" % name, \
+                    lambda transaction: MomanInterfaceHandler().apply(interface_config, transaction)
+            case "implement":
+                implement_config = MomanImplementConfig(
+                    path, operation["interface"], name, MomanCmdOperateType.Add, use_async=use_async
+                )
+                return "implement %s" % name, \
+                    lambda transaction: MomanImplementHandler().apply(implement_config, transaction)
+            case _:
+                add_config = MomanAddConfig(
+                    path, name,
+                    MomanBatchHandler.__to_list(operation.get("deps", [])),
+                    MomanBatchHandler.__to_list(operation.get("packages", [])),
+                )
+                return "add %s" % name, \
+                    lambda transaction: MomanAddHandler().apply(add_config, transaction)
+
+    @staticmethod
+    def __to_list(value: List[Any] | str) -> List[str]:
+        # 与命令行参数一致, 字符串按照空格分隔
+        if isinstance(value, str):
+            return [item for item in value.split(" ") if len(item) > 0]
+        return [str(item) for item in value]
@@ -0,0 +1,66 @@
+from typing import Any, Dict, List, Tuple
+from pathlib import Path
+
+from moman.config import MomanModuleConfigSnapshot
+
+from moman_bin import utils
+from moman_bin.errors import MomanConfigError
+from moman_bin.info.config.module import MomanModuleConfig
+
+
+def build_config_snapshots(
+    module_config_map: Dict[str, Tuple[MomanModuleConfig, Path]],
+    config_map: Dict[str, Dict[str, Any]] | Any,
+) -> Dict[str, MomanModuleConfigSnapshot]:
+    """按照 module.yaml 中声明的类型校验 config.yaml, 为每个模块生成只读的配置快照
+
+    缺失或者为空的配置项使用默认值, 没有声明的配置项保持原样;
+    所有模块的错误收集之后统一报错
+
+    Args:
+        module_config_map (Dict[str, Tuple[MomanModuleConfig, Path]]): 项目的模块配置
+        config_map (Dict[str, Dict[str, Any]]): config.yaml 的内容
+
+    Returns:
+        Dict[str, MomanModuleConfigSnapshot]: 模块名称 -> 配置快照
+    """
+    if config_map is None:
+        config_map = {}
+
+    errors: List[str] = []
+    if not isinstance(config_map, Dict):
+        errors.append("config.yaml must be a mapping of module name to config")
+        config_map = {}
+
+    snapshots: Dict[str, MomanModuleConfigSnapshot] = {}
+    for name, (module_config, _) in module_config_map.items():
+        raw_config = config_map.get(name, None)
+        if raw_config is None:
+            raw_config = {}
+        if not isinstance(raw_config, Dict):
+            errors.append("%s: config must be a mapping, got %s" % (name, type(raw_config).__name__))
+            continue
+
+        values: Dict[str, Any] = {}
+        for key, item in module_config.config_map.items():
+            value = raw_config.get(key, None)
+            if value is None:
+                values[key] = item.default_value
+                continue
+
+            try:
+                values[key] = item.coerce(value)
+            except ValueError as e:
+                errors.append("%s.%s: %s" % (name, key, e))
+
+        for key, value in raw_config.items():
+            if key not in module_config.config_map:
+                utils.MomanLogger.debug("config %s.%s is not declared in module.yaml" % (name, key))
+                values[key] = value
+
+        snapshots[name] = MomanModuleConfigSnapshot(values)
+
+    if len(errors) > 0:
+        raise MomanConfigError("invalid config.yaml:\n  %s" % "\n  ".join(errors))
+
+    return snapshots
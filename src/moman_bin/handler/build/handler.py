@@ -1,16 +1,86 @@
-from typing import Dict, Tuple, override
-import sys
+from typing import List, override
+from types import NoneType
 import os
+import sys
 from pathlib import Path
 
-from moman.manager.wrapper import register_wrapper_manager, get_wrapper_manager
+from moman.manager.wrapper import register_wrapper_manager
 
 from moman_bin import constants, utils
 from moman_bin.info.modular import MomanModularInfo
-from moman_bin.info.config.module import MomanModuleConfig
+from moman_bin.handler.watch_utils import wait_for_interrupt
 
 from ..base import MomanCmdHandler, MomanCmdKind, MomanCmdBaseConfig
+from .loader import MomanModuleFinder
+from .loop import MomanEventLoop
 from .manger import MomanModuleManagerWrapper
+from .plan import MomanBuildPlan
+from .reload import MomanCodeReloader, MomanConfigReloader
+from .packages import install_packages
+from .runner import MomanBuildRunner
+from .timings import MomanBuildTimings
+from .venv import MOMAN_VENV_ENV, exec_in_venv, prepare_venv
+
+
+class MomanBuildConfig(MomanCmdBaseConfig):
+    __plan_only: bool
+    __parallel: int
+    __show_timings: bool
+    __trace_file: Path | NoneType
+    # 在项目的虚拟环境中重新执行时使用的命令行参数, 为空时不使用虚拟环境
+    __venv_argv: List[str] | NoneType
+    __watch: bool
+    __reload: bool
+
+    def __init__(
+        self, path: Path, plan_only: bool = False, parallel: int = 1,
+        show_timings: bool = False, trace_file: Path | NoneType = None,
+        venv_argv: List[str] | NoneType = None, watch: bool = False,
+        reload: bool = False
+    ):
+        super().__init__(path)
+        self.__plan_only = plan_only
+        self.__parallel = parallel
+        self.__show_timings = show_timings
+        self.__trace_file = trace_file
+        self.__venv_argv = venv_argv
+        self.__watch = watch
+        self.__reload = reload
+
+    @property
+    def plan_only(self) -> bool:
+        """只输出启动计划, 不启动模块"""
+        return self.__plan_only
+
+    @property
+    def parallel(self) -> int:
+        """同一依赖层级中并行启动模块的线程数量"""
+        return self.__parallel
+
+    @property
+    def show_timings(self) -> bool:
+        """运行结束后输出每个模块各个阶段的耗时"""
+        return self.__show_timings
+
+    @property
+    def trace_file(self) -> Path | NoneType:
+        """Chrome trace event 文件的输出位置"""
+        return self.__trace_file
+
+    @property
+    def venv_argv(self) -> List[str] | NoneType:
+        """在 .moman/venv 中重新执行 build 时使用的命令行参数"""
+        return self.__venv_argv
+
+    @property
+    def watch(self) -> bool:
+        """启动之后保持运行直到被中断, 期间监听 config.yaml 的变化"""
+        return self.__watch
+
+    @property
+    def reload(self) -> bool:
+        """启动之后保持运行直到被中断, 期间重新加载源码发生变化的模块"""
+        return self.__reload
 
 
 class MomanBuildHandler(MomanCmdHandler):
@@ -19,79 +89,93 @@ class MomanBuildHandler(MomanCmdHandler):
 
     @override
     def invoke(self, config: MomanCmdBaseConfig):
+        if not isinstance(config, MomanBuildConfig):
+            config = MomanBuildConfig(config.path)
+
         path = config.path
 
         modular_info = MomanModularInfo.from_path(path)
+        modules = modular_info.modules
 
-        # 安装 python 库
-        self.__install_packages(path, modular_info)
+        # 计算一次启动顺序, 同时检测循环依赖
+        plan = MomanBuildPlan.from_modules(modules, modular_info.entry_name)
+        if config.plan_only:
+            utils.MomanLogger.info("build plan, entry: %s" % plan.entry_name)
+            for line in plan.format(modules):
+                utils.MomanLogger.info(line)
+            return
+
+        # 在项目的虚拟环境中重新执行, 依赖在虚拟环境创建时已经安装
+        if config.venv_argv is not None and os.environ.get(MOMAN_VENV_ENV, None) is None:
+            python = prepare_venv(path, list(modular_info.packages))
+            exec_in_venv(python, config.venv_argv)
+
+        # 安装 python 库, 依赖没有变化时不会启动 pip
+        install_packages(path, list(modular_info.packages))
 
-        modules = modular_info.modules
         config_map = utils.read_yaml(path.joinpath(constants.MOMAN_CONFIG_NAME))
 
-        wrapper_manager = MomanModuleManagerWrapper(modules, config_map)
-        register_wrapper_manager(wrapper_manager)
-
-        # 加载所有的 interfaces
-        sys.path.append(str(path))
-
-        # 启动 modules
-        MomanBuildHandler.__start_recursive(modules, modular_info.entry_name)
-        entry_module = get_wrapper_manager().get_entry_module(
-            modular_info.entry_name, modular_info.entry_path
-        )
-        entry_module.on_start()
-
-        # 停止 modules
-        MomanBuildHandler.__stop_recursive(modules, modular_info.entry_name)
-        entry_module = get_wrapper_manager().get_entry_module(
-            modular_info.entry_name, modular_info.entry_path
-        )
-        entry_module.on_stop()
-
-    def __install_packages(self, path: Path, modular: MomanModularInfo):
-        requirements_files = path.joinpath(constants.MOMAN_CACHE_FOLDER, "requirements.txt")
-
-        if not requirements_files.exists():
-            utils.write_file(requirements_files, "\n".join(modular.packages))
-            os.system("pip install -r " + str(requirements_files))
-        else:
-            packages_set = set(utils.read_file(requirements_files).splitlines())
-            for package in modular.packages:
-                if package in packages_set:
-                    packages_set.remove(package)
-            if len(packages_set) != 0:
-                packages = " ".join(packages_set)
-                os.system("pip install " + packages)
-                utils.write_file(requirements_files, "\n".join(modular.packages))
-
-    @staticmethod
-    def __start_recursive(
-        modules: Dict[str, Tuple[MomanModuleConfig, Path]], cur_name: str
+        # 整个运行过程只使用一个事件循环, 异步模块的生命周期函数都在其中执行
+        event_loop = MomanEventLoop()
+        timings = MomanBuildTimings()
+        started = False
+        try:
+            wrapper_manager = MomanModuleManagerWrapper(modules, config_map, event_loop, timings)
+            register_wrapper_manager(wrapper_manager)
+
+            # 项目中的其他文件通过 sys.path 加载, 模块实现通过 finder 按照固定名称加载
+            sys.path.append(str(path))
+            MomanModuleFinder(path, modular_info).install()
+
+            # 按照拓扑序启动 modules, 入口模块最后启动
+            runner = MomanBuildRunner(wrapper_manager, modular_info, plan, config.parallel)
+            runner.start()
+            started = True
+
+            if config.watch or config.reload:
+                reloaders: List[MomanConfigReloader | MomanCodeReloader] = []
+                if config.watch:
+                    reloaders.append(MomanConfigReloader(path, wrapper_manager, runner, plan))
+                if config.reload:
+                    reloaders.append(MomanCodeReloader(modular_info, wrapper_manager, runner, plan))
+
+                for reloader in reloaders:
+                    reloader.start()
+                try:
+                    wait_for_interrupt("modules are running, press Ctrl-C to stop")
+                    utils.MomanLogger.info("stopping modules")
+                finally:
+                    for reloader in reloaders:
+                        reloader.stop()
+
+            # 按照相反的顺序停止 modules
+            runner.stop()
+        finally:
+            event_loop.close()
+            self.__save_timings(config, plan, timings, started)
+
+    def __save_timings(
+        self, config: MomanBuildConfig, plan: MomanBuildPlan, timings: MomanBuildTimings, started: bool
     ):
-        module, _ = modules[cur_name]
-        deps = module.dependencies
-        for dep in deps.values():
-            MomanBuildHandler.__start_recursive(modules, dep.implement)
-
-            dep_module_config, _ = modules[dep.implement]
-            module = get_wrapper_manager().get_module(
-                cur_name, dep_module_config.interface, dep.implement
-            )
-            module.on_start()
-
-    @staticmethod
-    def __stop_recursive(
-        modules: Dict[str, Tuple[MomanModuleConfig, Path]],
-        cur_name: str,
-    ):
-        module, _ = modules[cur_name]
-        deps = module.dependencies
-        for dep in deps.values():
-            MomanBuildHandler.__stop_recursive(modules, dep.implement)
-
-            dep_module_config, _ = modules[dep.implement]
-            module = get_wrapper_manager().get_module(
-                cur_name, dep_module_config.interface, dep.implement
-            )
-            module.on_stop()
+        """输出耗时表格以及 trace 文件, 只有全部模块启动成功时才替换上一次的记录
+
+        启动失败时的记录不完整, 保存之后会覆盖上一次完整的记录, 导致之后的比较和 graph 的分析失效
+        """
+        if timings.empty:
+            return
+
+        path = config.path
+        previous = MomanBuildTimings.load_previous(path)
+
+        # 每次成功启动都会记录, 用于和之后的运行结果比较
+        if started:
+            path.joinpath(constants.MOMAN_CACHE_FOLDER).mkdir(exist_ok=True)
+            timings.to_path(path)
+
+        if config.show_timings:
+            for line in timings.format(previous):
+                utils.MomanLogger.info(line)
+
+        if config.trace_file is not None:
+            utils.write_json(config.trace_file, timings.to_trace(plan))
+            utils.MomanLogger.info("trace file saved, path: %s" % config.trace_file)
@@ -0,0 +1,70 @@
+from typing import Any, Callable, Tuple
+from concurrent.futures import Future
+import asyncio
+import inspect
+import threading
+
+from moman.interface import MomanModuleInterface
+
+# 解析结果: 模块对象, 尚未完成的启动任务 (已经启动时为 None)
+MomanLazyTarget = Tuple[MomanModuleInterface, Future | None]
+
+
+class MomanLazyModule:
+    """lazy 模块的代理对象, 第一次访问属性时才创建并启动真正的模块
+
+    代理对象不是接口的子类, 只转发属性访问, 因此不能用于 isinstance 判断。
+    在事件循环中第一次使用异步模块时不能同步等待 on_start, 启动以任务的方式执行,
+    启动完成之前获取到的异步方法会先等待启动完成再调用; 同步属性不会等待
+    """
+
+    __resolver: Callable[[], MomanLazyTarget]
+    __target: MomanModuleInterface | None
+    __starting: Future | None
+    __lock: threading.RLock
+
+    def __init__(self, resolver: Callable[[], MomanLazyTarget]):
+        self.__resolver = resolver
+        self.__target = None
+        self.__starting = None
+        self.__lock = threading.RLock()
+
+    def __getattr__(self, name: str) -> Any:
+        # 只有代理对象自身不存在的属性才会进入这里
+        target, starting = self.__resolve()
+        value = getattr(target, name)
+        if starting is None or not inspect.iscoroutinefunction(value):
+            return value
+
+        async def call_after_started(*args: Any, **kwargs: Any) -> Any:
+            await asyncio.wrap_future(starting)
+            return await value(*args, **kwargs)
+
+        return call_after_started
+
+    def __resolve(self) -> MomanLazyTarget:
+        target = self.__target
+        if target is not None:
+            return target, self.__pending()
+
+        with self.__lock:
+            if self.__target is None:
+                self.__target, self.__starting = self.__resolver()
+            return self.__target, self.__pending()
+
+    def __pending(self) -> Future | None:
+        starting = self.__starting
+        if starting is not None and starting.done() and not starting.cancelled() and starting.exception() is None:
+            self.__starting = starting = None
+        # 启动失败时保留任务, 之后的异步调用都会抛出启动失败的原因
+        return starting
+
+    @staticmethod
+    def reset(proxy: "MomanLazyModule"):
+        """清除已经解析的对象, 下次访问时重新解析
+
+        定义为静态方法并通过类调用, 避免与被代理对象的同名属性冲突
+        """
+        with proxy.__lock:
+            proxy.__target = None
+            proxy.__starting = None
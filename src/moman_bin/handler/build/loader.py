@@ -0,0 +1,66 @@
+from typing import Dict, Sequence
+from importlib.abc import MetaPathFinder
+from importlib.machinery import ModuleSpec
+from pathlib import Path
+from types import ModuleType
+import importlib.util
+import sys
+
+from moman_bin import constants
+from moman_bin.info.modular import MomanModularInfo
+from moman_bin.handler.import_utils import get_module_name
+
+
+class MomanModuleFinder(MetaPathFinder):
+    """根据 modular 信息查找项目中的模块
+
+    模块使用固定的名称 modules.<interface>.<implement> 加载, 与实际的目录结构无关,
+    加载后缓存在 sys.modules 中, 源码文件通过 SourceFileLoader 加载, 会复用 __pycache__ 中的字节码
+    """
+
+    # 模块名称 -> 模块目录
+    __locations: Dict[str, Path]
+
+    def __init__(self, path: Path, modular_info: MomanModularInfo):
+        modules_folder = path.joinpath(constants.MOMAN_MODULES_FOLDER)
+
+        # 父级包在目录中不存在 __init__.py 时作为命名空间包处理
+        self.__locations = {constants.MOMAN_MODULES_FOLDER: modules_folder}
+        for interface_name in modular_info.interfaces:
+            interface_module_name = "%s.%s" % (constants.MOMAN_MODULES_FOLDER, interface_name)
+            self.__locations[interface_module_name] = modules_folder.joinpath(interface_name)
+
+        for name, (module_config, module_path) in modular_info.modules.items():
+            self.__locations[get_module_name(module_config.interface, name)] = module_path
+
+    def find_spec(
+        self, fullname: str, path: Sequence[str] | None, target: ModuleType | None = None
+    ) -> ModuleSpec | None:
+        folder = self.__locations.get(fullname, None)
+        if folder is None:
+            return None
+
+        init_file = folder.joinpath(constants.MOMAN_MODULE_INIT_NAME)
+        if init_file.exists():
+            return importlib.util.spec_from_file_location(
+                fullname, init_file, submodule_search_locations=[str(folder)]
+            )
+
+        spec = ModuleSpec(fullname, None, is_package=True)
+        spec.submodule_search_locations = [str(folder)]
+        return spec
+
+    def install(self):
+        """注册到 sys.meta_path 的最前面, 替换之前注册的 finder"""
+        MomanModuleFinder.uninstall()
+        sys.meta_path.insert(0, self)
+
+    @staticmethod
+    def uninstall():
+        sys.meta_path[:] = [
+            finder for finder in sys.meta_path if not isinstance(finder, MomanModuleFinder)
+        ]
+
+    @property
+    def module_names(self) -> Sequence[str]:
+        return list(self.__locations.keys())
@@ -0,0 +1,70 @@
+from typing import Any, Callable, Coroutine
+from concurrent.futures import Future
+import asyncio
+import inspect
+import threading
+
+from moman_bin.errors import MomanBuildError
+
+
+class MomanEventLoop:
+    """整个运行过程中共享的事件循环, 在独立的线程中运行
+
+    同步代码通过 run / submit 将协程交给事件循环执行, 异步模块之间共享同一个事件循环
+    """
+
+    __loop: asyncio.AbstractEventLoop
+    __thread: threading.Thread
+
+    def __init__(self):
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(
+            target=self.__run_forever, name="moman-event-loop", daemon=True
+        )
+        self.__thread.start()
+
+    def __run_forever(self):
+        asyncio.set_event_loop(self.__loop)
+        self.__loop.run_forever()
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__loop)
+
+    def run(self, coroutine: Coroutine) -> Any:
+        """在事件循环中执行协程并等待结果, 不能在事件循环线程中调用"""
+        if self.in_loop_thread():
+            coroutine.close()
+            raise MomanBuildError("can not wait for a coroutine inside the moman event loop")
+
+        return self.submit(coroutine).result()
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """调用同步或者异步函数, 异步函数会在事件循环中执行"""
+        if inspect.iscoroutinefunction(func):
+            return self.run(func())
+        return func()
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self.__thread
+
+    def close(self):
+        async def cancel_tasks():
+            tasks = [
+                task for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            ]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.__loop.is_closed():
+            return
+
+        self.submit(cancel_tasks()).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self.__loop
@@ -1,20 +1,35 @@
 from pathlib import Path
-from typing import Dict, Tuple, Any, override
+import asyncio
+import inspect
+import threading
+import time
+from typing import Callable, Dict, List, Set, Tuple, Any, override
 from types import NoneType
 
+from moman.config import MomanModuleConfigSnapshot, thaw
 from moman.manager import MomanModuleManager
 from moman.interface import MomanModuleInterface
 
-from moman_bin.info.config.module import MomanModuleConfig, MomanModuleDependency
+from moman_bin.info.config.module import (
+    MomanModuleConfig,
+    MomanModuleDependency,
+    MomanModuleScope,
+)
+from moman_bin import utils
 from moman_bin.errors import MomanBuildError
-from moman_bin.handler.import_utils import import_implement
+from moman_bin.handler.import_utils import get_module_name, import_implement
+
+from .config import build_config_snapshots
+from .lazy import MomanLazyModule, MomanLazyTarget
+from .loop import MomanEventLoop
+from .timings import MomanBuildTimings, MomanModulePhase
 
 
 class MomanModuleContext:
-    __dep_module_object: Dict[str, Any] = {}
+    __dep_module_object: Dict[str, Any]
 
     def __init__(self):
-        pass
+        self.__dep_module_object = {}
 
     def save_implement(self, implement_name: str, implement: Any):
         self.__dep_module_object[implement_name] = implement
@@ -23,24 +38,108 @@ class MomanModuleContext:
     def get_implement(self, implement_name: str) -> Any | NoneType:
         return self.__dep_module_object.get(implement_name, None)
 
+    def remove_implement(self, implement_name: str):
+        self.__dep_module_object.pop(implement_name, None)
+
 
 class MomanModuleManagerWrapper(MomanModuleManager):
     # 当前项目的模块依赖配置
     __module_config_map: Dict[str, Tuple[MomanModuleConfig, Path]] = {}
 
     # 当对象被创建之后，用于缓存在起来，不会重复创建
-    __module_contexts: Dict[str, MomanModuleContext] = {}
+    # singleton 作用域的对象缓存在 __singletons 中, per-dependent 作用域的对象按照父模块缓存
+    __module_contexts: Dict[str, MomanModuleContext]
+    __singletons: MomanModuleContext
+
+    # 已经加载的模块实现类, 避免重复执行模块文件
+    __implement_types: Dict[str, type]
+
+    # transient 作用域的对象在创建时启动, 记录下来用于统一停止
+    __transients: List[MomanModuleInterface]
+
+    # 模块可能在多个线程中并行启动, 创建对象时需要加锁
+    __lock: threading.RLock
+
+    # lazy 模块名称, 获取这些模块时返回代理对象
+    __lazy_names: Set[str]
+    # lazy 模块的代理对象缓存, key 与实际对象的缓存方式保持一致
+    __lazy_proxies: Dict[Tuple[str, str], MomanLazyModule]
+    # 代理对象第一次被使用时调用, 负责创建并启动实际的模块
+    __lazy_resolver: Callable[[str, str], MomanLazyTarget] | NoneType
+
+    # 整个运行过程共享的事件循环
+    __event_loop: MomanEventLoop
+
+    # 记录模块导入、构造以及生命周期函数的耗时
+    __timings: MomanBuildTimings
+
+    # 校验之后的配置快照, 每个模块一个
+    __configs: Dict[str, MomanModuleConfigSnapshot]
 
-    # 配置文件 map
-    __config_map: Dict[str, Dict[str, Any]]
+    # 依赖解析索引 (父模块 implement, 子模块 interface) -> {子模块 implement: 依赖}
+    # 其中 None 对应未指定 implement 时的默认依赖, 只有依赖唯一时才存在
+    __dep_index: Dict[Tuple[str, str], Dict[str | NoneType, MomanModuleDependency]]
 
     def __init__(
         self,
-        module_config_map: Dict[str, MomanModuleConfig],
+        module_config_map: Dict[str, Tuple[MomanModuleConfig, Path]],
         config_map: Dict[str, Dict[str, Any]],
+        event_loop: MomanEventLoop,
+        timings: MomanBuildTimings | NoneType = None,
     ):
         self.__module_config_map = module_config_map
-        self.__config_map = config_map
+        # 构建时一次性校验所有模块的配置
+        self.__configs = build_config_snapshots(module_config_map, config_map)
+        self.__event_loop = event_loop
+        self.__timings = timings if timings is not None else MomanBuildTimings()
+        self.__lazy_names = {
+            name for name, (module_config, _) in module_config_map.items() if module_config.lazy
+        }
+        self.__lazy_proxies = {}
+        self.__lazy_resolver = None
+        self.__module_contexts = {}
+        self.__singletons = MomanModuleContext()
+        self.__implement_types = {}
+        self.__transients = []
+        self.__lock = threading.RLock()
+        self.__dep_index = MomanModuleManagerWrapper.__build_dep_index(module_config_map)
+
+    @staticmethod
+    def __build_dep_index(
+        module_config_map: Dict[str, Tuple[MomanModuleConfig, Path]]
+    ) -> Dict[Tuple[str, str], Dict[str | NoneType, MomanModuleDependency]]:
+        dep_index: Dict[Tuple[str, str], Dict[str | NoneType, MomanModuleDependency]] = {}
+
+        # 一次性收集所有缺失的依赖, 统一报错
+        missing_deps = []
+        for p_implement, (module_config, _) in module_config_map.items():
+            for dep in module_config.dependencies.values():
+                # dep 不保存 interface 信息, 因此需要反查获取
+                dep_module = module_config_map.get(dep.implement, None)
+                if dep_module is None:
+                    missing_deps.append("%s -> %s" % (p_implement, dep.implement))
+                    continue
+
+                dep_module_config, _ = dep_module
+                dep_index.setdefault(
+                    (p_implement, dep_module_config.interface), {}
+                )[dep.implement] = dep
+
+        if len(missing_deps) > 0:
+            raise MomanBuildError(
+                "dependency module not found: %s" % ", ".join(missing_deps)
+            )
+
+        for (p_implement, c_interface), dep_map in dep_index.items():
+            if len(dep_map) == 1:
+                dep_map[None] = list(dep_map.values())[0]
+            else:
+                utils.MomanLogger.debug(
+                    "module %s has multiple implements of %s, implement must be specified: %s"
+                    % (p_implement, c_interface, ", ".join(dep_map.keys()))
+                )
+
+        return dep_index
 
     @override
     def get_module(
@@ -49,48 +148,123 @@ class MomanModuleManagerWrapper(MomanModuleManager):
         c_interface: str,
         c_implement: str | NoneType = None,
     ) -> MomanModuleInterface:
-        # 1. 校验父模块是否合法
-        module_config, _ = self.__module_config_map.get(p_implement, None)
-        if module_config is None:
-            raise MomanBuildError(
-                "current module is invalid, name: %s" % (p_implement)
-            )
-
-        # 2. 自动获取子模块的实现类型
-        dep_map: Dict[str, MomanModuleDependency] = {}
-        for dep in module_config.dependencies.values():
-            # dep 不保存 interface 信息, 因此需要反查获取
-            dep_module_config, _ = self.__module_config_map[dep.implement]
-            if c_interface == dep_module_config.interface:
-                dep_map[dep.implement] = dep
-
+        dep_map = self.__dep_index.get((p_implement, c_interface), None)
         dep: MomanModuleDependency | NoneType = None
-        if c_implement is None:
-            if len(dep_map) == 1:
-                dep = list(dep_map.values())[0]
-            elif len(dep_map) > 1:
-                raise MomanBuildError("the implement is ambiguous")
-        else:
+        if dep_map is not None:
             dep = dep_map.get(c_implement, None)
 
         if dep is None:
+            # 只在出错时才区分具体的错误原因
+            if p_implement not in self.__module_config_map:
+                raise MomanBuildError(
+                    "current module is invalid, name: %s" % (p_implement)
+                )
+            if c_implement is None and dep_map is not None:
+                raise MomanBuildError("the implement is ambiguous")
+
             raise MomanBuildError(
                 "module not found, interface: %s, implement: %s"
                 % (c_interface, c_implement)
             )
 
+        if dep.implement in self.__lazy_names and self.__lazy_resolver is not None:
+            return self.__get_lazy_proxy(p_implement, dep)
+
         return self.__inner_get_module(p_implement, dep)
 
+    def resolve_module(self, p_implement: str, c_implement: str) -> MomanModuleInterface:
+        """获取实际的模块对象, 不经过 lazy 代理
+
+        Args:
+            p_implement (str): 父模块名称
+            c_implement (str): 依赖的模块名称
+        """
+        module_config, _ = self.__module_config_map[p_implement]
+        return self.__inner_get_module(p_implement, module_config.dependencies[c_implement])
+
+    def set_lazy_resolver(self, resolver: Callable[[str, str], MomanLazyTarget]):
+        self.__lazy_resolver = resolver
+
+    def __get_lazy_proxy(
+        self, p_implement: str, dep: MomanModuleDependency
+    ) -> MomanModuleInterface:
+        resolver = self.__lazy_resolver
+        c_implement = dep.implement
+
+        def resolve() -> MomanLazyTarget:
+            return resolver(p_implement, c_implement)
+
+        module_config, _ = self.__module_config_map[c_implement]
+        match module_config.scope:
+            case MomanModuleScope.Singleton:
+                key = ("", c_implement)
+            case MomanModuleScope.PerDependent:
+                key = (p_implement, c_implement)
+            case _:
+                # transient 模块每次获取都对应一个新的对象
+                return MomanLazyModule(resolve)
+
+        proxy = self.__lazy_proxies.get(key, None)
+        if proxy is None:
+            with self.__lock:
+                proxy = self.__lazy_proxies.setdefault(key, MomanLazyModule(resolve))
+
+        return proxy
+
     @override
     def get_config(self, implement: str, key: str, default: Any | NoneType) -> Any:
-        module_config = self.__module_config_map.get(implement, None)
-        if module_config is None:
+        config = self.get_config_snapshot(implement)
+        return thaw(config[key]) if key in config else default
+
+    @override
+    def get_config_snapshot(self, implement: str) -> MomanModuleConfigSnapshot:
+        config = self.__configs.get(implement, None)
+        if config is None:
             raise MomanBuildError(
                 "current module is invalid, %s" % implement
             )
 
-        return self.__config_map.get(implement, {}).get(key, default)
+        return config
+
+    def update_config_map(self, config_map: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+        """校验新的配置并替换所有模块的配置快照, 校验失败时保持原有配置
+
+        Args:
+            config_map (Dict[str, Dict[str, Any]]): config.yaml 的内容
+
+        Returns:
+            Dict[str, List[str]]: 配置发生变化的模块 -> 变化的配置项
+        """
+        configs = build_config_snapshots(self.__module_config_map, config_map)
+
+        changes: Dict[str, List[str]] = {}
+        for name, config in configs.items():
+            old_config = self.__configs.get(name, None)
+            if old_config is None:
+                continue
+            changed_keys = sorted(
+                key for key in set(config) | set(old_config)
+                if key not in config or key not in old_config or config[key] != old_config[key]
+            )
+            if len(changed_keys) > 0:
+                changes[name] = changed_keys
+
+        self.__configs = configs
+        return changes
+
+    @override
+    def get_event_loop(self) -> asyncio.AbstractEventLoop:
+        return self.__event_loop.loop
+
+    @property
+    def event_loop(self) -> MomanEventLoop:
+        return self.__event_loop
+
+    @property
+    def timings(self) -> MomanBuildTimings:
+        return self.__timings
 
+    @override
     def get_entry_module(
         self, entry_name: str, entry_path: Path
     ) -> MomanModuleInterface:
@@ -101,29 +275,122 @@ class MomanModuleManagerWrapper(MomanModuleManager):
     def __inner_get_module(
         self, p_implement_name: str, dep: MomanModuleDependency
     ) -> MomanModuleInterface:
-        # 1. 从缓存中读取
-        module_context = self.__module_contexts.get(p_implement_name, None)
+        # 1. 根据作用域从缓存中读取
+        module_config, _ = self.__module_config_map[dep.implement]
+        scope = module_config.scope
+
+        module_context: MomanModuleContext | NoneType = None
+        match scope:
+            case MomanModuleScope.Singleton:
+                module_context = self.__singletons
+            case MomanModuleScope.PerDependent:
+                module_context = self.__module_contexts.get(p_implement_name, None)
 
         if module_context is not None:
             implement = module_context.get_implement(dep.implement)
             if implement is not None:
                 return implement
 
-        # 2. 通过文件读取
-        implement_file = dep.path.joinpath("__init__.py")
-        implement_t: MomanModuleInterface | NoneType = import_implement(
-            implement_file, dep.implement
-        )
+        with self.__lock:
+            implement_c = self.__inner_create_module(p_implement_name, dep, scope)
+        if scope != MomanModuleScope.Transient:
+            return implement_c
+
+        # transient 对象不在启动计划中, 获取时直接启动
+        # 启动时不能持有锁: 异步模块的 on_start 在事件循环线程中执行, 其中可能再次获取模块
+        if self.__event_loop.in_loop_thread() and inspect.iscoroutinefunction(implement_c.on_start):
+            # 事件循环中不能同步等待启动, 以任务的方式启动并返回代理对象, 异步方法会等待启动完成
+            starting = self.__event_loop.submit(self.__start_transient(implement_c))
+            return MomanLazyModule(lambda: (implement_c, starting))
+
+        with self.__timings.measure(dep.implement, MomanModulePhase.Start):
+            self.__event_loop.call(implement_c.on_start)
+        with self.__lock:
+            self.__transients.append(implement_c)
+
+        return implement_c
+
+    async def __start_transient(self, implement_c: MomanModuleInterface):
+        name = implement_c.implement_name
+        begin = time.perf_counter()
+        try:
+            await implement_c.on_start()
+        finally:
+            self.__timings.record(name, MomanModulePhase.Start, begin, time.perf_counter(), "async " + name)
+
+        with self.__lock:
+            self.__transients.append(implement_c)
+
+    def __inner_create_module(
+        self, p_implement_name: str, dep: MomanModuleDependency, scope: MomanModuleScope
+    ) -> MomanModuleInterface:
+        module_context: MomanModuleContext | NoneType = None
+        match scope:
+            case MomanModuleScope.Singleton:
+                module_context = self.__singletons
+            case MomanModuleScope.PerDependent:
+                module_context = self.__module_contexts.setdefault(
+                    p_implement_name, MomanModuleContext()
+                )
+
+        # 加锁之后再次检查, 避免其他线程已经创建
+        if module_context is not None:
+            implement = module_context.get_implement(dep.implement)
+            if implement is not None:
+                return implement
 
+        # 2. 通过 import 机制加载, 模块文件只会执行一次
+        implement_t = self.__implement_types.get(dep.implement, None)
         if implement_t is None:
-            raise MomanBuildError(
-                "module %s class not found, path: %s" % (dep.implement, implement_file)
-            )
+            module_config, _ = self.__module_config_map[dep.implement]
+            module_name = get_module_name(module_config.interface, dep.implement)
+            with self.__timings.measure(dep.implement, MomanModulePhase.Import):
+                implement_t = import_implement(module_name, dep.implement)
+
+            if implement_t is None:
+                raise MomanBuildError(
+                    "module %s class not found, module: %s, path: %s"
+                    % (dep.implement, module_name, dep.path)
+                )
+            self.__implement_types[dep.implement] = implement_t
 
         # 构造函数通过代码自动生成处理，不需要额外传参
-        implement_c = implement_t()
-        self.__module_contexts.setdefault(
-            p_implement_name, MomanModuleContext()
-        ).save_implement(dep.implement, implement_c)
+        with self.__timings.measure(dep.implement, MomanModulePhase.Construct):
+            implement_c = implement_t()
+        if module_context is not None:
+            module_context.save_implement(dep.implement, implement_c)
 
         return implement_c
+
+    def unload_modules(self, names: Set[str]):
+        """丢弃模块已经加载的实现类以及缓存的对象, 下次获取时重新导入并创建
+
+        Args:
+            names (Set[str]): 模块名称
+        """
+        with self.__lock:
+            for name in names:
+                self.__implement_types.pop(name, None)
+                self.__singletons.remove_implement(name)
+                for module_context in self.__module_contexts.values():
+                    module_context.remove_implement(name)
+
+    def reset_lazy_proxies(self, names: Set[str]):
+        """已经发出的代理对象在下次访问时重新解析, 用于模块被重启或者重新加载之后"""
+        with self.__lock:
+            for (_, name), proxy in self.__lazy_proxies.items():
+                if name in names:
+                    MomanLazyModule.reset(proxy)
+
+    @property
+    def transients(self) -> List[MomanModuleInterface]:
+        """已经启动并且尚未停止的 transient 对象"""
+        with self.__lock:
+            return list(self.__transients)
+
+    def pop_transients(self) -> List[MomanModuleInterface]:
+        """取出所有已经启动的 transient 对象, 按照创建顺序排列"""
+        with self.__lock:
+            transients = self.__transients
+            self.__transients = []
+        return transients
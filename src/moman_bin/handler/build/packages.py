@@ -0,0 +1,211 @@
+from typing import Dict, List, Tuple
+from types import NoneType
+from pathlib import Path
+import hashlib
+import importlib.metadata
+import re
+import subprocess
+import sys
+
+from moman_bin import constants, utils
+from moman_bin.errors import MomanBuildError
+
+# 优先使用 packaging 解析依赖描述, 不可用时只处理常见的版本约束, 无法判断的依赖交给 pip 处理
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+    from packaging.version import InvalidVersion
+except ImportError:
+    Requirement = None
+
+MOMAN_PACKAGES_STATE_VERSION = 1
+
+# 依赖名称, 版本约束, 环境标记
+__requirement_pattern = re.compile(
+    r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*([^;]*?)\s*(;.*)?$"
+)
+__specifier_pattern = re.compile(r"^\s*(===|==|!=|<=|>=|~=|<|>)\s*([A-Za-z0-9.*+!_-]+)\s*$")
+
+
+def normalize_name(name: str) -> str:
+    """按照 PEP 503 规范化库名称"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def normalize_requirements(packages: List[str]) -> List[str]:
+    """规范化依赖列表: 去除空白和注释, 规范化库名称, 去重并排序"""
+    requirements: Dict[str, NoneType] = {}
+    for package in packages:
+        package = package.split("#", 1)[0].strip()
+        if len(package) == 0:
+            continue
+
+        # 只规范化能够识别的格式, url 等其他格式保持原样
+        match = __requirement_pattern.match(package)
+        if match is not None:
+            name, extras, specifiers, marker = match.groups()
+            parts = [spec.strip() for spec in specifiers.split(",") if len(spec.strip()) > 0]
+            if all(__specifier_pattern.match(spec) is not None for spec in parts):
+                package = normalize_name(name) + (extras or "").replace(" ", "") \
+                    + ",".join(spec.replace(" ", "") for spec in parts) \
+                    + (";" + marker[1:].strip() if marker is not None else "")
+
+        requirements[package] = None
+
+    return sorted(requirements.keys())
+
+
+def requirement_satisfied(requirement: str) -> bool:
+    """通过 importlib.metadata 判断当前环境中是否已经安装了满足要求的版本
+
+    无法判断时返回 False, 交给 pip 处理
+    """
+    if Requirement is not None:
+        try:
+            parsed = Requirement(requirement)
+        except InvalidRequirement:
+            return False
+
+        if parsed.marker is not None and not parsed.marker.evaluate():
+            return True
+        if parsed.url is not None:
+            return False
+
+        installed = __installed_version(parsed.name)
+        if installed is None:
+            return False
+        try:
+            return parsed.specifier.contains(installed, prereleases=True)
+        except InvalidVersion:
+            return False
+
+    match = __requirement_pattern.match(requirement)
+    if match is None:
+        return False
+
+    name, _, specifiers, marker = match.groups()
+    if marker is not None:
+        return False
+
+    installed = __installed_version(name)
+    if installed is None:
+        return False
+
+    for specifier in specifiers.split(","):
+        if len(specifier.strip()) == 0:
+            continue
+        if not __simple_specifier_contains(specifier, installed):
+            return False
+
+    return True
+
+
+def __installed_version(name: str) -> str | NoneType:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def __parse_release(version: str) -> Tuple[int, ...] | NoneType:
+    # 只处理纯数字的版本号, 预发布等复杂版本交给 pip 判断
+    if re.fullmatch(r"\d+(\.\d+)*", version) is None:
+        return None
+    release = [int(part) for part in version.split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    return tuple(release)
+
+
+def __simple_specifier_contains(specifier: str, installed: str) -> bool:
+    match = __specifier_pattern.match(specifier)
+    if match is None:
+        return False
+
+    operator, version = match.groups()
+    if operator == "===":
+        return installed == version
+
+    if operator in ("==", "!=") and version.endswith(".*"):
+        prefix = __parse_release(version[:-2])
+        current = __parse_release(installed)
+        if prefix is None or current is None:
+            return False
+        padded = current + (0,) * max(0, len(prefix) - len(current))
+        matched = padded[:len(prefix)] == prefix
+        return matched if operator == "==" else not matched
+
+    expected = __parse_release(version)
+    current = __parse_release(installed)
+    if expected is None or current is None:
+        return False
+
+    match operator:
+        case "==":
+            return current == expected
+        case "!=":
+            return current != expected
+        case "<=":
+            return current <= expected
+        case ">=":
+            return current >= expected
+        case "<":
+            return current < expected
+        case ">":
+            return current > expected
+        case "~=":
+            # ~=1.4.5 等价于 >=1.4.5, ==1.4.*
+            parts = version.split(".")
+            if len(parts) < 2:
+                return False
+            prefix = tuple(int(part) for part in parts[:-1])
+            padded = current + (0,) * max(0, len(prefix) - len(current))
+            return current >= expected and padded[:len(prefix)] == prefix
+
+    return False
+
+
+def requirements_digest(requirements: List[str]) -> str:
+    # 不同的解释器需要分别检查
+    data = "\n".join([sys.executable] + requirements)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def install_packages(path: Path, packages: List[str]):
+    """安装项目依赖的 python 库
+
+    依赖列表没有变化时直接跳过, 否则只安装当前环境中缺失或者版本不满足的库
+
+    Args:
+        path (Path): 项目路径
+        packages (List[str]): 所有模块依赖的 python 库
+    """
+    requirements = normalize_requirements(packages)
+    digest = requirements_digest(requirements)
+
+    state_file = path.joinpath(constants.MOMAN_PACKAGES_STATE_FILE)
+    if state_file.exists():
+        try:
+            state = utils.read_json(state_file)
+        except ValueError:
+            state = None
+        if isinstance(state, dict) and state.get("version", None) == MOMAN_PACKAGES_STATE_VERSION \
+                and state.get("hash", None) == digest:
+            utils.MomanLogger.debug("python packages unchanged, skip pip")
+            return
+
+    missing = [requirement for requirement in requirements if not requirement_satisfied(requirement)]
+    if len(missing) > 0:
+        utils.MomanLogger.info("install python packages: %s" % " ".join(missing))
+        result = subprocess.run([sys.executable, "-m", "pip", "install", *missing])
+        if result.returncode != 0:
+            raise MomanBuildError(
+                "pip install failed, exit code: %d, packages: %s" % (result.returncode, " ".join(missing))
+            )
+
+    path.joinpath(constants.MOMAN_CACHE_FOLDER).mkdir(exist_ok=True)
+    utils.write_file(
+        path.joinpath(constants.MOMAN_REQUIREMENTS_FILE), "".join(r + "\n" for r in requirements)
+    )
+    utils.write_json(state_file, {
+        "version": MOMAN_PACKAGES_STATE_VERSION, "hash": digest, "requirements": requirements,
+    })
@@ -0,0 +1,222 @@
+from typing import Dict, List, Set, Tuple
+from pathlib import Path
+
+from moman_bin.info.config.module import MomanModuleConfig
+from moman_bin.errors import MomanBuildError
+
+
+class MomanBuildPlan:
+    """模块启动计划, 从入口模块开始计算一次拓扑序, 依赖模块总是排在被依赖模块之前"""
+
+    __entry_name: str
+    # 启动顺序, 入口模块位于最后
+    __order: List[str]
+    # implement -> 依赖该模块的父模块列表, 按照启动顺序排列
+    __dependents: Dict[str, List[str]]
+    # implement -> 依赖的模块列表
+    __dependencies: Dict[str, List[str]]
+    # 按照依赖层级对入口以外的模块分组, 同一层的模块之间没有依赖关系
+    __layers: List[List[str]]
+    # implement -> 依赖层级, 入口模块位于最高层
+    __levels: Dict[str, int]
+
+    def __init__(
+        self, entry_name: str, order: List[str],
+        dependents: Dict[str, List[str]], dependencies: Dict[str, List[str]]
+    ):
+        self.__entry_name = entry_name
+        self.__order = order
+        self.__dependents = dependents
+        self.__dependencies = dependencies
+
+        # 没有依赖的模块位于第 0 层, 其余模块位于所有依赖的下一层
+        levels: Dict[str, int] = {}
+        self.__levels = levels
+        self.__layers = []
+        for name in order:
+            level = max((levels[dep] + 1 for dep in dependencies[name]), default=0)
+            levels[name] = level
+            if name == entry_name:
+                continue
+
+            while len(self.__layers) <= level:
+                self.__layers.append([])
+            self.__layers[level].append(name)
+
+    @staticmethod
+    def from_modules(
+        modules: Dict[str, Tuple[MomanModuleConfig, Path]], entry_name: str
+    ) -> "MomanBuildPlan":
+        """通过深度优先遍历计算后序序列, 同时检测循环依赖
+
+        Args:
+            modules (Dict[str, Tuple[MomanModuleConfig, Path]]): 项目中的所有模块
+            entry_name (str): 入口模块名称
+
+        Returns:
+            MomanBuildPlan: 启动计划
+        """
+        if entry_name not in modules:
+            raise MomanBuildError("entry module not found, name: %s" % entry_name)
+
+        order: List[str] = []
+        dependencies: Dict[str, List[str]] = {}
+        # 0: 未访问, 1: 访问中, 2: 已完成
+        states: Dict[str, int] = {}
+
+        # 使用显式栈, 避免依赖层级过深时超出递归深度
+        stack: List[Tuple[str, List[str]]] = []
+
+        def push(name: str):
+            module_config, _ = modules[name]
+            deps = list(module_config.dependencies.keys())
+            for dep in deps:
+                if dep not in modules:
+                    raise MomanBuildError(
+                        "dependency module not found: %s -> %s" % (name, dep)
+                    )
+
+            dependencies[name] = deps
+            states[name] = 1
+            # 逆序入栈, 保证按照声明顺序访问依赖
+            stack.append((name, list(reversed(deps))))
+
+        push(entry_name)
+        while len(stack) > 0:
+            name, pending = stack[-1]
+            if len(pending) == 0:
+                stack.pop()
+                states[name] = 2
+                order.append(name)
+                continue
+
+            dep = pending.pop()
+            match states.get(dep, 0):
+                case 0:
+                    push(dep)
+                case 1:
+                    # 从栈中截取出完整的循环路径
+                    names = [item[0] for item in stack]
+                    cycle = names[names.index(dep):] + [dep]
+                    raise MomanBuildError(
+                        "dependency cycle found: %s" % " -> ".join(cycle)
+                    )
+
+        dependents: Dict[str, List[str]] = {name: [] for name in order}
+        for name in order:
+            for dep in dependencies[name]:
+                dependents[dep].append(name)
+
+        return MomanBuildPlan(entry_name, order, dependents, dependencies)
+
+    def eager_modules(self, modules: Dict[str, Tuple[MomanModuleConfig, Path]]) -> Set[str]:
+        """计算启动时需要立即创建的模块
+
+        从入口出发遍历依赖, 遇到 lazy 模块时停止, 只能通过 lazy 模块访问到的模块会在使用时再创建
+
+        Args:
+            modules (Dict[str, Tuple[MomanModuleConfig, Path]]): 项目中的所有模块
+
+        Returns:
+            Set[str]: 需要立即创建的模块名称
+        """
+        eager: Set[str] = {self.__entry_name}
+        pending: List[str] = [self.__entry_name]
+        while len(pending) > 0:
+            name = pending.pop()
+            for dep in self.__dependencies[name]:
+                module_config, _ = modules[dep]
+                if dep in eager or module_config.lazy:
+                    continue
+                eager.add(dep)
+                pending.append(dep)
+
+        return eager
+
+    def dependents_closure(self, names: Set[str]) -> List[str]:
+        """计算指定模块以及直接或者间接依赖它们的所有模块
+
+        Args:
+            names (Set[str]): 模块名称
+
+        Returns:
+            List[str]: 受影响的模块, 按照启动顺序排列
+        """
+        affected: Set[str] = set()
+        pending: List[str] = [name for name in names if name in self.__dependents]
+        while len(pending) > 0:
+            name = pending.pop()
+            if name in affected:
+                continue
+            affected.add(name)
+            pending.extend(self.__dependents[name])
+
+        return [name for name in self.__order if name in affected]
+
+    def critical_path(self, weights: Dict[str, float]) -> Tuple[List[str], float]:
+        """计算从入口出发权重最大的依赖链
+
+        Args:
+            weights (Dict[str, float]): 每个模块的权重, 例如启动耗时, 缺失时视为 0
+
+        Returns:
+            Tuple[List[str], float]: 依赖链 (从入口到叶子模块), 总权重
+        """
+        costs: Dict[str, float] = {}
+        nexts: Dict[str, str | None] = {}
+        for name in self.__order:
+            best_dep: str | None = None
+            for dep in self.__dependencies[name]:
+                if best_dep is None or costs[dep] > costs[best_dep]:
+                    best_dep = dep
+
+            nexts[name] = best_dep
+            costs[name] = weights.get(name, 0.0) + (costs[best_dep] if best_dep is not None else 0.0)
+
+        path: List[str] = []
+        name: str | None = self.__entry_name
+        while name is not None:
+            path.append(name)
+            name = nexts[name]
+
+        return path, costs[self.__entry_name]
+
+    def format(self, modules: Dict[str, Tuple[MomanModuleConfig, Path]]) -> List[str]:
+        lines: List[str] = []
+        width = max(len(name) for name in self.__order)
+        for index, name in enumerate(self.__order):
+            module_config, _ = modules[name]
+            line = "%3d. %s  (%s, %s%s)" % (
+                index + 1, name.ljust(width), module_config.interface, module_config.scope.value,
+                ", lazy" if module_config.lazy else ""
+            )
+            deps = self.__dependencies[name]
+            if len(deps) > 0:
+                line += " <- " + ", ".join(deps)
+            lines.append(line)
+
+        return lines
+
+    @property
+    def entry_name(self) -> str:
+        return self.__entry_name
+
+    @property
+    def order(self) -> List[str]:
+        return self.__order
+
+    @property
+    def dependents(self) -> Dict[str, List[str]]:
+        return self.__dependents
+
+    @property
+    def dependencies(self) -> Dict[str, List[str]]:
+        return self.__dependencies
+
+    @property
+    def layers(self) -> List[List[str]]:
+        return self.__layers
+
+    @property
+    def levels(self) -> Dict[str, int]:
+        return self.__levels
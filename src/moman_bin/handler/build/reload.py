@@ -0,0 +1,189 @@
+from typing import Dict, List, Set
+from pathlib import Path
+import functools
+
+import yaml
+
+from moman.interface import MomanModuleInterface
+
+from moman_bin import constants, utils
+from moman_bin.errors import MomanBinError
+from moman_bin.handler.import_utils import get_module_name, unload_module
+from moman_bin.handler.watch_utils import MomanFileWatcher
+from moman_bin.info.modular import MomanModularInfo
+
+from .manger import MomanModuleManagerWrapper
+from .plan import MomanBuildPlan
+from .runner import MomanBuildRunner
+
+
+class MomanConfigReloader:
+    """监听 config.yaml, 变化时只处理配置发生变化的模块
+
+    实现了 on_config_change 的模块直接收到变化的配置项,
+    其余模块连同依赖它们的模块一起在原有对象上重启, 入口模块只会收到 on_config_change
+    """
+
+    __config_file: Path
+    __manager: MomanModuleManagerWrapper
+    __runner: MomanBuildRunner
+    __plan: MomanBuildPlan
+    __watcher: MomanFileWatcher
+
+    def __init__(
+        self, path: Path, manager: MomanModuleManagerWrapper,
+        runner: MomanBuildRunner, plan: MomanBuildPlan, interval: float = 0.5
+    ):
+        self.__config_file = path.joinpath(constants.MOMAN_CONFIG_NAME)
+        self.__manager = manager
+        self.__runner = runner
+        self.__plan = plan
+        self.__watcher = MomanFileWatcher([self.__config_file], lambda _: self.reload(), interval)
+
+    def start(self):
+        self.__watcher.start()
+        utils.MomanLogger.info("watching config, path: %s" % self.__config_file)
+
+    def stop(self):
+        self.__watcher.stop()
+
+    def reload(self) -> Dict[str, List[str]]:
+        """重新读取 config.yaml 并应用到运行中的模块, 配置无效时保持原有配置
+
+        Returns:
+            Dict[str, List[str]]: 配置发生变化的模块 -> 变化的配置项
+        """
+        try:
+            config_map = utils.read_yaml(self.__config_file)
+            changes = self.__manager.update_config_map(config_map)
+        except (MomanBinError, yaml.YAMLError, OSError) as e:
+            utils.MomanLogger.error("config not reloaded, keep the current config: %s" % e)
+            return {}
+
+        if len(changes) == 0:
+            utils.MomanLogger.debug("config reloaded, nothing changed")
+            return changes
+
+        runner = self.__runner
+        restarts: List[str] = []
+        notifies: Dict[str, List[MomanModuleInterface]] = {}
+        for name, changed_keys in changes.items():
+            modules = runner.started_instances(name)
+            for module in modules:
+                module.reset_config()
+            if len(modules) == 0:
+                # 尚未启动的 lazy 模块在启动时读取新的配置
+                continue
+
+            utils.MomanLogger.info("config changed, module: %s, keys: %s" % (name, ", ".join(changed_keys)))
+            if name == self.__plan.entry_name or all(MomanConfigReloader.has_hook(module) for module in modules):
+                notifies[name] = modules
+            else:
+                restarts.append(name)
+
+        # 入口模块不会被重启, 尚未启动的 lazy 模块不需要重启
+        restart_names = [
+            name for name in self.__plan.dependents_closure(set(restarts))
+            if name != self.__plan.entry_name and len(runner.started_instances(name)) > 0
+        ]
+        if len(restart_names) > 0:
+            utils.MomanLogger.info("restart modules: %s" % ", ".join(restart_names))
+            runner.restart(restart_names)
+
+        event_loop = self.__manager.event_loop
+        for name, modules in notifies.items():
+            # 已经随依赖一起重启的模块不需要再通知
+            if name in restart_names:
+                continue
+            for module in modules:
+                try:
+                    event_loop.call(functools.partial(module.on_config_change, changes[name]))
+                except BaseException as e:
+                    utils.MomanLogger.error("module %s on_config_change failed: %s" % (name, e))
+
+        return changes
+
+    @staticmethod
+    def has_hook(module: MomanModuleInterface) -> bool:
+        return type(module).on_config_change is not MomanModuleInterface.on_config_change
+
+
+class MomanCodeReloader:
+    """监听模块实现所在的目录, 文件变化时只重新加载修改过的模块
+
+    修改过的模块以及依赖它们的模块按照依赖层级逆序停止, 修改过的模块重新导入并创建新的对象,
+    之后按照依赖层级重新启动, 依赖方通过 manager 获取到新的对象; 入口模块和接口文件的修改需要重新运行 build
+    """
+
+    __modular_info: MomanModularInfo
+    __manager: MomanModuleManagerWrapper
+    __runner: MomanBuildRunner
+    __plan: MomanBuildPlan
+    # 实现名称 -> 模块目录
+    __folders: Dict[str, Path]
+    __watcher: MomanFileWatcher
+
+    def __init__(
+        self, modular_info: MomanModularInfo, manager: MomanModuleManagerWrapper,
+        runner: MomanBuildRunner, plan: MomanBuildPlan, interval: float = 0.5
+    ):
+        self.__modular_info = modular_info
+        self.__manager = manager
+        self.__runner = runner
+        self.__plan = plan
+        self.__folders = {
+            name: folder for name, (_, folder) in modular_info.modules.items() if name in plan.levels
+        }
+        self.__watcher = MomanFileWatcher(list(self.__folders.values()), self.reload, interval)
+
+    def start(self):
+        self.__watcher.start()
+        utils.MomanLogger.info("watching module sources, modules: %d" % len(self.__folders))
+
+    def stop(self):
+        self.__watcher.stop()
+
+    def reload(self, changed_files: List[Path]) -> List[str]:
+        """重新加载文件发生变化的模块
+
+        Args:
+            changed_files (List[Path]): 发生变化的文件
+
+        Returns:
+            List[str]: 被停止并重新启动的模块, 按照启动顺序排列
+        """
+        plan = self.__plan
+        modified: Set[str] = set()
+        for file in changed_files:
+            for name, folder in self.__folders.items():
+                if not file.is_relative_to(folder):
+                    continue
+
+                if file.name == constants.MOMAN_MODULE_CONFIG_NAME:
+                    utils.MomanLogger.warn(
+                        "%s of %s changed, run modular and build again to apply it"
+                        % (constants.MOMAN_MODULE_CONFIG_NAME, name)
+                    )
+                elif name == plan.entry_name:
+                    utils.MomanLogger.warn("entry module %s changed, build again to apply it" % name)
+                else:
+                    modified.add(name)
+
+        if len(modified) == 0:
+            return []
+
+        names = [name for name in plan.dependents_closure(modified) if name != plan.entry_name]
+        utils.MomanLogger.info(
+            "reload modules: %s, restart: %s" % (", ".join(sorted(modified)), ", ".join(names))
+        )
+
+        modules = self.__modular_info.modules
+
+        def unload():
+            self.__manager.unload_modules(modified)
+            for name in modified:
+                module_config, _ = modules[name]
+                unload_module(get_module_name(module_config.interface, name))
+
+        self.__runner.reload(names, unload)
+        return names
@@ -0,0 +1,462 @@
+from typing import Any, Callable, ContextManager, Dict, List, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_EXCEPTION
+from contextlib import nullcontext
+import asyncio
+import inspect
+import threading
+import time
+
+from moman.interface import MomanModuleInterface
+
+from moman_bin import utils
+from moman_bin.info.modular import MomanModularInfo
+from moman_bin.info.config.module import MomanModuleScope
+
+from .lazy import MomanLazyTarget
+from .manger import MomanModuleManagerWrapper
+from .plan import MomanBuildPlan
+from .timings import MomanModulePhase
+
+
+class MomanBuildRunner:
+    """按照启动计划管理模块的生命周期"""
+
+    __manager: MomanModuleManagerWrapper
+    __modular_info: MomanModularInfo
+    __plan: MomanBuildPlan
+    # 同步模块并行启动的线程数量, 小于等于 1 时在当前线程中依次启动
+    __parallel: int
+
+    # 已经启动的对象, 按照依赖层级记录, 停止时按照层级逆序处理
+    # lazy 模块在使用时才启动, 同样记录到所在的层级中, 保证停止顺序与依赖关系一致
+    __started: Dict[int, List[MomanModuleInterface]]
+    # 已经启动过的对象 id, 同一个对象只会被启动一次
+    __visited: Set[int]
+    # 启动时需要立即创建的模块, 其余模块只能通过 lazy 模块访问到
+    __eager: Set[str]
+    # 在事件循环中以任务方式启动、尚未完成的对象 id -> 启动任务
+    __starting: Dict[int, Future]
+    # 串行化事件循环之外的 lazy 模块启动以及重启, 持有期间可能等待事件循环
+    __lazy_lock: threading.RLock
+    # 保护 __started / __visited / __starting, 持有期间不会等待其他线程, 事件循环线程中只使用这个锁
+    __state_lock: threading.Lock
+
+    def __init__(
+        self,
+        manager: MomanModuleManagerWrapper,
+        modular_info: MomanModularInfo,
+        plan: MomanBuildPlan,
+        parallel: int = 1,
+    ):
+        self.__manager = manager
+        self.__modular_info = modular_info
+        self.__plan = plan
+        self.__parallel = parallel
+        self.__started = {}
+        self.__visited = set()
+        self.__eager = plan.eager_modules(modular_info.modules)
+        self.__starting = {}
+        self.__lazy_lock = threading.RLock()
+        self.__state_lock = threading.Lock()
+
+        manager.set_lazy_resolver(self.start_lazy)
+
+    def instances(self, name: str) -> List[MomanModuleInterface]:
+        """获取启动时需要创建的某个模块对应的所有对象
+
+        per-dependent 作用域的模块每个父模块对应一个对象, transient 作用域和 lazy 模块不在启动时创建
+        """
+        plan = self.__plan
+        if name == plan.entry_name:
+            return [self.__manager.get_entry_module(name, self.__modular_info.entry_path)]
+
+        module_config, _ = self.__modular_info.modules[name]
+        if MomanModuleScope.Transient == module_config.scope or name not in self.__eager:
+            return []
+
+        return [
+            self.__manager.resolve_module(parent, name)
+            for parent in plan.dependents[name] if parent in self.__eager
+        ]
+
+    def start_lazy(self, p_name: str, name: str) -> MomanLazyTarget:
+        """lazy 模块第一次被使用时调用, 先启动尚未启动的依赖, 再创建并启动模块本身
+
+        在事件循环线程中调用时不能同步等待异步的 on_start, 此时以任务的方式启动并立即返回;
+        事件循环线程中不会获取 __lazy_lock, 避免与持有该锁并等待事件循环的线程互相等待
+
+        Args:
+            p_name (str): 父模块名称
+            name (str): lazy 模块名称
+
+        Returns:
+            MomanLazyTarget: 模块对象, 尚未完成的启动任务 (只在事件循环线程中可能存在)
+        """
+        if self.__manager.event_loop.in_loop_thread():
+            return self.__ensure_started(p_name, name, True)
+
+        with self.__lazy_lock:
+            module, starting = self.__ensure_started(p_name, name, False)
+            if starting is not None:
+                starting.result()
+            return module, None
+
+    def start(self):
+        """按照依赖层级启动所有模块, 入口模块最后启动
+
+        同一层中的异步模块在事件循环中并发启动, 同步模块在 parallel 大于 1 时使用线程池并行启动
+        """
+        plan = self.__plan
+        try:
+            self.__start_layers()
+            self.__start_batch([plan.entry_name], plan.levels[plan.entry_name])
+        except BaseException:
+            # 启动失败时停止已经启动的模块, 停止失败只记录, 保留启动失败的原因
+            try:
+                self.stop()
+            except BaseException as e:
+                utils.MomanLogger.error("stop after start failure failed: %s" % e)
+            raise
+
+    def stop(self):
+        # transient 对象由其他模块在运行过程中创建, 优先停止
+        with self.__state_lock:
+            started = self.__started
+            self.__started = {}
+        batches = [list(reversed(self.__manager.pop_transients()))]
+        batches += [started[level] for level in sorted(started, reverse=True)]
+
+        error: BaseException | None = None
+        with self.__create_executor() as executor:
+            for batch in batches:
+                futures = self.__invoke_batch(batch, "on_stop", executor, False)
+                wait(futures)
+
+                for module, future in zip(batch, futures):
+                    e = future.exception()
+                    if e is None:
+                        continue
+                    utils.MomanLogger.error(
+                        "module %s stop failed: %s" % (module.implement_name, e)
+                    )
+                    if error is None:
+                        error = e
+
+        if error is not None:
+            raise error
+
+    def started_instances(self, name: str) -> List[MomanModuleInterface]:
+        """获取某个模块已经启动的所有对象, 包括已经使用过的 lazy 模块和 transient 对象"""
+        with self.__state_lock:
+            modules = [
+                module for level in sorted(self.__started) for module in self.__started[level]
+                if module.implement_name == name
+            ]
+        modules += [module for module in self.__manager.transients if module.implement_name == name]
+        return modules
+
+    def restart(self, names: List[str]):
+        """在原有对象上依次调用 on_stop 和 on_start, 其他模块持有的引用仍然有效
+
+        依赖方先于被依赖方停止, 被依赖方先于依赖方启动; 入口模块不会被重启。
+        某一层启动失败时, 失败的模块以及更高层的模块保持停止状态, 不再参与之后的停止流程
+
+        Args:
+            names (List[str]): 需要重启的模块, 调用方需要保证包含了所有依赖这些模块的模块
+        """
+        targets = set(names) - {self.__plan.entry_name}
+
+        # 与 lazy 模块的启动互斥, 避免重启过程中启动新的模块
+        with self.__lazy_lock:
+            transients = [
+                module for module in reversed(self.__manager.transients) if module.implement_name in targets
+            ]
+            levels: List[Tuple[int, List[MomanModuleInterface]]] = []
+            with self.__state_lock:
+                for level in sorted(self.__started, reverse=True):
+                    batch = [module for module in self.__started[level] if module.implement_name in targets]
+                    if len(batch) > 0:
+                        levels.append((level, batch))
+
+            with self.__create_executor() as executor:
+                # 停止失败时仍然尝试重新启动
+                for batch in [transients] + [batch for _, batch in levels]:
+                    self.__invoke_and_report(batch, "on_stop", executor)
+
+                failed_level: int | None = None
+                for level, batch in reversed(levels):
+                    if failed_level is None:
+                        failed = self.__invoke_and_report(batch, "on_start", executor)
+                        if len(failed) == 0:
+                            continue
+                        failed_level = level
+                    else:
+                        failed = batch
+                        utils.MomanLogger.warn(
+                            "modules not restarted: %s" % ", ".join(module.implement_name for module in batch)
+                        )
+
+                    with self.__state_lock:
+                        for module in failed:
+                            self.__started[level].remove(module)
+                            self.__visited.discard(id(module))
+
+                if failed_level is None:
+                    self.__invoke_and_report(list(reversed(transients)), "on_start", executor)
+
+    def reload(self, names: List[str], unload: Callable[[], Any]):
+        """停止模块之后替换为新的对象并重新启动, 其余模块保持运行
+
+        依赖方先于被依赖方停止; unload 负责丢弃需要重新加载的实现, 之后按照依赖层级重新创建并启动。
+        lazy 模块只会被停止, 下次使用时再通过代理对象启动; 入口模块不会被重新加载
+
+        Args:
+            names (List[str]): 需要停止的模块, 调用方需要保证包含了所有依赖这些模块的模块
+            unload (Callable[[], Any]): 模块全部停止之后调用
+        """
+        plan = self.__plan
+        targets = set(names) - {plan.entry_name}
+
+        with self.__lazy_lock:
+            with self.__create_executor() as executor:
+                with self.__state_lock:
+                    levels = [
+                        (level, [module for module in self.__started[level] if module.implement_name in targets])
+                        for level in sorted(self.__started, reverse=True)
+                    ]
+                for level, batch in levels:
+                    if len(batch) == 0:
+                        continue
+
+                    self.__invoke_and_report(batch, "on_stop", executor)
+                    with self.__state_lock:
+                        for module in batch:
+                            self.__started[level].remove(module)
+                            self.__visited.discard(id(module))
+
+                unload()
+                self.__manager.reset_lazy_proxies(targets)
+
+                # 通过 manager 重新获取对象, 重新加载的模块会创建新的对象
+                for level, layer in enumerate(plan.layers):
+                    layer_names = [name for name in layer if name in targets]
+                    if len(layer_names) == 0:
+                        continue
+                    try:
+                        self.__start_batch(layer_names, level, executor)
+                    except BaseException as e:
+                        utils.MomanLogger.error(
+                            "module reload failed, modules of higher levels are left stopped: %s" % e
+                        )
+                        return
+
+    def __invoke_and_report(
+        self, batch: List[MomanModuleInterface], hook_name: str, executor: ThreadPoolExecutor | None
+    ) -> List[MomanModuleInterface]:
+        """执行同一批次的生命周期函数并记录错误, 返回执行失败的模块"""
+        futures = self.__invoke_batch(batch, hook_name, executor, False)
+        wait(futures)
+
+        failed: List[MomanModuleInterface] = []
+        for module, future in zip(batch, futures):
+            e = future.exception()
+            if e is not None:
+                utils.MomanLogger.error("module %s %s failed: %s" % (module.implement_name, hook_name, e))
+                failed.append(module)
+        return failed
+
+    def __start_layers(self):
+        plan = self.__plan
+        begin = time.perf_counter()
+
+        with self.__create_executor() as executor:
+            for level, layer in enumerate(plan.layers):
+                self.__start_batch(layer, level, executor)
+
+        wall_cost = time.perf_counter() - begin
+        start_costs = self.__manager.timings.costs(MomanModulePhase.Start)
+        path, path_cost = plan.critical_path(start_costs)
+        log = utils.MomanLogger.info if self.__parallel > 1 else utils.MomanLogger.debug
+        log(
+            "modules started, wall time: %.3fs, critical path: %.3fs (%s), total on_start: %.3fs"
+            % (wall_cost, path_cost, " -> ".join(path), sum(start_costs.values()))
+        )
+
+    def __start_batch(
+        self, names: List[str], level: int, executor: ThreadPoolExecutor | None = None
+    ):
+        # 对象的构造统一在当前线程中完成
+        batch: List[MomanModuleInterface] = []
+        for name in names:
+            for module in self.instances(name):
+                with self.__state_lock:
+                    if id(module) in self.__visited:
+                        continue
+                    self.__visited.add(id(module))
+                batch.append(module)
+
+        futures = self.__invoke_batch(batch, "on_start", executor, True)
+        _, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+
+        # 出现失败时取消尚未完成的启动任务, 并等待正在执行的任务结束
+        for future in not_done:
+            future.cancel()
+        wait(futures)
+
+        succeeded: List[MomanModuleInterface] = []
+        error: BaseException | None = None
+        for module, future in zip(batch, futures):
+            if future.cancelled():
+                continue
+            e = future.exception()
+            if e is None:
+                succeeded.append(module)
+            elif error is None:
+                error = e
+
+        with self.__state_lock:
+            self.__started.setdefault(level, []).extend(succeeded)
+        if error is not None:
+            raise error
+
+    def __ensure_started(self, p_name: str, name: str, in_loop: bool) -> MomanLazyTarget:
+        modules = self.__modular_info.modules
+        plan = self.__plan
+
+        # transient 对象在创建时已经启动
+        module_config, _ = modules[name]
+        if MomanModuleScope.Transient == module_config.scope:
+            return self.__manager.resolve_module(p_name, name), None
+
+        # 依赖中的 lazy 模块同样在使用时才会启动
+        pending: List[Future] = []
+        for dep in plan.dependencies[name]:
+            dep_config, _ = modules[dep]
+            if not dep_config.lazy:
+                _, dep_starting = self.__ensure_started(name, dep, in_loop)
+                if dep_starting is not None:
+                    pending.append(dep_starting)
+
+        module = self.__manager.resolve_module(p_name, name)
+        with self.__state_lock:
+            if id(module) in self.__visited:
+                return module, self.__starting.get(id(module), None)
+            self.__visited.add(id(module))
+
+            # 事件循环中不能同步等待, 异步模块以及依赖尚未启动完成的模块以任务的方式启动
+            if in_loop and (len(pending) > 0 or inspect.iscoroutinefunction(module.on_start)):
+                starting = self.__manager.event_loop.submit(self.__start_in_loop(name, module, pending))
+                self.__starting[id(module)] = starting
+                return module, starting
+
+        try:
+            # 事件循环之外启动时依赖都已经启动完成, 或者正在由事件循环中的任务启动
+            for dep_starting in pending:
+                dep_starting.result()
+            future, = self.__invoke_batch([module], "on_start", None, True)
+            future.result()
+        except BaseException:
+            with self.__state_lock:
+                self.__visited.discard(id(module))
+            raise
+
+        self.__add_lazy_started(name, module)
+        return module, None
+
+    async def __start_in_loop(self, name: str, module: MomanModuleInterface, pending: List[Future]):
+        """在事件循环中等待依赖启动完成之后启动模块, 失败时重置代理对象, 下次使用时重新启动"""
+        try:
+            for dep_starting in pending:
+                await asyncio.wrap_future(dep_starting)
+
+            func = module.on_start
+            if inspect.iscoroutinefunction(func):
+                await self.__invoke_async(module, func, MomanModulePhase.Start)
+            else:
+                self.__invoke_sync(module, func, MomanModulePhase.Start)
+        except BaseException:
+            with self.__state_lock:
+                self.__visited.discard(id(module))
+                self.__starting.pop(id(module), None)
+            self.__manager.reset_lazy_proxies({name})
+            raise
+
+        with self.__state_lock:
+            self.__starting.pop(id(module), None)
+        self.__add_lazy_started(name, module)
+
+    def __add_lazy_started(self, name: str, module: MomanModuleInterface):
+        utils.MomanLogger.debug("lazy module started, name: %s" % name)
+        with self.__state_lock:
+            self.__started.setdefault(self.__plan.levels[name], []).append(module)
+
+    def __invoke_batch(
+        self,
+        batch: List[MomanModuleInterface],
+        hook_name: str,
+        executor: ThreadPoolExecutor | None,
+        stop_on_error: bool,
+    ) -> List[Future]:
+        """对同一批次的模块执行生命周期函数, 返回的 future 与模块一一对应
+
+        Args:
+            batch (List[MomanModuleInterface]): 同一批次的模块, 相互之间没有依赖关系
+            hook_name (str): 生命周期函数名称, on_start 或者 on_stop
+            executor (ThreadPoolExecutor | None): 同步模块使用的线程池, 为空时在当前线程中依次执行
+            stop_on_error (bool): 在当前线程中执行时, 出现失败是否跳过剩余的模块
+        """
+        event_loop = self.__manager.event_loop
+        phase = MomanModulePhase(hook_name)
+
+        # 异步模块统一提交到事件循环中并发执行
+        futures: List[Future | None] = []
+        sync_modules: List[Tuple[int, MomanModuleInterface]] = []
+        for index, module in enumerate(batch):
+            func = getattr(module, hook_name)
+            if inspect.iscoroutinefunction(func):
+                futures.append(event_loop.submit(self.__invoke_async(module, func, phase)))
+            else:
+                futures.append(None)
+                sync_modules.append((index, module))
+
+        failed = False
+        for index, module in sync_modules:
+            func = getattr(module, hook_name)
+            if executor is not None and len(sync_modules) > 1:
+                futures[index] = executor.submit(self.__invoke_sync, module, func, phase)
+                continue
+
+            future: Future = Future()
+            if failed and stop_on_error:
+                future.cancel()
+            else:
+                try:
+                    future.set_result(self.__invoke_sync(module, func, phase))
+                except BaseException as e:
+                    future.set_exception(e)
+                    failed = True
+            futures[index] = future
+
+        return [future for future in futures if future is not None]
+
+    def __invoke_sync(
+        self, module: MomanModuleInterface, func: Callable[[], Any], phase: MomanModulePhase
+    ):
+        with self.__manager.timings.measure(module.implement_name, phase):
+            func()
+
+    async def __invoke_async(
+        self, module: MomanModuleInterface, func: Callable[[], Any], phase: MomanModulePhase
+    ):
+        # 异步模块在事件循环中交错执行, 每个模块使用单独的轨道
+        name = module.implement_name
+        begin = time.perf_counter()
+        try:
+            await func()
+        finally:
+            self.__manager.timings.record(name, phase, begin, time.perf_counter(), "async " + name)
+
+    def __create_executor(self) -> ContextManager[ThreadPoolExecutor | None]:
+        if self.__parallel > 1:
+            return ThreadPoolExecutor(max_workers=self.__parallel)
+        return nullcontext()
@@ -0,0 +1,234 @@
+from typing import Any, Dict, Iterator, List, Tuple
+from types import NoneType
+from contextlib import contextmanager
+from enum import Enum
+from pathlib import Path
+import threading
+import time
+
+from moman_bin import constants, utils
+
+from .plan import MomanBuildPlan
+
+MOMAN_TIMINGS_VERSION = 1
+
+
+class MomanModulePhase(Enum):
+    Import = "import"
+    Construct = "construct"
+    Start = "on_start"
+    Stop = "on_stop"
+
+
+# 模块名称, 阶段, 开始时间, 结束时间, 执行的线程 (异步模块使用单独的轨道)
+MomanTimingSpan = Tuple[str, MomanModulePhase, float, float, str]
+
+
+class MomanBuildTimings:
+    """记录模块在构建过程中每个阶段的耗时, 时间使用 time.perf_counter"""
+
+    __origin: float
+    __spans: List[MomanTimingSpan]
+    # implement -> {阶段: 耗时 (秒)}
+    __modules: Dict[str, Dict[str, float]]
+    __lock: threading.Lock
+
+    def __init__(self):
+        self.__origin = time.perf_counter()
+        self.__spans = []
+        self.__modules = {}
+        self.__lock = threading.Lock()
+
+    def record(
+        self, name: str, phase: MomanModulePhase, begin: float, end: float,
+        track: str | NoneType = None
+    ):
+        if track is None:
+            track = threading.current_thread().name
+
+        with self.__lock:
+            self.__spans.append((name, phase, begin, end, track))
+            costs = self.__modules.setdefault(name, {})
+            costs[phase.value] = costs.get(phase.value, 0.0) + end - begin
+
+    @contextmanager
+    def measure(self, name: str, phase: MomanModulePhase) -> Iterator[NoneType]:
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, phase, begin, time.perf_counter())
+
+    def costs(self, phase: MomanModulePhase) -> Dict[str, float]:
+        """获取每个模块在某个阶段的耗时"""
+        return {
+            name: costs[phase.value]
+            for name, costs in self.__modules.items() if phase.value in costs
+        }
+
+    def format(self, previous: Dict[str, Any] | NoneType = None) -> List[str]:
+        """按照总耗时从大到小输出表格, 存在上一次的记录时输出总耗时的变化
+
+        Args:
+            previous (Dict[str, Any] | NoneType): 上一次运行保存的记录
+        """
+        phases = [phase.value for phase in MomanModulePhase]
+        previous_modules: Dict[str, Dict[str, float]] = {}
+        if previous is not None:
+            previous_modules = previous.get("modules", {})
+
+        rows: List[Tuple[str, List[float], float]] = []
+        for name, costs in self.__modules.items():
+            values = [costs.get(phase, 0.0) for phase in phases]
+            rows.append((name, values, sum(values)))
+        rows.sort(key=lambda row: row[2], reverse=True)
+
+        width = max([len("module")] + [len(row[0]) for row in rows])
+        header = "%s  %s  %10s" % (
+            "module".ljust(width), "  ".join("%10s" % phase for phase in phases), "total"
+        )
+        if previous is not None:
+            header += "  %10s" % "delta"
+
+        lines = [header]
+        for name, values, total in rows:
+            line = "%s  %s  %10s" % (
+                name.ljust(width),
+                "  ".join("%10s" % MomanBuildTimings.__format_ms(value) for value in values),
+                MomanBuildTimings.__format_ms(total),
+            )
+            if previous is not None:
+                previous_costs = previous_modules.get(name, None)
+                if previous_costs is None:
+                    line += "  %10s" % "new"
+                else:
+                    delta = total - sum(previous_costs.get(phase, 0.0) for phase in phases)
+                    line += "  %10s" % (("+" if delta >= 0 else "-") + MomanBuildTimings.__format_ms(abs(delta)))
+            lines.append(line)
+
+        return lines
+
+    def to_trace(self, plan: MomanBuildPlan) -> Dict[str, Any]:
+        """生成 Chrome trace event 格式的数据 (chrome://tracing, Perfetto)
+
+        进程 1 是实际的执行时间线, 每个线程一条轨道;
+        进程 2 按照依赖树展开启动耗时, 每个模块的区间包含其依赖的区间, 被多个模块依赖的模块只出现在第一次访问的位置
+        """
+        events: List[Dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "timeline"}},
+            {"name": "process_name", "ph": "M", "pid": 2, "args": {"name": "dependency tree"}},
+            {"name": "thread_name", "ph": "M", "pid": 2, "tid": 1, "args": {"name": "start"}},
+        ]
+
+        tracks: Dict[str, int] = {}
+        for name, phase, begin, end, track in sorted(self.__spans, key=lambda span: span[2]):
+            tid = tracks.get(track, None)
+            if tid is None:
+                tid = tracks[track] = len(tracks) + 1
+                events.append({
+                    "name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": track}
+                })
+
+            events.append({
+                "name": "%s %s" % (name, phase.value), "cat": phase.value, "ph": "X",
+                "pid": 1, "tid": tid,
+                "ts": self.__to_us(begin), "dur": (end - begin) * 1e6,
+                "args": {"module": name},
+            })
+
+        events += self.__dependency_tree_events(plan)
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def __dependency_tree_events(self, plan: MomanBuildPlan) -> List[Dict[str, Any]]:
+        start_phases = [MomanModulePhase.Import, MomanModulePhase.Construct, MomanModulePhase.Start]
+
+        # 生成树: 每个模块挂在第一次访问到它的父模块下
+        children: Dict[str, List[str]] = {}
+        visited = {plan.entry_name}
+        pending = [plan.entry_name]
+        while len(pending) > 0:
+            name = pending.pop()
+            children[name] = []
+            for dep in plan.dependencies[name]:
+                if dep in visited:
+                    continue
+                visited.add(dep)
+                children[name].append(dep)
+                pending.append(dep)
+
+        # 后序计算每个子树的耗时
+        durations: Dict[str, float] = {}
+        for name in plan.order:
+            if name not in children:
+                continue
+            own_costs = self.__modules.get(name, {})
+            durations[name] = sum(durations[child] for child in children[name]) + sum(
+                own_costs.get(phase.value, 0.0) for phase in start_phases
+            )
+
+        events: List[Dict[str, Any]] = []
+        # 依赖先于自身启动, 因此子树依次排列在前, 自身的各个阶段排列在最后
+        stack: List[Tuple[str, float]] = [(plan.entry_name, 0.0)]
+        while len(stack) > 0:
+            name, begin = stack.pop()
+            events.append({
+                "name": name, "cat": "module", "ph": "X", "pid": 2, "tid": 1,
+                "ts": begin * 1e6, "dur": durations[name] * 1e6,
+            })
+
+            offset = begin
+            for child in children[name]:
+                stack.append((child, offset))
+                offset += durations[child]
+
+            own_costs = self.__modules.get(name, {})
+            for phase in start_phases:
+                cost = own_costs.get(phase.value, 0.0)
+                if cost <= 0.0:
+                    continue
+                events.append({
+                    "name": "%s %s" % (name, phase.value), "cat": phase.value, "ph": "X",
+                    "pid": 2, "tid": 1, "ts": offset * 1e6, "dur": cost * 1e6,
+                })
+                offset += cost
+
+        return events
+
+    @property
+    def empty(self) -> bool:
+        """是否没有记录任何阶段"""
+        with self.__lock:
+            return len(self.__spans) == 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": MOMAN_TIMINGS_VERSION,
+            "time": time.time(),
+            "modules": self.__modules,
+        }
+
+    def to_path(self, path: Path):
+        utils.write_json(path.joinpath(constants.MOMAN_TIMINGS_FILE), self.to_dict())
+
+    @staticmethod
+    def load_previous(path: Path) -> Dict[str, Any] | NoneType:
+        """读取上一次运行保存的记录, 不存在或者版本不一致时返回 None"""
+        timings_file = path.joinpath(constants.MOMAN_TIMINGS_FILE)
+        if not timings_file.exists():
+            return None
+
+        try:
+            data = utils.read_json(timings_file)
+        except ValueError:
+            return None
+        if not isinstance(data, dict) or data.get("version", None) != MOMAN_TIMINGS_VERSION:
+            return None
+        return data
+
+    def __to_us(self, value: float) -> float:
+        return (value - self.__origin) * 1e6
+
+    @staticmethod
+    def __format_ms(value: float) -> str:
+        return "%.2fms" % (value * 1e3)
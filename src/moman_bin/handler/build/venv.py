@@ -0,0 +1,210 @@
+# 项目独立的虚拟环境, python 库统一从本地的 wheel 仓库安装
+# wheel 仓库按照文件内容的 sha256 保存, 多个项目共享, 填充之后可以完全离线使用
+
+from typing import List
+from types import NoneType
+from pathlib import Path
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import venv
+
+import moman
+import moman_bin
+from moman_bin import constants, utils
+from moman_bin.errors import MomanBuildError
+
+from .packages import normalize_requirements
+
+MOMAN_VENV_STATE_VERSION = 1
+
+# 设置之后表示当前进程已经运行在项目的虚拟环境中
+MOMAN_VENV_ENV = "MOMAN_VENV"
+# wheel 仓库位置, 默认为 ~/.cache/moman/wheels
+MOMAN_WHEELHOUSE_ENV = "MOMAN_WHEELHOUSE"
+
+# moman 运行时依赖的库, 与 pyproject.toml 保持一致
+MOMAN_RUNTIME_PACKAGES = ["pyyaml>=6.0.2,<7.0.0", "termcolor>=2.5.0,<3.0.0"]
+
+
+class MomanWheelhouse:
+    """按照内容寻址的本地 wheel 仓库
+
+    wheel 保存在 objects/<sha256 前两位>/<sha256>/<文件名> 中, index.html 列出所有的 wheel,
+    安装时通过 pip install --no-index --find-links index.html 使用
+    """
+
+    __path: Path
+
+    def __init__(self, path: Path):
+        self.__path = path
+
+    @staticmethod
+    def default() -> "MomanWheelhouse":
+        path = os.environ.get(MOMAN_WHEELHOUSE_ENV, None)
+        if path is None:
+            return MomanWheelhouse(Path.home().joinpath(".cache", "moman", "wheels"))
+        return MomanWheelhouse(Path(path).expanduser())
+
+    def add(self, file_path: Path) -> bool:
+        """添加 wheel 文件, 内容相同的文件只会保存一份
+
+        Returns:
+            bool: 是否新增了文件
+        """
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        target = self.__path.joinpath("objects", digest[:2], digest, file_path.name)
+        if target.exists():
+            return False
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # 先复制到临时文件再重命名, 避免其他进程读到不完整的文件
+        temp_file = target.with_name(target.name + ".tmp%d" % os.getpid())
+        shutil.copyfile(file_path, temp_file)
+        os.replace(temp_file, target)
+        return True
+
+    def write_index(self):
+        objects = self.__path.joinpath("objects")
+        links: List[str] = []
+        if objects.exists():
+            for wheel in sorted(objects.glob("*/*/*.whl")):
+                href = wheel.relative_to(self.__path).as_posix()
+                links.append('<a href="%s">%s</a><br/>' % (href, wheel.name))
+
+        self.__path.mkdir(parents=True, exist_ok=True)
+        utils.write_file(self.index_file, "<html><body>\n%s\n</body></html>\n" % "\n".join(links))
+
+    def seed(self, requirements_file: Path):
+        """通过 pip wheel 下载或者构建缺失的 wheel 并加入仓库, 需要访问网络或者配置的索引"""
+        with tempfile.TemporaryDirectory(prefix="moman-wheels-") as temp_folder:
+            result = subprocess.run([
+                sys.executable, "-m", "pip", "wheel", "--wheel-dir", temp_folder,
+                "--find-links", str(self.index_file), "-r", str(requirements_file),
+            ])
+            if result.returncode != 0:
+                raise MomanBuildError("pip wheel failed, exit code: %d" % result.returncode)
+
+            count = sum(1 for wheel in Path(temp_folder).glob("*.whl") if self.add(wheel))
+
+        self.write_index()
+        utils.MomanLogger.info("wheelhouse seeded, new wheels: %d, path: %s" % (count, self.__path))
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    @property
+    def index_file(self) -> Path:
+        return self.__path.joinpath("index.html")
+
+
+def venv_digest(requirements: List[str]) -> str:
+    # 解释器版本或者依赖列表变化时需要重新创建虚拟环境
+    data = "\n".join([sys.version, sys.base_prefix] + requirements)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def venv_python(venv_path: Path) -> Path:
+    if os.name == "nt":
+        return venv_path.joinpath("Scripts", "python.exe")
+    return venv_path.joinpath("bin", "python")
+
+
+def prepare_venv(path: Path, packages: List[str], wheelhouse: MomanWheelhouse | NoneType = None) -> Path:
+    """创建或者复用项目的虚拟环境
+
+    依赖列表 (lock) 没有变化时直接复用, 否则重新创建虚拟环境, 并从 wheel 仓库离线安装所有依赖,
+    仓库中缺少 wheel 时先填充仓库
+
+    Args:
+        path (Path): 项目路径
+        packages (List[str]): 所有模块依赖的 python 库
+        wheelhouse (MomanWheelhouse | NoneType): wheel 仓库, 默认通过 MOMAN_WHEELHOUSE 指定
+
+    Returns:
+        Path: 虚拟环境中的 python 解释器
+    """
+    if wheelhouse is None:
+        wheelhouse = MomanWheelhouse.default()
+
+    requirements = normalize_requirements(MOMAN_RUNTIME_PACKAGES + packages)
+    digest = venv_digest(requirements)
+
+    venv_path = path.joinpath(constants.MOMAN_VENV_FOLDER)
+    state_file = venv_path.joinpath("moman-venv.json")
+    python = venv_python(venv_path)
+
+    if python.exists() and state_file.exists():
+        try:
+            state = utils.read_json(state_file)
+        except ValueError:
+            state = None
+        if isinstance(state, dict) and state.get("version", None) == MOMAN_VENV_STATE_VERSION \
+                and state.get("hash", None) == digest:
+            utils.MomanLogger.debug("venv is up to date, path: %s" % venv_path)
+            return python
+
+    utils.MomanLogger.info("create venv, path: %s" % venv_path)
+    venv.EnvBuilder(clear=True, with_pip=True).create(venv_path)
+    __link_moman(venv_path)
+
+    requirements_file = venv_path.joinpath("requirements.lock")
+    utils.write_file(requirements_file, "".join(r + "\n" for r in requirements))
+
+    if not wheelhouse.index_file.exists():
+        wheelhouse.write_index()
+
+    install_args = [
+        str(python), "-m", "pip", "install", "--no-index",
+        "--find-links", str(wheelhouse.index_file), "-r", str(requirements_file),
+    ]
+    if subprocess.run(install_args).returncode != 0:
+        # 仓库中缺少 wheel, 填充之后再次离线安装
+        wheelhouse.seed(requirements_file)
+        result = subprocess.run(install_args)
+        if result.returncode != 0:
+            raise MomanBuildError("install packages into venv failed, exit code: %d" % result.returncode)
+
+    # 安装成功之后才记录, 失败时下次重新创建
+    utils.write_json(state_file, {
+        "version": MOMAN_VENV_STATE_VERSION, "hash": digest, "requirements": requirements,
+    })
+    return python
+
+
+def __link_moman(venv_path: Path):
+    """通过 .pth 文件让虚拟环境使用当前的 moman 源码, 只暴露 moman 自身的包"""
+    source_folder = venv_path.joinpath("moman-src")
+    source_folder.mkdir(exist_ok=True)
+    for package in (moman, moman_bin):
+        # moman_bin 是命名空间包, 没有 __file__
+        package_folder = Path(list(package.__path__)[0]).resolve()
+        link = source_folder.joinpath(package_folder.name)
+        if link.is_symlink() or link.exists():
+            link.unlink()
+        link.symlink_to(package_folder, target_is_directory=True)
+
+    site_packages = Path(sysconfig.get_path(
+        "purelib", vars={"base": str(venv_path), "platbase": str(venv_path)}
+    ))
+    utils.write_file(site_packages.joinpath("moman.pth"), str(source_folder.resolve()) + "\n")
+
+
+def exec_in_venv(python: Path, argv: List[str]):
+    """在虚拟环境中重新执行当前命令, 不会返回"""
+    env = dict(os.environ)
+    env[MOMAN_VENV_ENV] = str(python)
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execve(str(python), [str(python), "-m", "moman_bin.main", *argv], env)
@@ -0,0 +1,297 @@
+# 项目的常驻 daemon: 通过 unix socket 接收 CLI 子命令并在同一个进程中执行
+# 解释器, 已经导入的模块以及项目模型保持在内存中, 命令不再需要冷启动和重新解析项目
+
+from typing import Any, Dict, List, override
+from contextlib import redirect_stderr, redirect_stdout
+from enum import Enum
+from pathlib import Path
+import io
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+
+from .base import MomanCmdHandler, MomanCmdKind, MomanCmdBaseConfig
+
+from moman_bin import constants, utils
+from moman_bin.client import (
+    MOMAN_NO_DAEMON_ENV, MomanDaemonConnectionError, recv_message, request_daemon, send_message
+)
+from moman_bin.errors import MomanDaemonError
+from moman_bin.info.modular import MomanModularInfo
+
+# 启动和停止时等待 daemon 响应的最长时间 (秒)
+MOMAN_DAEMON_WAIT_SECONDS = 5.0
+# 读取单个请求的超时时间 (秒), 避免异常的客户端阻塞 daemon
+MOMAN_DAEMON_REQUEST_TIMEOUT = 10.0
+
+
+class MomanDaemonAction(Enum):
+    Start = "start"
+    Stop = "stop"
+    Status = "status"
+
+
+class MomanDaemonConfig(MomanCmdBaseConfig):
+    __action: MomanDaemonAction
+    __foreground: bool
+
+    def __init__(self, path: Path, action: MomanDaemonAction, foreground: bool = False):
+        super().__init__(path)
+        self.__action = action
+        self.__foreground = foreground
+
+    @property
+    def action(self) -> MomanDaemonAction:
+        return self.__action
+
+    @property
+    def foreground(self) -> bool:
+        """是否在当前进程中运行 daemon, 否则在后台启动新的进程"""
+        return self.__foreground
+
+
+class MomanDaemonOutput(io.StringIO):
+    """收集命令的输出, isatty 与客户端的终端保持一致, 使日志颜色与直接执行时相同"""
+
+    __tty: bool
+
+    def __init__(self, tty: bool):
+        super().__init__()
+        self.__tty = tty
+
+    @override
+    def isatty(self) -> bool:
+        return self.__tty
+
+
+class MomanDaemonServer:
+    """在项目目录中监听 socket, 逐个执行收到的请求
+
+    命令依赖当前目录和全局的标准输出, 因此请求总是串行执行
+    """
+
+    __path: Path
+    __executor: Any
+    __started_at: float
+    __served: int
+    __running: bool
+
+    def __init__(self, path: Path):
+        from moman_bin.cli import MomanCliExecutor
+
+        self.__path = path
+        self.__executor = MomanCliExecutor()
+        self.__started_at = time.time()
+        self.__served = 0
+        self.__running = False
+
+    def run(self):
+        socket_file = self.__path.joinpath(constants.MOMAN_DAEMON_SOCKET_FILE)
+        socket_file.parent.mkdir(exist_ok=True)
+        if socket_file.exists():
+            socket_file.unlink()
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # 客户端通过相对路径连接, 这里同样使用相对路径绑定
+        # 只有当前用户能够通过 daemon 执行命令, 创建时就限制权限, 不留下其他用户可以连接的间隙
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(constants.MOMAN_DAEMON_SOCKET_FILE)
+        finally:
+            os.umask(old_umask)
+        socket_inode = socket_file.stat().st_ino
+        server.listen(16)
+
+        # 提前导入命令的处理模块, 第一条命令也不需要等待导入
+        MomanModularInfo.enable_memo()
+        import moman_bin.handler.modular  # noqa: F401
+        import moman_bin.handler.add.handler  # noqa: F401
+        import moman_bin.handler.implement  # noqa: F401
+        import moman_bin.handler.interface  # noqa: F401
+        import moman_bin.handler.batch  # noqa: F401
+        import moman_bin.handler.graph  # noqa: F401
+
+        # SIGTERM 与 Ctrl-C 一样正常退出并清理 socket 文件
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        utils.MomanLogger.info("daemon started, pid: %d, project: %s" % (os.getpid(), self.__path.absolute()))
+
+        self.__running = True
+        try:
+            while self.__running:
+                conn, _ = server.accept()
+                with conn:
+                    self.__serve(conn)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            MomanModularInfo.enable_memo(False)
+            # 新的 daemon 可能已经替换了 socket 文件, 只清理自己创建的文件
+            try:
+                if socket_file.stat().st_ino == socket_inode:
+                    socket_file.unlink()
+            except FileNotFoundError:
+                pass
+            utils.MomanLogger.info("daemon stopped, served commands: %d" % self.__served)
+
+    def __serve(self, conn: socket.socket):
+        conn.settimeout(MOMAN_DAEMON_REQUEST_TIMEOUT)
+        try:
+            request = recv_message(conn)
+        except (OSError, ValueError, MomanDaemonConnectionError) as e:
+            utils.MomanLogger.warn("invalid daemon request: %s" % e)
+            return
+
+        match request.get("op", None):
+            case "exec":
+                response = self.__exec(request.get("argv", []), request.get("tty", False))
+            case "status":
+                response = {
+                    "pid": os.getpid(),
+                    "project": str(self.__path.absolute()),
+                    "uptime": time.time() - self.__started_at,
+                    "served": self.__served,
+                }
+            case "stop":
+                response = {"pid": os.getpid()}
+                self.__running = False
+            case op:
+                response = {"stderr": "[error] daemon - unknown request: %s\n" % op, "code": 1}
+
+        # 客户端提前退出时不影响 daemon
+        conn.settimeout(None)
+        try:
+            send_message(conn, response)
+        except OSError as e:
+            utils.MomanLogger.warn("failed to send daemon response: %s" % e)
+
+    def __exec(self, argv: List[str], tty: bool) -> Dict[str, Any]:
+        stdout = MomanDaemonOutput(tty)
+        stderr = MomanDaemonOutput(tty)
+
+        code = 0
+        succeeded = False
+        begin = time.perf_counter()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                succeeded = self.__executor.exec(argv)
+            except SystemExit as e:
+                # argparse 解析失败或者输出帮助信息
+                succeeded = e.code is None or e.code == 0
+                if isinstance(e.code, int) or e.code is None:
+                    code = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    code = 1
+            except KeyboardInterrupt:
+                raise
+            except BaseException:
+                # 命令中的异常不能影响 daemon 本身, 项目中的部分校验直接抛出 BaseException
+                traceback.print_exc()
+                code = 1
+
+        if not succeeded:
+            # 失败的命令可能修改了缓存的项目模型但是没有保存
+            MomanModularInfo.clear_memo()
+            code = code or 1
+
+        self.__served += 1
+        utils.MomanLogger.debug("served: %s, code: %d, %.1fms" % (
+            " ".join(argv), code, (time.perf_counter() - begin) * 1e3
+        ))
+        return {"stdout": stdout.getvalue(), "stderr": stderr.getvalue(), "code": code}
+
+
+class MomanDaemonHandler(MomanCmdHandler):
+    def __init__(self):
+        super().__init__(MomanCmdKind.Daemon)
+
+    @override
+    def invoke(self, config: MomanCmdBaseConfig):
+        config: MomanDaemonConfig = config
+
+        match config.action:
+            case MomanDaemonAction.Start:
+                self.__start(config)
+            case MomanDaemonAction.Stop:
+                self.__stop(config)
+            case MomanDaemonAction.Status:
+                self.__status(config)
+
+    def __start(self, config: MomanDaemonConfig):
+        path = config.path
+        if not path.joinpath(constants.MOMAN_MODULE_CONFIG_NAME).exists():
+            raise MomanDaemonError("root module config not found, run the daemon in the project folder")
+
+        status = MomanDaemonHandler.__request({"op": "status"})
+        if status is not None:
+            utils.MomanLogger.warn("daemon is already running, pid: %d" % status["pid"])
+            return
+
+        if config.foreground:
+            MomanDaemonServer(path).run()
+            return
+
+        path.joinpath(constants.MOMAN_CACHE_FOLDER).mkdir(exist_ok=True)
+        env = dict(os.environ)
+        env.pop(MOMAN_NO_DAEMON_ENV, None)
+        with open(path.joinpath(constants.MOMAN_DAEMON_LOG_FILE), "ab") as log_file:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "moman_bin.main", "daemon", "start", "--foreground"],
+                cwd=path, env=env, stdin=subprocess.DEVNULL, stdout=log_file, stderr=log_file,
+                start_new_session=True,
+            )
+
+        # 等待 daemon 开始监听
+        deadline = time.monotonic() + MOMAN_DAEMON_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise MomanDaemonError(
+                    "daemon exited with code %d, see %s" % (process.returncode, constants.MOMAN_DAEMON_LOG_FILE)
+                )
+            if MomanDaemonHandler.__request({"op": "status"}) is not None:
+                utils.MomanLogger.ok("daemon started, pid: %d" % process.pid)
+                return
+            time.sleep(0.02)
+
+        raise MomanDaemonError(
+            "daemon did not respond in %.0f seconds, see %s" %
+            (MOMAN_DAEMON_WAIT_SECONDS, constants.MOMAN_DAEMON_LOG_FILE)
+        )
+
+    def __stop(self, config: MomanDaemonConfig):
+        socket_file = config.path.joinpath(constants.MOMAN_DAEMON_SOCKET_FILE)
+        response = MomanDaemonHandler.__request({"op": "stop"})
+        if response is None:
+            if socket_file.exists():
+                # daemon 异常退出时留下的 socket 文件
+                socket_file.unlink()
+            utils.MomanLogger.info("daemon is not running")
+            return
+
+        # daemon 退出时会删除 socket 文件
+        deadline = time.monotonic() + MOMAN_DAEMON_WAIT_SECONDS
+        while socket_file.exists() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        utils.MomanLogger.ok("daemon stopped, pid: %d" % response["pid"])
+
+    def __status(self, config: MomanDaemonConfig):
+        status = MomanDaemonHandler.__request({"op": "status"})
+        if status is None:
+            utils.MomanLogger.info("daemon is not running")
+            return
+
+        utils.MomanLogger.info("daemon is running, pid: %d" % status["pid"])
+        utils.MomanLogger.info("project: %s" % status["project"])
+        utils.MomanLogger.info("uptime: %.0fs, served commands: %d" % (status["uptime"], status["served"]))
+
+    @staticmethod
+    def __request(message: Dict[str, Any]) -> Dict[str, Any] | None:
+        try:
+            return request_daemon(message, MOMAN_DAEMON_WAIT_SECONDS)
+        except MomanDaemonConnectionError as e:
+            raise MomanDaemonError("no response from daemon: %s" % e)
@@ -0,0 +1,262 @@
+from typing import override, Any, Dict, List, Set, Tuple
+from types import NoneType
+from enum import Enum
+from pathlib import Path
+import json
+
+from .base import MomanCmdHandler, MomanCmdKind, MomanCmdBaseConfig
+from .build.plan import MomanBuildPlan
+from .build.timings import MomanBuildTimings, MomanModulePhase
+
+from moman_bin import utils
+from moman_bin.info.config.module import MomanModuleConfig
+from moman_bin.info.modular import MomanModularInfo
+
+# 计算启动耗时时统计的阶段, 与 trace 中的依赖树一致
+MOMAN_GRAPH_START_PHASES = [MomanModulePhase.Import, MomanModulePhase.Construct, MomanModulePhase.Start]
+
+
+class MomanGraphFormat(Enum):
+    Dot = "dot"
+    Json = "json"
+
+
+class MomanGraphConfig(MomanCmdBaseConfig):
+    __graph_format: MomanGraphFormat
+    __output: Path | NoneType
+    __use_timings: bool
+
+    def __init__(
+        self, path: Path, graph_format: MomanGraphFormat = MomanGraphFormat.Dot,
+        output: Path | NoneType = None, use_timings: bool = True
+    ):
+        super().__init__(path)
+        self.__graph_format = graph_format
+        self.__output = output
+        self.__use_timings = use_timings
+
+    @property
+    def graph_format(self) -> MomanGraphFormat:
+        return self.__graph_format
+
+    @property
+    def output(self) -> Path | NoneType:
+        """输出文件, 为 None 时输出到标准输出"""
+        return self.__output
+
+    @property
+    def use_timings(self) -> bool:
+        """是否使用 .moman/timings.json 中最近一次 build 记录的耗时"""
+        return self.__use_timings
+
+
+class MomanModuleGraph:
+    """从入口出发能够访问到的模块依赖图
+
+    存在完整的耗时记录时, 节点的权重为 import, construct 以及 on_start 的耗时之和, 关键路径为从入口出发权重最大的依赖链;
+    没有记录时每个模块的权重都为 1, 关键路径为最深的依赖链。
+    配置中能够访问到, 但是最近一次运行时没有被加载的模块 (例如从未使用的 lazy 模块) 记为 unresolved
+    """
+
+    __plan: MomanBuildPlan
+    __modules: Dict[str, MomanModuleConfig]
+    # implement -> {阶段: 耗时 (秒)}, 没有记录时为 None
+    __timings: Dict[str, Dict[str, float]] | NoneType
+    __critical_path: List[str]
+    __critical_cost: float
+    __unresolved: List[str]
+
+    def __init__(
+        self, plan: MomanBuildPlan, modules: Dict[str, MomanModuleConfig],
+        timings: Dict[str, Dict[str, float]] | NoneType = None
+    ):
+        self.__plan = plan
+        self.__modules = modules
+
+        # 记录为空或者入口模块没有启动记录时说明上一次运行没有完成启动, 不能用来判断模块是否被使用
+        if timings is not None and MomanModulePhase.Start.value not in timings.get(plan.entry_name, {}):
+            timings = None
+        self.__timings = timings
+
+        if timings is not None:
+            weights = {
+                name: sum(timings.get(name, {}).get(phase.value, 0.0) for phase in MOMAN_GRAPH_START_PHASES)
+                for name in plan.order
+            }
+            self.__unresolved = [name for name in plan.order if name not in timings]
+        else:
+            weights = {name: 1.0 for name in plan.order}
+            self.__unresolved = []
+        self.__critical_path, self.__critical_cost = plan.critical_path(weights)
+
+    @staticmethod
+    def from_path(path: Path, use_timings: bool = True) -> "MomanModuleGraph":
+        modular_info = MomanModularInfo.from_path(path)
+        modules = modular_info.modules
+        plan = MomanBuildPlan.from_modules(modules, modular_info.entry_name)
+
+        timings: Dict[str, Dict[str, float]] | NoneType = None
+        if use_timings:
+            previous = MomanBuildTimings.load_previous(path)
+            if previous is not None:
+                timings = previous.get("modules", {})
+
+        return MomanModuleGraph(
+            plan, {name: module_config for name, (module_config, _) in modules.items()}, timings
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        critical_edges = self.__critical_edges()
+
+        nodes: List[Dict[str, Any]] = []
+        for name in self.__plan.order:
+            module_config = self.__modules[name]
+            node: Dict[str, Any] = {
+                "name": name,
+                "interface": module_config.interface,
+                "scope": module_config.scope.value,
+                "lazy": module_config.lazy,
+                "level": self.__plan.levels[name],
+                "critical": name in self.__critical_path,
+            }
+            if self.__timings is not None:
+                node["resolved"] = name in self.__timings
+                node["timings_ms"] = self.__costs_ms(name)
+            nodes.append(node)
+
+        edges = [
+            {"from": name, "to": dep, "critical": (name, dep) in critical_edges}
+            for name in self.__plan.order for dep in self.__plan.dependencies[name]
+        ]
+
+        return {
+            "entry": self.__plan.entry_name,
+            "timings": self.__timings is not None,
+            "nodes": nodes,
+            "edges": edges,
+            "critical_path": {
+                "modules": self.__critical_path,
+                # 没有耗时记录时为依赖链的长度
+                "cost": self.__critical_cost * 1e3 if self.__timings is not None else self.__critical_cost,
+                "unit": "ms" if self.__timings is not None else "modules",
+            },
+            "unresolved": self.__unresolved,
+        }
+
+    def to_dot(self) -> str:
+        """生成 graphviz 的 DOT 格式, 边从模块指向其依赖
+
+        关键路径上的节点和边使用红色加粗, unresolved 模块使用灰色虚线, lazy 模块使用虚线边框
+        """
+        critical_edges = self.__critical_edges()
+        critical = set(self.__critical_path)
+        unresolved = set(self.__unresolved)
+
+        lines = [
+            "digraph moman {",
+            "  rankdir=TB;",
+            "  node [shape=box, fontname=\"Helvetica\"];",
+            "  // critical path: %s (%s)" % (" -> ".join(self.__critical_path), self.__format_cost()),
+        ]
+        if len(self.__unresolved) > 0:
+            lines.append("  // unresolved: %s" % ", ".join(self.__unresolved))
+
+        for name in self.__plan.order:
+            module_config = self.__modules[name]
+            label = [name, "%s, %s%s" % (
+                module_config.interface, module_config.scope.value, ", lazy" if module_config.lazy else ""
+            )]
+            if self.__timings is not None:
+                if name in unresolved:
+                    label.append("unresolved")
+                else:
+                    costs = self.__costs_ms(name)
+                    label.append(" / ".join(
+                        "%s %.2fms" % (phase.value, costs[phase.value]) for phase in MOMAN_GRAPH_START_PHASES
+                    ))
+
+            attributes = ["label=%s" % json.dumps("\n".join(label))]
+            styles: List[str] = []
+            if module_config.lazy:
+                styles.append("dashed")
+            if name == self.__plan.entry_name:
+                styles.append("bold")
+            if name in critical:
+                attributes += ["color=red", "penwidth=2"]
+            elif name in unresolved:
+                attributes += ["color=gray", "fontcolor=gray"]
+                if "dashed" not in styles:
+                    styles.append("dashed")
+            if len(styles) > 0:
+                attributes.append("style=%s" % json.dumps(",".join(styles)))
+            lines.append("  %s [%s];" % (json.dumps(name), ", ".join(attributes)))
+
+        for name in self.__plan.order:
+            for dep in self.__plan.dependencies[name]:
+                attributes = ""
+                if (name, dep) in critical_edges:
+                    attributes = " [color=red, penwidth=2]"
+                elif dep in unresolved:
+                    attributes = " [color=gray, style=dashed]"
+                lines.append("  %s -> %s%s;" % (json.dumps(name), json.dumps(dep), attributes))
+
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self) -> List[str]:
+        lines = ["critical path: %s (%s)" % (" -> ".join(self.__critical_path), self.__format_cost())]
+        if self.__timings is None:
+            lines.append("no complete timings recorded, run `moman build` to weight the graph by start time")
+        elif len(self.__unresolved) > 0:
+            lines.append("never resolved in the last build: %s" % ", ".join(self.__unresolved))
+        return lines
+
+    @property
+    def critical_path(self) -> List[str]:
+        return self.__critical_path
+
+    @property
+    def unresolved(self) -> List[str]:
+        return self.__unresolved
+
+    def __critical_edges(self) -> Set[Tuple[str, str]]:
+        return set(zip(self.__critical_path, self.__critical_path[1:]))
+
+    def __costs_ms(self, name: str) -> Dict[str, float]:
+        costs = self.__timings.get(name, {})
+        return {
+            phase.value: costs.get(phase.value, 0.0) * 1e3
+            for phase in MOMAN_GRAPH_START_PHASES
+        }
+
+    def __format_cost(self) -> str:
+        if self.__timings is None:
+            return "%d modules" % self.__critical_cost
+        return "%.2fms" % (self.__critical_cost * 1e3)
+
+
+class MomanGraphHandler(MomanCmdHandler):
+    def __init__(self):
+        super().__init__(MomanCmdKind.Graph)
+
+    @override
+    def invoke(self, config: MomanCmdBaseConfig):
+        if not isinstance(config, MomanGraphConfig):
+            config = MomanGraphConfig(config.path)
+
+        graph = MomanModuleGraph.from_path(config.path, config.use_timings)
+        match config.graph_format:
+            case MomanGraphFormat.Json:
+                content = json.dumps(graph.to_dict(), indent=2) + "\n"
+            case _:
+                content = graph.to_dot()
+
+        # 输出到标准输出时只输出图本身, 便于通过管道交给 dot 等工具
+        if config.output is None:
+            print(content, end="")
+            return
+
+        utils.write_file(config.output, content)
+        utils.MomanLogger.info("graph saved, path: %s" % config.output)
+        for line in graph.format_summary():
+            utils.MomanLogger.info(line)
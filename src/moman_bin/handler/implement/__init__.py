@@ -1,32 +1,35 @@
 from typing import Tuple, override
-from abc import ABCMeta
 from pathlib import Path
-import re
 
-from moman_bin import utils, constants, template
-from moman_bin.info.modular import MomanModularInfo
+from moman_bin import constants, template
 from moman_bin.info.config.module import MomanModuleImplementConfig
 from moman_bin.errors import MomanImplementError
 
-from .. import import_utils
+from .. import import_utils, inspect_utils
 from ..base import (
     MomanCmdHandler,
     MomanCmdKind,
     MomanCmdBaseConfig,
     MomanCmdOperateType,
 )
+from ..transaction import MomanProjectTransaction
 
 
 class MomanImplementConfig(MomanCmdBaseConfig):
     __interface_name: str
     __implement_name: str
+    __exec_interface: bool
+    __use_async: bool
 
     def __init__(
-        self, path: Path, interface_name: str, implement_name: str, operate_type: MomanCmdOperateType
+        self, path: Path, interface_name: str, implement_name: str, operate_type: MomanCmdOperateType,
+        exec_interface: bool = False, use_async: bool = False
     ):
         super().__init__(path, operate_type)
         self.__interface_name = interface_name
         self.__implement_name = implement_name
+        self.__exec_interface = exec_interface
+        self.__use_async = use_async
 
     @property
     def interface_name(self) -> str:
@@ -36,6 +39,16 @@ class MomanImplementConfig(MomanCmdBaseConfig):
     def implement_name(self) -> str:
         return self.__implement_name
 
+    @property
+    def exec_interface(self) -> bool:
+        """静态分析失败时, 是否执行 interface.py 获取接口信息"""
+        return self.__exec_interface
+
+    @property
+    def use_async(self) -> bool:
+        """生成的 on_start / on_stop 是否为 async def"""
+        return self.__use_async
+
 
 class MomanImplementHandler(MomanCmdHandler):
     def __init__(self):
@@ -43,13 +56,22 @@ class MomanImplementHandler(MomanCmdHandler):
 
     @override
     def invoke(self, config: MomanCmdBaseConfig):
+        transaction = MomanProjectTransaction(config.path)
+        try:
+            self.apply(config, transaction)
+            transaction.commit()
+        finally:
+            transaction.close()
+
+    def apply(self, config: MomanImplementConfig, transaction: MomanProjectTransaction):
+        """在事务中执行命令, 修改在事务 commit 之后才会写入"""
         match config.operate_type:
             case MomanCmdOperateType.Add:
-                self.__invoke_add(config)
+                self.__invoke_add(config, transaction)
             case MomanCmdOperateType.Remove:
                 pass
 
-    def __invoke_add(self, config: MomanImplementConfig):
+    def __invoke_add(self, config: MomanImplementConfig, transaction: MomanProjectTransaction):
         path = config.path
         interface_name = config.interface_name.lower()
         raw_implement_name = config.implement_name
@@ -58,33 +80,36 @@ class MomanImplementHandler(MomanCmdHandler):
         interface_code_file = path.joinpath(constants.MOMAN_MODULES_FOLDER, interface_name, "interface.py")
 
         implement_code_file, exists = self.__check_implement_exists(
-            path, interface_name, implement_name
+            path, interface_name, implement_name, transaction
         )
-        if exists:
+        # implement 的名称在整个项目中唯一
+        if exists or transaction.store.get_module(implement_name) is not None:
             raise MomanImplementError("implement {name} exists".format(name=implement_name))
 
-        interface_class: ABCMeta = import_utils.import_interface(
-            interface_code_file, interface_name
+        if not transaction.exists(interface_code_file):
+            raise MomanImplementError("interface file not found, path: %s" % interface_code_file)
+
+        interface_spec = inspect_utils.inspect_interface(
+            interface_code_file, interface_name, config.exec_interface,
+            transaction.read_file(interface_code_file).encode()
         )
+        if interface_spec is None:
+            raise MomanImplementError(
+                "interface class not found, path: %s" % interface_code_file
+            )
 
-        interface_class_name = interface_class.__name__
+        interface_class_name = interface_spec.class_name
 
         # 使用模板文件生成出对应代码文件
         implement_class_name = import_utils.translate_to_class_name(
             raw_implement_name
         )
 
-        # 为了完美拷贝函数签名，这里只能使用正则匹配进行拷贝
-        interface_code = utils.read_file(interface_code_file)
-        func_signatures = re.findall(
-            r"\s*@abstractmethod\n\s*(def .*:)\n",
-            interface_code,
-        )
-
+        # 函数签名通过语法树还原, 支持跨行的函数签名
         func_list: str = ""
-        for func_signature in func_signatures:
+        for method in interface_spec.methods:
             func_list += template.MOMAN_NEW_FUNC_TEMPLATE.format(
-                signature=func_signature
+                signature=method.signature
             )
 
         implement_code = template.MOMAN_NEW_IMPLEMENT_TEMPLATE.format(
@@ -94,15 +119,15 @@ class MomanImplementHandler(MomanCmdHandler):
             interface_class_name=interface_class_name,
             implement_class_name=implement_class_name,
             func_list=func_list,
+            async_prefix="async " if config.use_async else "",
         )
 
         implement_code_folder = path.joinpath(constants.MOMAN_MODULES_FOLDER, interface_name, implement_name)
-        implement_code_folder.mkdir(parents=True, exist_ok=True)
 
         implement_code_file = implement_code_folder.joinpath(
             constants.MOMAN_MODULE_INIT_NAME
         )
-        utils.write_file(implement_code_file, implement_code)
+        transaction.write_file(implement_code_file, implement_code)
 
         # 创建 module.yaml 文件
         module_config_data = template.MOMAN_NEW_IMPLEMENT_MODULE_TEMPLATE.format(
@@ -112,21 +137,22 @@ class MomanImplementHandler(MomanCmdHandler):
         module_config_file = implement_code_folder.joinpath(
             constants.MOMAN_MODULE_CONFIG_NAME
         )
-        utils.write_file(module_config_file, module_config_data)
+        transaction.write_file(module_config_file, module_config_data)
 
         # 更新 modular 文件
         implement_config = MomanModuleImplementConfig(implement_name, interface_name)
-        modular = MomanModularInfo.from_path(path)
-        modular.add_implement(implement_config, implement_code_folder)
-        modular.to_path(path)
+        transaction.store.add_implement(implement_config, implement_code_folder)
 
-    def __check_implement_exists(self, path: Path, interface_name: str, implement_name: str) -> Tuple[Path, bool]:
+    def __check_implement_exists(
+        self, path: Path, interface_name: str, implement_name: str, transaction: MomanProjectTransaction
+    ) -> Tuple[Path, bool]:
         """验证模块实现是否存在 (直接使用文件判断更准确)
 
         Args:
             path (Path): 项目路径
             interface_name (str): 接口名称
             implement_name (str): 实现名称
+            transaction (MomanProjectTransaction): 当前的事务, 其中暂存的文件同样视为存在
 
         Returns:
             Tuple[Path, bool]: 实现文件位置, 是否存在
@@ -135,4 +161,4 @@ class MomanImplementHandler(MomanCmdHandler):
             constants.MOMAN_MODULES_FOLDER, interface_name, implement_name, constants.MOMAN_MODULE_INIT_NAME
         )
 
-        return implement_code_file, implement_code_file.exists()
+        return implement_code_file, transaction.exists(implement_code_file)
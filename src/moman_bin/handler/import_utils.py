@@ -1,8 +1,14 @@
+import importlib
 import importlib.util
+import sys
 from enum import Enum
 from pathlib import Path
 from typing import Any
-from types import NoneType
+from types import ModuleType, NoneType
+
+from moman.interface import ENTRY_INTERFACE_NAME
+
+from moman_bin import constants
 
 
 class MomanClassKind(Enum):
@@ -10,18 +16,86 @@ class MomanClassKind(Enum):
     Implement = "Implement"
 
 
+def get_module_name(interface_name: str, implement_name: str) -> str:
+    """模块在 sys.modules 中的名称, 与项目中 import 语句使用的名称保持一致
+
+    Args:
+        interface_name (str): 接口名称, 入口模块为 entry
+        implement_name (str): 实现名称
+
+    Returns:
+        str: 入口模块为入口名称, 其余模块为 modules.<interface>.<implement>
+    """
+    if ENTRY_INTERFACE_NAME == interface_name:
+        return implement_name
+
+    return "%s.%s.%s" % (constants.MOMAN_MODULES_FOLDER, interface_name, implement_name)
+
+
 def import_interface(path: Path, interface_name: str) -> Any | NoneType:
-    return __inner_import_class(path, interface_name, MomanClassKind.Interface)
+    module_name = "%s.%s.interface" % (constants.MOMAN_MODULES_FOLDER, interface_name)
+    return __inner_get_class(
+        import_file(path, module_name), interface_name, MomanClassKind.Interface
+    )
+
+
+def import_implement(module_name: str, implement_name: str) -> Any | NoneType:
+    """通过 import 机制加载模块实现, 需要提前注册 MomanModuleFinder
+
+    Args:
+        module_name (str): 模块名称, 参考 get_module_name
+        implement_name (str): 实现名称
+    """
+    module = importlib.import_module(module_name)
+    return __inner_get_class(module, implement_name, MomanClassKind.Implement)
 
 
-def import_implement(path: Path, implement_name: str) -> Any | NoneType:
-    return __inner_import_class(path, implement_name, MomanClassKind.Implement)
+def unload_module(module_name: str) -> int:
+    """从 sys.modules 中移除模块以及其中的子模块, 下次 import 时重新执行文件
+
+    Args:
+        module_name (str): 模块名称, 参考 get_module_name
+
+    Returns:
+        int: 移除的模块数量
+    """
+    prefix = module_name + "."
+    names = [name for name in sys.modules if name == module_name or name.startswith(prefix)]
+    for name in names:
+        del sys.modules[name]
+
+    # 文件内容变化之后, finder 中缓存的目录信息可能已经过期
+    importlib.invalidate_caches()
+    return len(names)
+
+
+def import_file(path: Path, module_name: str) -> ModuleType:
+    """按照指定的名称加载文件, 已经加载过的模块直接从 sys.modules 中获取
+
+    Args:
+        path (Path): python 文件路径
+        module_name (str): 模块名称
+    """
+    module = sys.modules.get(module_name, None)
+    if module is not None:
+        return module
+
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+
+    # 执行之前注册, 与标准的 import 行为保持一致, 失败时移除
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        sys.modules.pop(module_name, None)
+        raise
+
+    return module
 
 
-def __inner_import_class(path: Path, name: str, kind: MomanClassKind) -> Any | NoneType:
-    interface_spec = importlib.util.spec_from_file_location(name, path)
-    interface_module = importlib.util.module_from_spec(interface_spec)
-    interface_spec.loader.exec_module(interface_module)
+def __inner_get_class(module: ModuleType, name: str, kind: MomanClassKind) -> Any | NoneType:
+    interface_module = module
 
     interface_cname = name[0].upper() + name[1:] + kind.value
     interface_full_cname = name.upper() + kind.value
@@ -0,0 +1,181 @@
+# 通过静态分析 interface.py 获取接口信息, 不需要执行接口文件
+# 避免接口文件中引入的重型依赖拖慢 modular 以及执行过程中产生副作用
+
+from typing import Dict, List, Tuple, Any
+from types import NoneType
+from pathlib import Path
+import ast
+import hashlib
+import inspect
+
+from .import_utils import MomanClassKind, import_interface
+
+# 已经分析过的接口文件, key 值为 (文件内容 hash, 接口名称)
+__interface_specs: Dict[Tuple[str, str], "MomanInterfaceSpec | NoneType"] = {}
+
+
+class MomanInterfaceMethod:
+    __name: str
+    __signature: str
+    __is_async: bool
+
+    def __init__(self, name: str, signature: str, is_async: bool = False):
+        self.__name = name
+        self.__signature = signature
+        self.__is_async = is_async
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.__name,
+            "signature": self.__signature,
+            "async": self.__is_async,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "MomanInterfaceMethod":
+        return MomanInterfaceMethod(data["name"], data["signature"], data.get("async", False))
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def signature(self) -> str:
+        """函数签名, 例如 def func(self, a: int) -> str:"""
+        return self.__signature
+
+    @property
+    def is_async(self) -> bool:
+        return self.__is_async
+
+
+class MomanInterfaceSpec:
+    __class_name: str
+    __methods: List[MomanInterfaceMethod]
+
+    def __init__(self, class_name: str, methods: List[MomanInterfaceMethod]):
+        self.__class_name = class_name
+        self.__methods = methods
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "class": self.__class_name,
+            "methods": [method.to_dict() for method in self.__methods],
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "MomanInterfaceSpec":
+        return MomanInterfaceSpec(
+            data["class"],
+            [MomanInterfaceMethod.from_dict(method) for method in data["methods"]]
+        )
+
+    @property
+    def class_name(self) -> str:
+        return self.__class_name
+
+    @property
+    def methods(self) -> List[MomanInterfaceMethod]:
+        """接口中使用 @abstractmethod 声明的函数"""
+        return self.__methods
+
+
+def inspect_interface(
+    path: Path, interface_name: str, execute: bool = False, source: bytes | NoneType = None
+) -> MomanInterfaceSpec | NoneType:
+    """获取接口文件中的接口信息, 结果会根据文件内容 hash 进行缓存
+
+    Args:
+        path (Path): interface.py 文件路径
+        interface_name (str): 接口名称
+        execute (bool): 静态分析失败时, 是否执行接口文件进行查找
+        source (bytes | NoneType): 文件内容, 例如尚未写入磁盘的文件, 为 None 时从 path 读取
+
+    Returns:
+        MomanInterfaceSpec | NoneType: 接口信息, 接口类不存在时返回 None
+    """
+    if source is None:
+        with open(path, "rb") as f:
+            source = f.read()
+
+    key = (hashlib.sha1(source).hexdigest(), interface_name)
+    if key in __interface_specs:
+        spec = __interface_specs[key]
+    else:
+        spec = __inner_inspect_source(source, interface_name)
+        __interface_specs[key] = spec
+
+    # 例如接口类通过其他模块导入等静态分析无法处理的情况
+    if spec is None and execute:
+        spec = __inner_inspect_class(path, interface_name)
+
+    return spec
+
+
+def __inner_class_names(name: str, kind: MomanClassKind) -> List[str]:
+    # 与 import_utils 中的类名规则保持一致
+    return [name[0].upper() + name[1:] + kind.value, name.upper() + kind.value]
+
+
+def __inner_is_abstract(decorator: ast.expr) -> bool:
+    if isinstance(decorator, ast.Name):
+        return decorator.id == "abstractmethod"
+    if isinstance(decorator, ast.Attribute):
+        return decorator.attr == "abstractmethod"
+    return False
+
+
+def __inner_inspect_source(source: bytes, interface_name: str) -> MomanInterfaceSpec | NoneType:
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+
+    classes: Dict[str, ast.ClassDef] = {
+        node.name: node for node in tree.body if isinstance(node, ast.ClassDef)
+    }
+
+    class_node: ast.ClassDef | NoneType = None
+    for class_name in __inner_class_names(interface_name, MomanClassKind.Interface):
+        class_node = classes.get(class_name, None)
+        if class_node is not None:
+            break
+
+    if class_node is None:
+        return None
+
+    methods: List[MomanInterfaceMethod] = []
+    for node in class_node.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if not any(__inner_is_abstract(decorator) for decorator in node.decorator_list):
+            continue
+
+        is_async = isinstance(node, ast.AsyncFunctionDef)
+        signature = "%sdef %s(%s)" % (
+            "async " if is_async else "", node.name, ast.unparse(node.args)
+        )
+        if node.returns is not None:
+            signature += " -> " + ast.unparse(node.returns)
+        methods.append(MomanInterfaceMethod(node.name, signature + ":", is_async))
+
+    return MomanInterfaceSpec(class_node.name, methods)
+
+
+def __inner_inspect_class(path: Path, interface_name: str) -> MomanInterfaceSpec | NoneType:
+    interface_class = import_interface(path, interface_name)
+    if interface_class is None:
+        return None
+
+    methods: List[MomanInterfaceMethod] = []
+    for name in sorted(getattr(interface_class, "__abstractmethods__", [])):
+        # on_start 和 on_stop 由基类声明, 不属于接口定义
+        if name in ("on_start", "on_stop"):
+            continue
+
+        func = getattr(interface_class, name)
+        is_async = inspect.iscoroutinefunction(func)
+        signature = "%sdef %s%s:" % ("async " if is_async else "", name, inspect.signature(func))
+        methods.append(MomanInterfaceMethod(name, signature, is_async))
+
+    return MomanInterfaceSpec(interface_class.__name__, methods)
@@ -1,30 +1,38 @@
 from typing import Tuple, override
 from pathlib import Path
 
-from moman_bin import utils, constants, template
-from moman_bin.info.modular import MomanModularInfo
+from moman_bin import constants, template
 from moman_bin.errors import MomanInterfaceError
 
 from .. import import_utils
 from ..base import MomanCmdHandler, MomanCmdKind, MomanCmdBaseConfig, MomanCmdOperateType
+from ..transaction import MomanProjectTransaction
 
 
 class MomanInterfaceConfig(MomanCmdBaseConfig):
     __interface_name: str
+    __use_async: bool
 
     def __init__(
         self,
         path: Path,
         interface_name: str,
-        operate_type: MomanCmdOperateType
+        operate_type: MomanCmdOperateType,
+        use_async: bool = False,
     ):
         super().__init__(path, operate_type)
         self.__interface_name = interface_name
+        self.__use_async = use_async
 
     @property
     def interface_name(self) -> str:
         return self.__interface_name
 
+    @property
+    def use_async(self) -> bool:
+        """生成的抽象方法是否为 async def"""
+        return self.__use_async
+
 
 class MomanInterfaceHandler(MomanCmdHandler):
     def __init__(self):
@@ -32,24 +40,30 @@ class MomanInterfaceHandler(MomanCmdHandler):
 
     @override
     def invoke(self, config: MomanCmdBaseConfig):
+        transaction = MomanProjectTransaction(config.path)
+        try:
+            self.apply(config, transaction)
+            transaction.commit()
+        finally:
+            transaction.close()
+
+    def apply(self, config: MomanInterfaceConfig, transaction: MomanProjectTransaction):
+        """在事务中执行命令, 修改在事务 commit 之后才会写入"""
         match config.operate_type:
             case MomanCmdOperateType.Add:
-                self.__invoke_add(config)
+                self.__invoke_add(config, transaction)
             case MomanCmdOperateType.Remove:
                 pass
 
-    def __invoke_add(self, config: MomanInterfaceConfig):
+    def __invoke_add(self, config: MomanInterfaceConfig, transaction: MomanProjectTransaction):
         path = config.path
         raw_interface_name = config.interface_name
         interface_name = raw_interface_name.lower()
 
-        interface_code_file, exists = self.__check_interface_exists(path, interface_name)
+        interface_code_file, exists = self.__check_interface_exists(path, interface_name, transaction)
         if exists:
             raise MomanInterfaceError("interface {name} exists".format(name=interface_name))
 
-        interface_code_folder = path.joinpath(constants.MOMAN_MODULES_FOLDER, interface_name)
-        interface_code_folder.mkdir(exist_ok=True)
-
         # interface 的类名支持大驼峰和全大写两种显示格式
         # 目前区分方法时根据用户传入的是全大写字符还是其他形式决定的
         interface_class_name = import_utils.translate_to_class_name(raw_interface_name)
@@ -58,23 +72,23 @@ class MomanInterfaceHandler(MomanCmdHandler):
             interface_name=interface_name,
             upper_interface_name=interface_name.upper(),
             interface_class_name=interface_class_name,
+            async_prefix="async " if config.use_async else "",
         )
 
-        utils.write_file(interface_code_file, interface_code)
+        transaction.write_file(interface_code_file, interface_code)
 
         # 更新 modular 文件
-        modular = MomanModularInfo.from_path(path)
-        modular.add_interface(interface_name)
-        modular.to_path(path)
+        transaction.store.add_interface(interface_name)
 
     def __check_interface_exists(
-        self, path: Path, interface_name: str
+        self, path: Path, interface_name: str, transaction: MomanProjectTransaction
     ) -> Tuple[Path, bool]:
         """验证接口是否存在 (直接使用文件判断更准确)
 
         Args:
             path (Path): 项目路径
             interface_name (str): 接口名称
+            transaction (MomanProjectTransaction): 当前的事务, 其中暂存的文件同样视为存在
 
         Returns:
             Tuple[Path, bool] 接口文件位置, 是否存在
@@ -84,4 +98,4 @@ class MomanInterfaceHandler(MomanCmdHandler):
             constants.MOMAN_INTERFACE_NAME
         )
 
-        return interface_code_file, interface_code_file.exists()
+        return interface_code_file, transaction.exists(interface_code_file)
@@ -1,29 +1,132 @@
-from typing import override, Dict, Any
+from typing import override, Dict, List, Any
+from types import NoneType
+from functools import partial
 from pathlib import Path
+import time
+
+import yaml
 
 from .base import MomanCmdHandler, MomanCmdKind, MomanCmdBaseConfig
 
 from moman_bin import constants, utils
-from moman_bin.errors import MomanModularError
+from moman_bin.errors import MomanBinError, MomanModularError
 from moman_bin.info.config.base import MomanModuleType
 from moman_bin.info.config.root import MomanRootConfig
-from moman_bin.info.config.module import MomanModuleConfig, MomanConfigType
+from moman_bin.info.config.module import MomanModuleConfig
 from moman_bin.info.modular import MomanModularInfo
+from moman_bin.info.cache import MomanModularCache
+from moman_bin.info.store import MomanSqliteModularStore
 
-from .import_utils import import_interface
+from .inspect_utils import inspect_interface
+from .scan_utils import scan_modules
+from .watch_utils import MomanFileWatcher, wait_for_interrupt
 
 # NOTICE: module 的 implement 是全局唯一的
 
 
+class MomanModularConfig(MomanCmdBaseConfig):
+    __jobs: int
+    __exec_interface: bool
+    __use_db: bool
+    __export: bool
+    __watch: bool
+
+    def __init__(
+        self, path: Path, jobs: int = 1, exec_interface: bool = False,
+        use_db: bool = False, export: bool = False, watch: bool = False
+    ):
+        super().__init__(path)
+        self.__jobs = jobs
+        self.__exec_interface = exec_interface
+        self.__use_db = use_db
+        self.__export = export
+        self.__watch = watch
+
+    @property
+    def jobs(self) -> int:
+        """解析模块配置文件时使用的进程数量"""
+        return self.__jobs
+
+    @property
+    def exec_interface(self) -> bool:
+        """静态分析失败时, 是否执行 interface.py 进行校验"""
+        return self.__exec_interface
+
+    @property
+    def use_db(self) -> bool:
+        """是否创建 modular.db, 已经存在时总会同步更新"""
+        return self.__use_db
+
+    @property
+    def export(self) -> bool:
+        """只从 modular.db 导出 modular 文件, 不重新分析项目"""
+        return self.__export
+
+    @property
+    def watch(self) -> bool:
+        """分析完成之后持续监听项目, 文件变化时增量更新"""
+        return self.__watch
+
+
+# 下面两个函数会在子进程中执行, 因此需要定义在模块顶层
+def parse_module_config_file(file_path: Path) -> Dict[str, Any]:
+    data = utils.read_yaml(file_path)
+    # 提前在子进程中完成校验
+    MomanModuleConfig.from_dict(data)
+    return data
+
+
+def inspect_interface_file(file_path: Path, execute: bool = False) -> Dict[str, Any] | NoneType:
+    # interface 文件路径为 modules/<interface>/interface.py
+    spec = inspect_interface(file_path, file_path.parent.name, execute)
+    if spec is None:
+        return None
+    return spec.to_dict()
+
+
 class MomanModularHandler(MomanCmdHandler):
     def __init__(self):
         super().__init__(MomanCmdKind.Modular)
 
     @override
     def invoke(self, config: MomanCmdBaseConfig):
-        self.analyze_project(config.path)
+        if not isinstance(config, MomanModularConfig):
+            config = MomanModularConfig(config.path)
+
+        if config.export:
+            self.export_project(config.path)
+            return
+
+        if config.watch:
+            MomanModularWatcher(self, config).run()
+            return
+
+        self.analyze_project(config)
+
+    def export_project(self, path: Path):
+        store = MomanSqliteModularStore.open(path)
+        if store is None:
+            raise MomanModularError("modular db not found, run `moman modular --db` first")
+
+        try:
+            with utils.MomanProjectLock(path):
+                store.to_info().to_path(path)
+        finally:
+            store.close()
+
+    def analyze_project(self, config: MomanModularConfig) -> MomanModularInfo:
+        """完整分析项目并保存结果, 整个过程持有项目锁"""
+        with utils.MomanProjectLock(config.path):
+            return self.__analyze_project(config)
+
+    def __analyze_project(self, config: MomanModularConfig) -> MomanModularInfo:
+        path = config.path
+        jobs = config.jobs
+        exec_interface = config.exec_interface
+
+        # 未发生变化的文件直接复用上次的解析结果
+        cache = MomanModularCache.from_path(path)
 
-    def analyze_project(self, path: Path):
         # 读取根项目的模块配置文件
         root_config_file = path.joinpath(
             constants.MOMAN_MODULE_CONFIG_NAME
@@ -32,22 +135,32 @@ class MomanModularHandler(MomanCmdHandler):
         if not root_config_file.exists():
             raise MomanModularError("root module config not found")
 
-        root_config = MomanRootConfig.from_dict(utils.read_yaml(root_config_file))
+        root_config = MomanRootConfig.from_dict(cache.load_yaml(root_config_file))
 
         # 校验声明的 interface 对象是否存在
-        for interface in root_config.interfaces:
-            interface_file = path.joinpath(
+        interface_files = [
+            path.joinpath(
                 constants.MOMAN_MODULES_FOLDER, interface,
                 constants.MOMAN_INTERFACE_NAME
             )
+            for interface in root_config.interfaces
+        ]
 
+        for interface_file in interface_files:
             if not interface_file.exists():
                 raise MomanModularError(
                     "interface file not found, path: %s" % interface_file
                 )
 
-            # 校验模块文件中的对象是否存在
-            if import_interface(interface_file, interface) is None:
+        # 校验模块文件中的对象是否存在
+        interface_specs = cache.load_many(
+            interface_files,
+            "interface-exec" if exec_interface else "interface",
+            partial(inspect_interface_file, execute=exec_interface),
+            jobs
+        )
+        for interface_file, interface_spec in zip(interface_files, interface_specs):
+            if interface_spec is None:
                 raise MomanModularError(
                     "interface class not found, path: %s" % interface_file
                 )
@@ -57,7 +170,7 @@ class MomanModularHandler(MomanCmdHandler):
             root_config.entry_name, constants.MOMAN_MODULE_CONFIG_NAME
         ).absolute()
 
-        entry_config = MomanModuleConfig.from_dict(utils.read_yaml(entry_config_file))
+        entry_config = MomanModuleConfig.from_dict(cache.load_yaml(entry_config_file))
         if MomanModuleType.Entry != entry_config.module_type:
             raise MomanModularError(
                 "this is not entry module, name: %s, path: %s" %
@@ -67,26 +180,34 @@ class MomanModularHandler(MomanCmdHandler):
         module_configs = {entry_config.name: (entry_config, entry_config_file.parent)}
 
         # 遍历 modules 目录模块文件
-        modules_folder = path.joinpath(constants.MOMAN_MODULES_FOLDER)
-        for module_folder, _, _ in modules_folder.walk():
-            if module_folder.is_file():
-                continue
+        module_impl_folders = scan_modules(path)
+        module_config_datas = cache.load_many(
+            [
+                module_impl_folder.joinpath(constants.MOMAN_MODULE_CONFIG_NAME)
+                for module_impl_folder in module_impl_folders
+            ],
+            "module", parse_module_config_file, jobs
+        )
 
-            module_interface_file = module_folder.joinpath(constants.MOMAN_INTERFACE_NAME)
-            if not module_interface_file.exists():
-                continue
+        # 按照扫描顺序合并结果, 保证与串行处理的结果一致
+        for module_impl_folder, module_config_data in zip(module_impl_folders, module_config_datas):
+            implement_name = module_impl_folder.name
+            utils.MomanLogger.debug("scan module, name: %s" % implement_name)
+            module_configs[implement_name] = (MomanModuleConfig.from_dict(module_config_data), module_impl_folder.absolute())
 
-            for module_impl_folder, _, _ in module_folder.walk():
-                if module_impl_folder.is_file():
-                    continue
+        result = MomanModularInfo(
+            root_config.entry_name, entry_config_file.parent,
+            root_config.interfaces, module_configs
+        )
+        self.save_project(config, result)
+        cache.to_path(path)
 
-                module_config_file = module_impl_folder.joinpath(constants.MOMAN_MODULE_CONFIG_NAME)
-                if not module_config_file.exists():
-                    continue
+        return result
 
-                implement_name = module_impl_folder.name
-                utils.MomanLogger.debug("scan module, name: %s" % implement_name)
-                module_configs[implement_name] = (MomanModuleConfig.from_dict(utils.read_yaml(module_config_file)), module_impl_folder.absolute())
+    def save_project(self, config: MomanModularConfig, info: MomanModularInfo):
+        """更新依赖路径, 补充 config.yaml 并保存解析结果, 内容没有变化的文件不会被重写"""
+        path = config.path
+        module_configs = info.modules
 
         # 更新 dep 信息
         for module_config, _ in module_configs.values():
@@ -97,43 +218,156 @@ class MomanModularHandler(MomanCmdHandler):
         # 生成配置文件
         config_file = path.joinpath(constants.MOMAN_CONFIG_NAME)
         if config_file.exists():
-            origin_config_map: Dict[str, Dict[str, MomanConfigType]] = utils.read_yaml(
+            origin_config_map: Dict[str, Dict[str, Any]] = utils.read_yaml(
                 config_file
-            )
+            ) or {}
         else:
             origin_config_map = {}
 
+        config_changed = not config_file.exists()
         for module, _ in module_configs.values():
-            origin_config = origin_config_map.get(module.name, {})
+            origin_config = origin_config_map.get(module.name, None)
             if origin_config is None:
-                origin_config[module.name] = {}
+                origin_config = {}
+                config_changed = True
 
-            for key, config_t in module.config_map.items():
-                config_value = origin_config.get(key, None)    
-                if config_value is not None:
-                    continue
-                default_value: Any
-                match config_t:
-                    case MomanConfigType.String:
-                        default_value = ""
-                    case MomanConfigType.Number:
-                        default_value = 0
-                    case MomanConfigType.List:
-                        default_value = []
-                origin_config[key] = default_value
+            # 只补充缺失的配置项, 已有的值在 build 时统一校验
+            for key, item in module.config_map.items():
+                if origin_config.get(key, None) is None:
+                    origin_config[key] = item.default_value
+                    config_changed = True
 
             origin_config_map[module.name] = origin_config
 
-        utils.write_yaml(config_file, origin_config_map)
+        # 没有补充任何配置项时不重新序列化, 内容未发生变化时不重写文件
+        if config_changed:
+            utils.write_yaml_if_changed(config_file, origin_config_map)
 
         # 保存解析结果
-        result = MomanModularInfo(
-            root_config.entry_name, entry_config_file.parent,
-            root_config.interfaces, module_configs
-        )
+        path.joinpath(constants.MOMAN_CACHE_FOLDER).mkdir(exist_ok=True)
+        info.to_path(path)
+
+        # 数据库只在启用之后才会同步
+        if config.use_db or MomanSqliteModularStore.exists(path):
+            store = MomanSqliteModularStore.open(path, create=True)
+            try:
+                store.save_info(info)
+            finally:
+                store.close()
+
+
+class MomanModularWatcher:
+    """modular --watch: 启动时完整分析一次, 之后在内存中保留分析结果
+
+    单个 module.yaml 或者 interface.py 发生变化时只重新解析这个文件;
+    根配置变化、模块目录的增加或者删除等情况重新完整分析 (未变化的文件仍然复用缓存)
+    """
+
+    __handler: MomanModularHandler
+    __config: MomanModularConfig
+    __path: Path
+    __info: MomanModularInfo | NoneType
+
+    def __init__(self, handler: MomanModularHandler, config: MomanModularConfig):
+        self.__handler = handler
+        self.__config = config
+        self.__path = config.path.absolute()
+        self.__info = None
+
+    def run(self):
+        """完整分析一次之后持续监听, 直到收到 Ctrl-C 或者 SIGTERM"""
+        self.__info = self.__handler.analyze_project(self.__config)
+
+        path = self.__path
+        watcher = MomanFileWatcher([
+            path.joinpath(constants.MOMAN_MODULE_CONFIG_NAME),
+            path.joinpath(self.__info.entry_name, constants.MOMAN_MODULE_CONFIG_NAME),
+            path.joinpath(constants.MOMAN_MODULES_FOLDER),
+        ], self.update)
+        watcher.start()
+        try:
+            wait_for_interrupt("watching project, backend: %s, press Ctrl-C to stop" % watcher.backend_name)
+        finally:
+            watcher.stop()
+
+    def update(self, changed_files: List[Path]):
+        begin = time.perf_counter()
+        try:
+            with utils.MomanProjectLock(self.__path):
+                kind = self.__apply(changed_files)
+        except (MomanBinError, yaml.YAMLError, OSError, KeyError) as e:
+            # 文件可能只编辑了一半, 保留上一次的结果继续监听
+            utils.MomanLogger.error("modular failed, keep watching: %s" % e)
+            return
+
+        if kind is not None:
+            utils.MomanLogger.info("modular updated (%s), files: %d, cost: %.1fms" % (
+                kind, len(changed_files), (time.perf_counter() - begin) * 1e3
+            ))
+
+    def __apply(self, changed_files: List[Path]) -> str | NoneType:
+        """应用文件变化, 返回更新方式, 没有相关的变化时返回 None"""
+        path = self.__path
+        info = self.__info
+        if info is None:
+            return self.__analyze()
+
+        root_config_file = path.joinpath(constants.MOMAN_MODULE_CONFIG_NAME)
+        modules_folder = path.joinpath(constants.MOMAN_MODULES_FOLDER)
+        folders = {folder: name for name, (_, folder) in info.modules.items()}
+
+        module_files: Dict[str, Path] = {}
+        interface_files: List[Path] = []
+        for file in changed_files:
+            if file == root_config_file:
+                return self.__analyze()
+
+            if file.name == constants.MOMAN_MODULE_CONFIG_NAME:
+                name = folders.get(file.parent, None)
+                # 新增或者删除了模块
+                if name is None or not file.exists():
+                    return self.__analyze()
+                module_files[name] = file
+            elif file.name == constants.MOMAN_INTERFACE_NAME:
+                if file.parent.parent != modules_folder or file.parent.name not in info.interfaces:
+                    continue
+                if not file.exists():
+                    return self.__analyze()
+                interface_files.append(file)
+            elif file in folders or file.parent == modules_folder:
+                # 模块目录或者接口目录被删除、移动, 新增的模块会通过其中的 module.yaml 识别
+                return self.__analyze()
+
+        if len(module_files) == 0 and len(interface_files) == 0:
+            return None
+
+        for interface_file in interface_files:
+            if inspect_interface_file(interface_file, self.__config.exec_interface) is None:
+                raise MomanModularError("interface class not found, path: %s" % interface_file)
+
+        # 接口文件只需要校验, 不影响解析结果
+        if len(module_files) == 0:
+            return "incremental"
+
+        modules = dict(info.modules)
+        for name, module_file in module_files.items():
+            module_config = MomanModuleConfig.from_dict(parse_module_config_file(module_file))
+            if name == info.entry_name:
+                if MomanModuleType.Entry != module_config.module_type:
+                    raise MomanModularError(
+                        "this is not entry module, name: %s, path: %s" % (module_config.name, module_file)
+                    )
+                # 入口模块以名称作为 key, 名称变化时需要完整分析
+                if module_config.name != name:
+                    return self.__analyze()
+            modules[name] = (module_config, module_file.parent)
 
-        result_file = path.joinpath(constants.MOMAN_MODULAR_FILE)
-        if not result_file.parent.exists():
-            result_file.parent.mkdir()
+        # 重新创建以更新 python 库的统计信息
+        result = MomanModularInfo(info.entry_name, info.entry_path, info.interfaces, modules)
+        self.__handler.save_project(self.__config, result)
+        self.__info = result
+        return "incremental"
 
-        utils.write_yaml(result_file, result.to_dict())
+    def __analyze(self) -> str:
+        self.__info = self.__handler.analyze_project(self.__config)
+        return "full"
@@ -0,0 +1,95 @@
+from typing import List
+from pathlib import Path
+import fnmatch
+import os
+
+from moman_bin import constants, utils
+
+# 扫描时默认跳过的目录
+MOMAN_SCAN_SKIP_FOLDERS = {"__pycache__", "node_modules", "site-packages"}
+# 包含该文件的目录视为 python 虚拟环境
+MOMAN_SCAN_VENV_MARK = "pyvenv.cfg"
+
+
+def read_ignore_patterns(path: Path) -> List[str]:
+    """读取项目根目录下的 .momanignore 文件
+
+    Args:
+        path (Path): 项目路径
+
+    Returns:
+        List[str]: 忽略规则列表, 格式与 .gitignore 的目录规则类似
+    """
+    ignore_file = path.joinpath(constants.MOMAN_IGNORE_FILE)
+    if not ignore_file.exists():
+        return []
+
+    patterns: List[str] = []
+    for line in utils.read_file(ignore_file).splitlines():
+        line = line.strip()
+        if len(line) == 0 or line.startswith("#"):
+            continue
+        patterns.append(line.strip("/"))
+
+    return patterns
+
+
+def scan_modules(path: Path) -> List[Path]:
+    """按照 modules/<interface>/<implement>/ 的目录结构扫描所有的模块实现
+
+    每个目录只会被读取一次, 找到实现目录之后不再继续向下遍历
+
+    Args:
+        path (Path): 项目路径
+
+    Returns:
+        List[Path]: 所有模块实现的目录, 按照路径排序
+    """
+    modules_folder = path.joinpath(constants.MOMAN_MODULES_FOLDER)
+    if not modules_folder.is_dir():
+        return []
+
+    patterns = read_ignore_patterns(path)
+    result: List[Path] = []
+
+    def is_ignored(name: str, rel_path: str) -> bool:
+        if name.startswith(".") or name in MOMAN_SCAN_SKIP_FOLDERS:
+            return True
+
+        for pattern in patterns:
+            if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern):
+                return True
+        return False
+
+    def scan_folder(folder: str, rel_folder: str, in_interface: bool):
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return
+
+        names = {entry.name for entry in entries}
+        if MOMAN_SCAN_VENV_MARK in names:
+            return
+
+        # 接口目录下包含 module.yaml 的目录即为实现目录
+        if in_interface and constants.MOMAN_MODULE_CONFIG_NAME in names:
+            result.append(Path(folder))
+            return
+
+        if not in_interface and constants.MOMAN_INTERFACE_NAME in names:
+            in_interface = True
+
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+
+            rel_path = rel_folder + "/" + entry.name
+            if is_ignored(entry.name, rel_path):
+                continue
+
+            scan_folder(entry.path, rel_path, in_interface)
+
+    scan_folder(str(modules_folder), constants.MOMAN_MODULES_FOLDER, False)
+
+    return result
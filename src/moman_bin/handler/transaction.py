@@ -0,0 +1,76 @@
+# 修改项目的事务: 生成的文件先暂存在内存中, 与模块信息一起在 commit 时写入
+# 单条命令和 batch 共用同一套处理逻辑, batch 只是在一个事务中执行多条命令
+
+from typing import Dict
+from types import NoneType
+from pathlib import Path
+
+from moman_bin import utils
+from moman_bin.info.store import MomanModularStore
+
+
+class MomanProjectTransaction:
+    """读取时优先返回暂存的内容, 之前的操作生成的文件对之后的操作可见
+
+    模块信息只加载一次, 所有操作都修改同一个 store; commit 之前发生错误时调用 close 即可丢弃全部修改。
+    创建时获取项目锁, close 时释放, 并发执行的命令不会基于过期的内容修改项目
+    """
+
+    __path: Path
+    __lock: utils.MomanProjectLock | NoneType
+    __store: MomanModularStore | NoneType
+    # 暂存的文件: 绝对路径 -> 文件内容, 按照写入顺序保存
+    __files: Dict[Path, str]
+
+    def __init__(self, path: Path):
+        self.__path = path
+        self.__store = None
+        self.__files = {}
+
+        self.__lock = utils.MomanProjectLock(path)
+        self.__lock.acquire()
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    @property
+    def store(self) -> MomanModularStore:
+        """第一次访问时打开项目的模块信息"""
+        if self.__store is None:
+            self.__store = MomanModularStore.open(self.__path)
+        return self.__store
+
+    def exists(self, file_path: Path) -> bool:
+        return file_path.absolute() in self.__files or file_path.exists()
+
+    def read_file(self, file_path: Path) -> str:
+        content = self.__files.get(file_path.absolute(), None)
+        if content is not None:
+            return content
+        return utils.read_file(file_path)
+
+    def write_file(self, file_path: Path, content: str):
+        self.__files[file_path.absolute()] = content
+
+    def commit(self):
+        """写入暂存的文件 (自动创建所在目录) 并保存模块信息"""
+        for file_path, content in self.__files.items():
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            utils.write_file(file_path, content)
+        self.__files.clear()
+
+        if self.__store is not None:
+            self.__store.commit()
+
+    def close(self):
+        """释放模块信息和项目锁, 没有 commit 的修改全部丢弃"""
+        self.__files.clear()
+        try:
+            if self.__store is not None:
+                self.__store.close()
+                self.__store = None
+        finally:
+            if self.__lock is not None:
+                self.__lock.release()
+                self.__lock = None
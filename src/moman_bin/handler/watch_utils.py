@@ -0,0 +1,356 @@
+# 文件监听: Linux 上通过 ctypes 调用 inotify, 不可用时退回到轮询文件的修改时间和大小
+
+from typing import Callable, Dict, List, Set, Tuple
+from pathlib import Path
+import ctypes
+import errno
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+
+from moman_bin import utils
+
+# 文件签名: 修改时间, 文件大小
+MomanFileSignature = Tuple[int, int]
+
+# 监听目录时跳过的子目录
+MOMAN_WATCH_SKIP_FOLDERS = {"__pycache__", "node_modules", "site-packages"}
+
+
+def is_skipped_folder(name: str) -> bool:
+    return name.startswith(".") or name in MOMAN_WATCH_SKIP_FOLDERS
+
+
+class MomanPollingBackend:
+    """轮询文件的修改时间和大小, 目录会被递归扫描"""
+
+    __paths: List[Path]
+    __stopped: threading.Event
+    __signatures: Dict[Path, MomanFileSignature]
+
+    def __init__(self, paths: List[Path], stopped: threading.Event):
+        self.__paths = paths
+        self.__stopped = stopped
+        self.__signatures = self.__scan()
+
+    @property
+    def name(self) -> str:
+        return "polling"
+
+    def wait(self, timeout: float) -> Set[Path]:
+        """等待 timeout 秒之后扫描一次, 返回发生变化的文件"""
+        if self.__stopped.wait(timeout):
+            return set()
+
+        signatures = self.__scan()
+        before = self.__signatures
+        self.__signatures = signatures
+        return {
+            path for path in before.keys() | signatures.keys()
+            if before.get(path, None) != signatures.get(path, None)
+        }
+
+    def close(self):
+        pass
+
+    def __scan(self) -> Dict[Path, MomanFileSignature]:
+        signatures: Dict[Path, MomanFileSignature] = {}
+        for path in self.__paths:
+            if path.is_dir():
+                for folder, dir_names, file_names in os.walk(path):
+                    dir_names[:] = [name for name in dir_names if not is_skipped_folder(name)]
+                    for file_name in file_names:
+                        MomanPollingBackend.__stat(Path(folder, file_name), signatures)
+            else:
+                MomanPollingBackend.__stat(path, signatures)
+        return signatures
+
+    @staticmethod
+    def __stat(path: Path, signatures: Dict[Path, MomanFileSignature]):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # 不存在的文件不记录, 删除和重新创建都会被识别为变化
+            return
+        signatures[path] = (stat.st_mtime_ns, stat.st_size)
+
+
+class MomanInotifyBackend:
+    """通过 inotify 监听目录, 只在 Linux 上可用
+
+    目录递归监听, 新建的目录会自动加入监听; 单独的文件通过监听所在的目录实现,
+    这样编辑器通过重命名替换文件时也能够收到事件
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO \
+        | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+    # struct inotify_event 的固定部分: wd, mask, cookie, len
+    EVENT_HEADER = struct.Struct("iIII")
+
+    __libc: ctypes.CDLL
+    __fd: int
+    __paths: List[Path]
+    # watch descriptor -> 目录
+    __folders: Dict[int, Path]
+    # 递归监听的目录
+    __recursive: Set[Path]
+    # 只监听部分文件的目录 -> 文件名称
+    __file_filters: Dict[Path, Set[str]]
+
+    def __init__(self, libc: ctypes.CDLL, fd: int, paths: List[Path]):
+        self.__libc = libc
+        self.__fd = fd
+        self.__paths = paths
+        self.__folders = {}
+        self.__recursive = set()
+        self.__file_filters = {}
+
+        for path in paths:
+            if path.is_dir():
+                self.__add_tree(path)
+            else:
+                self.__file_filters.setdefault(path.parent, set()).add(path.name)
+                self.__add_watch(path.parent)
+
+    @staticmethod
+    def create(paths: List[Path]) -> "MomanInotifyBackend | None":
+        """创建 inotify 实例, 当前平台不支持或者创建失败时返回 None"""
+        if not sys.platform.startswith("linux"):
+            return None
+
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            init = libc.inotify_init1
+        except (OSError, AttributeError):
+            return None
+
+        init.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            utils.MomanLogger.debug("inotify_init1 failed: %s" % os.strerror(ctypes.get_errno()))
+            return None
+
+        try:
+            return MomanInotifyBackend(libc, fd, paths)
+        except OSError as e:
+            # 例如超出了 max_user_watches 的限制
+            os.close(fd)
+            utils.MomanLogger.debug("inotify watch failed: %s" % e)
+            return None
+
+    @property
+    def name(self) -> str:
+        return "inotify"
+
+    def wait(self, timeout: float) -> Set[Path]:
+        """等待事件, 返回 timeout 秒内发生变化的路径, 没有事件时返回空集合"""
+        readable, _, _ = select.select([self.__fd], [], [], timeout)
+        if len(readable) == 0:
+            return set()
+
+        changed: Set[Path] = set()
+        while True:
+            try:
+                data = os.read(self.__fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            self.__parse_events(data, changed)
+
+        return changed
+
+    def close(self):
+        os.close(self.__fd)
+
+    def __parse_events(self, data: bytes, changed: Set[Path]):
+        header = MomanInotifyBackend.EVENT_HEADER
+        offset = 0
+        while offset + header.size <= len(data):
+            wd, mask, _, length = header.unpack_from(data, offset)
+            raw_name = data[offset + header.size:offset + header.size + length]
+            offset += header.size + length
+
+            if mask & MomanInotifyBackend.IN_Q_OVERFLOW:
+                # 事件队列溢出, 无法确定具体的文件, 认为所有路径都发生了变化
+                changed.update(self.__paths)
+                continue
+
+            folder = self.__folders.get(wd, None)
+            if folder is None:
+                continue
+            if mask & MomanInotifyBackend.IN_IGNORED:
+                # 目录被删除, 监听已经失效
+                self.__folders.pop(wd, None)
+                continue
+            if mask & MomanInotifyBackend.IN_MOVE_SELF:
+                # 目录被移走之后原有的路径已经失效, 移除其中所有的监听, 移入的位置会收到 IN_MOVED_TO
+                for child_wd, child in list(self.__folders.items()):
+                    if child == folder or child.is_relative_to(folder):
+                        self.__libc.inotify_rm_watch(self.__fd, child_wd)
+                        self.__folders.pop(child_wd)
+                continue
+
+            name = os.fsdecode(raw_name.rstrip(b"\0"))
+            if len(name) == 0:
+                continue
+
+            file_filter = self.__file_filters.get(folder, None)
+            if not self.__is_recursive(folder):
+                if file_filter is not None and name in file_filter:
+                    changed.add(folder.joinpath(name))
+                continue
+
+            path = folder.joinpath(name)
+            if mask & MomanInotifyBackend.IN_ISDIR:
+                if is_skipped_folder(name):
+                    continue
+                if mask & (MomanInotifyBackend.IN_CREATE | MomanInotifyBackend.IN_MOVED_TO):
+                    # 新目录中已经存在的文件在加入监听之前就已经创建, 需要直接记录
+                    changed.update(self.__add_tree(path))
+            changed.add(path)
+
+    def __is_recursive(self, folder: Path) -> bool:
+        return any(folder == root or folder.is_relative_to(root) for root in self.__recursive)
+
+    def __add_tree(self, root: Path) -> Set[Path]:
+        """递归监听目录, 返回目录中已经存在的文件"""
+        files: Set[Path] = set()
+        if not self.__is_recursive(root):
+            self.__recursive.add(root)
+        for folder, dir_names, file_names in os.walk(root):
+            dir_names[:] = [name for name in dir_names if not is_skipped_folder(name)]
+            self.__add_watch(Path(folder))
+            files.update(Path(folder, name) for name in file_names)
+        return files
+
+    def __add_watch(self, folder: Path):
+        wd = self.__libc.inotify_add_watch(
+            self.__fd, os.fsencode(folder), MomanInotifyBackend.WATCH_MASK
+        )
+        if wd < 0:
+            code = ctypes.get_errno()
+            # 目录在监听之前已经被删除
+            if code == errno.ENOENT:
+                return
+            raise OSError(code, os.strerror(code), str(folder))
+        self.__folders[wd] = folder
+
+
+class MomanFileWatcher:
+    """在后台线程中监听文件和目录, 发生变化时调用回调
+
+    优先使用 inotify, 不可用时退回到轮询; 收到变化之后等待 debounce 秒内不再有新的变化再回调,
+    例如 git checkout 产生的大量事件只会触发一次回调
+
+    Args:
+        paths (List[Path]): 监听的文件或者目录, 目录会被递归监听 (忽略 __pycache__ 和隐藏目录)
+        callback (Callable[[List[Path]], None]): 回调函数, 参数为发生变化的路径
+        interval (float): 轮询间隔 (秒), 同时也是停止监听的最大等待时间
+        debounce (float): 合并连续变化的等待时间 (秒)
+        use_inotify (bool): 是否尝试使用 inotify
+    """
+
+    __paths: List[Path]
+    __callback: Callable[[List[Path]], None]
+    __interval: float
+    __debounce: float
+    __use_inotify: bool
+    __backend: MomanPollingBackend | MomanInotifyBackend | None
+    __stopped: threading.Event
+    __thread: threading.Thread | None
+
+    def __init__(
+        self, paths: List[Path], callback: Callable[[List[Path]], None],
+        interval: float = 0.5, debounce: float = 0.2, use_inotify: bool = True
+    ):
+        self.__paths = [path.absolute() for path in paths]
+        self.__callback = callback
+        self.__interval = interval
+        self.__debounce = debounce
+        self.__use_inotify = use_inotify
+        self.__backend = None
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def start(self):
+        self.__stopped.clear()
+
+        backend = MomanInotifyBackend.create(self.__paths) if self.__use_inotify else None
+        if backend is None:
+            backend = MomanPollingBackend(self.__paths, self.__stopped)
+        self.__backend = backend
+        utils.MomanLogger.debug("file watcher started, backend: %s" % backend.name)
+
+        self.__thread = threading.Thread(target=self.__run, name="moman-watcher", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join()
+        self.__thread = None
+
+        if self.__backend is not None:
+            self.__backend.close()
+            self.__backend = None
+
+    @property
+    def backend_name(self) -> str:
+        return self.__backend.name if self.__backend is not None else ""
+
+    def __run(self):
+        backend = self.__backend
+        while not self.__stopped.is_set():
+            changed = backend.wait(self.__interval)
+            if len(changed) == 0:
+                continue
+
+            # 合并连续的变化, 直到一段时间内没有新的变化
+            debounce = max(self.__debounce, self.__interval) \
+                if isinstance(backend, MomanPollingBackend) else self.__debounce
+            while not self.__stopped.is_set():
+                more = backend.wait(debounce)
+                if len(more) == 0:
+                    break
+                changed |= more
+
+            if self.__stopped.is_set():
+                return
+
+            try:
+                self.__callback(sorted(changed))
+            except BaseException as e:
+                # 回调失败不影响后续的监听
+                utils.MomanLogger.error("file watcher callback failed: %s" % e)
+
+
+def wait_for_interrupt(message: str):
+    """阻塞当前线程直到收到 Ctrl-C 或者 SIGTERM, 只能在主线程中调用"""
+    # SIGTERM 与 Ctrl-C 一样正常退出
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    utils.MomanLogger.info(message)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
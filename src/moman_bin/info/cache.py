@@ -0,0 +1,152 @@
+# modular 分析过程中使用的文件指纹缓存
+# 只有文件内容真正发生变化时, 才会重新解析 / 校验对应的文件
+
+from typing import Dict, List, Set, Tuple, Any, Callable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import os
+import time
+
+from moman_bin import constants, utils
+
+# 缓存结构发生变化时需要更新版本号, 旧版本的缓存会被直接丢弃
+MOMAN_MODULAR_CACHE_VERSION = 2
+
+# 文件修改时间与记录时间过于接近时, 无法仅通过 mtime 判断文件是否变化
+MOMAN_MODULAR_CACHE_RACY_NS = 2 * 1000 * 1000 * 1000
+
+
+class MomanModularCache:
+    # key 值为 kind:path, value 中记录 mtime, size, hash 以及解析结果
+    __entries: Dict[str, Dict[str, Any]]
+    # 本次运行过程中访问过的缓存, 未访问的缓存在保存时会被清理
+    __visited: Set[str]
+    __dirty: bool
+
+    def __init__(self, entries: Dict[str, Dict[str, Any]] | None = None):
+        self.__entries = entries if entries is not None else {}
+        self.__visited = set()
+        self.__dirty = False
+
+    def load(self, file_path: Path, kind: str, loader: Callable[[Path], Any]) -> Any:
+        """读取文件对应的处理结果, 文件未发生变化时直接复用缓存
+
+        Args:
+            file_path (Path): 文件路径
+            kind (str): 处理类型, 同一文件不同处理类型的结果分开缓存
+            loader (Callable[[Path], Any]): 缓存失效时的处理函数, 结果需要能够被 json 序列化
+
+        Returns:
+            Any: 处理结果
+        """
+        return self.load_many([file_path], kind, loader)[0]
+
+    def load_many(
+        self, file_paths: List[Path], kind: str,
+        loader: Callable[[Path], Any], jobs: int = 1
+    ) -> List[Any]:
+        """批量读取文件对应的处理结果, 缓存失效的文件可以交给进程池并行处理
+
+        Args:
+            file_paths (List[Path]): 文件路径列表
+            kind (str): 处理类型
+            loader (Callable[[Path], Any]): 缓存失效时的处理函数, 并行处理时需要能够被 pickle
+            jobs (int): 并行处理的进程数量, 小于等于 1 时串行处理
+
+        Returns:
+            List[Any]: 处理结果, 顺序与 file_paths 一致
+        """
+        values: List[Any] = []
+        misses: List[Tuple[int, str, os.stat_result, str]] = []
+
+        for index, file_path in enumerate(file_paths):
+            key = "%s:%s" % (kind, file_path.absolute())
+            self.__visited.add(key)
+
+            stat = os.stat(file_path)
+            entry = self.__entries.get(key, None)
+
+            # 1. 通过 mtime 和 size 快速判断
+            if entry is not None and entry["size"] == stat.st_size \
+                    and entry["mtime"] == stat.st_mtime_ns \
+                    and entry["checked"] - entry["mtime"] > MOMAN_MODULAR_CACHE_RACY_NS:
+                values.append(entry["value"])
+                continue
+
+            # 2. 通过文件内容判断
+            digest = utils.file_digest(file_path)
+            if entry is not None and entry["hash"] == digest:
+                values.append(entry["value"])
+                self.__save_entry(key, stat, digest, entry["value"])
+                continue
+
+            utils.MomanLogger.debug("cache miss, kind: %s, path: %s" % (kind, file_path))
+            values.append(None)
+            misses.append((index, key, stat, digest))
+
+        if len(misses) == 0:
+            return values
+
+        miss_files = [file_paths[index] for index, _, _, _ in misses]
+        if jobs > 1 and len(miss_files) > 1:
+            jobs = min(jobs, len(miss_files))
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                # map 返回结果的顺序与输入一致, 保证与串行处理的结果相同
+                miss_values = list(executor.map(
+                    loader, miss_files, chunksize=max(1, len(miss_files) // (jobs * 4))
+                ))
+        else:
+            miss_values = [loader(file_path) for file_path in miss_files]
+
+        for (index, key, stat, digest), value in zip(misses, miss_values):
+            values[index] = value
+            self.__save_entry(key, stat, digest, value)
+
+        return values
+
+    def __save_entry(self, key: str, stat: os.stat_result, digest: str, value: Any):
+        self.__entries[key] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": digest,
+            "checked": time.time_ns(),
+            "value": value,
+        }
+        self.__dirty = True
+
+    def load_yaml(self, file_path: Path) -> Dict[str, Any]:
+        return self.load(file_path, "yaml", utils.read_yaml)
+
+    def to_path(self, path: Path):
+        # 清理已经不存在的文件缓存
+        for key in list(self.__entries.keys()):
+            if key not in self.__visited:
+                self.__entries.pop(key)
+                self.__dirty = True
+
+        if not self.__dirty:
+            return
+
+        cache_file = path.joinpath(constants.MOMAN_MODULAR_CACHE_FILE)
+        utils.write_json(cache_file, {
+            "version": MOMAN_MODULAR_CACHE_VERSION,
+            "entries": self.__entries,
+        })
+        self.__dirty = False
+
+    @staticmethod
+    def from_path(path: Path) -> "MomanModularCache":
+        cache_file = path.joinpath(constants.MOMAN_MODULAR_CACHE_FILE)
+        if not cache_file.exists():
+            return MomanModularCache()
+
+        try:
+            data = utils.read_json(cache_file)
+        except ValueError:
+            # 缓存文件损坏时直接忽略
+            return MomanModularCache()
+
+        if not isinstance(data, dict) or data.get("version", None) != MOMAN_MODULAR_CACHE_VERSION:
+            return MomanModularCache()
+
+        return MomanModularCache(data.get("entries", {}))
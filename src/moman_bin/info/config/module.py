@@ -3,6 +3,7 @@ from typing import Dict, List, Any
 from enum import Enum
 from pathlib import Path
 
+from moman_bin import constants
 from moman_bin.errors import MomanConfigError
 from .base import MomanBaseConfig, MomanModuleType
 
@@ -33,6 +34,146 @@ class MomanConfigType(Enum):
     String = "string"
     Number = "number"
     List = "list"
+    Bool = "bool"
+    Dict = "dict"
+    Float = "float"
+
+
+# 字符串形式的布尔值
+MOMAN_CONFIG_TRUE_VALUES = ("true", "yes", "on", "1")
+MOMAN_CONFIG_FALSE_VALUES = ("false", "no", "off", "0")
+
+
+class MomanConfigItem:
+    """module.yaml 中声明的配置项
+
+    支持两种写法: `key: number` 或者 `key: {type: number, default: 8}`
+    """
+
+    __config_type: MomanConfigType
+    # None 表示没有声明默认值, 使用类型的默认值
+    __default: Any | NoneType
+
+    def __init__(self, config_type: MomanConfigType, default: Any | NoneType = None):
+        self.__config_type = config_type
+        self.__default = default
+
+    @staticmethod
+    def from_data(data: str | Dict[str, Any]) -> "MomanConfigItem":
+        """解析配置项的声明
+
+        Raises:
+            ValueError: 类型不支持或者默认值不满足类型要求
+        """
+        raw_type = data
+        default = None
+        if isinstance(data, Dict):
+            raw_type = data.get("type", None)
+            default = data.get("default", None)
+
+        config_type = MomanConfigType._value2member_map_.get(raw_type, None) \
+            if isinstance(raw_type, str) else None
+        if config_type is None:
+            raise ValueError("type %s not support for config" % raw_type)
+
+        item = MomanConfigItem(config_type)
+        if default is not None:
+            # 默认值同样需要满足类型要求
+            item.__default = item.coerce(default)
+        return item
+
+    def to_data(self) -> str | Dict[str, Any]:
+        if self.__default is None:
+            return self.__config_type.value
+        return {"type": self.__config_type.value, "default": self.__default}
+
+    def coerce(self, value: Any) -> Any:
+        """检查配置值的类型, 并转换为声明的类型
+
+        Raises:
+            ValueError: 配置值无法转换为声明的类型
+        """
+        match self.__config_type:
+            case MomanConfigType.String:
+                # yaml 会将 123 这类值解析为数字, 按照原样转换为字符串
+                if isinstance(value, str):
+                    return value
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    return str(value)
+            case MomanConfigType.Number:
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    return value
+                if isinstance(value, str):
+                    for convert in (int, float):
+                        try:
+                            return convert(value.strip())
+                        except ValueError:
+                            pass
+            case MomanConfigType.Float:
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    return float(value)
+                if isinstance(value, str):
+                    try:
+                        return float(value.strip())
+                    except ValueError:
+                        pass
+            case MomanConfigType.Bool:
+                if isinstance(value, bool):
+                    return value
+                if isinstance(value, int) and value in (0, 1):
+                    return bool(value)
+                if isinstance(value, str):
+                    if value.strip().lower() in MOMAN_CONFIG_TRUE_VALUES:
+                        return True
+                    if value.strip().lower() in MOMAN_CONFIG_FALSE_VALUES:
+                        return False
+            case MomanConfigType.List:
+                if isinstance(value, (list, tuple)):
+                    return list(value)
+            case MomanConfigType.Dict:
+                if isinstance(value, Dict) and all(isinstance(key, str) for key in value.keys()):
+                    return value
+
+        raise ValueError(
+            "expect %s, got %s: %r" % (self.__config_type.value, type(value).__name__, value)
+        )
+
+    @property
+    def config_type(self) -> MomanConfigType:
+        return self.__config_type
+
+    @property
+    def default(self) -> Any | NoneType:
+        return self.__default
+
+    @property
+    def default_value(self) -> Any:
+        """声明的默认值, 没有声明时使用类型的默认值"""
+        if self.__default is not None:
+            return self.__default
+
+        match self.__config_type:
+            case MomanConfigType.String:
+                return ""
+            case MomanConfigType.Number:
+                return 0
+            case MomanConfigType.Float:
+                return 0.0
+            case MomanConfigType.Bool:
+                return False
+            case MomanConfigType.List:
+                return []
+            case MomanConfigType.Dict:
+                return {}
+
+
+class MomanModuleScope(Enum):
+    # 整个进程中只存在一个实例
+    Singleton = "singleton"
+    # 每个依赖方持有一个独立的实例
+    PerDependent = "per-dependent"
+    # 每次获取时都会创建新的实例
+    Transient = "transient"
 
 
 # entry 和 implement 的模块配置文件是一致的
@@ -40,22 +181,30 @@ class MomanModuleConfig(MomanBaseConfig):
     __interface: str
     __dependencies: Dict[str, MomanModuleDependency]
     __packages: List[str]
-    __config_map: Dict[str, MomanConfigType]
+    __config_map: Dict[str, MomanConfigItem]
+    __scope: MomanModuleScope
+    # 延迟创建, 第一次使用时才导入、构造并启动
+    __lazy: bool
 
     def __init__(
         self,
         module_type: MomanModuleType,
         name: str,
         interface: str,
-        dependencies: Dict[str, MomanModuleDependency] = {},
-        packages: List[str] = [],
-        config_map: Dict[str, MomanConfigType] = {}
+        dependencies: Dict[str, MomanModuleDependency] | NoneType = None,
+        packages: List[str] | NoneType = None,
+        config_map: Dict[str, MomanConfigItem] | NoneType = None,
+        scope: MomanModuleScope = MomanModuleScope.Singleton,
+        lazy: bool = False,
     ):
         super().__init__(module_type, name)
+        # 默认值每次新建, 同一个进程中创建的多个模块不能共享依赖和 python 库列表
         self.__interface = interface
-        self.__packages = packages
-        self.__dependencies = dependencies
-        self.__config_map = config_map
+        self.__packages = packages if packages is not None else []
+        self.__dependencies = dependencies if dependencies is not None else {}
+        self.__config_map = config_map if config_map is not None else {}
+        self.__scope = scope
+        self.__lazy = lazy
 
     def add_dep(self, dep: MomanModuleDependency):
         self.dependencies[dep.implement] = dep
@@ -110,18 +259,39 @@ class MomanModuleConfig(MomanBaseConfig):
         packages: List[str] = data.get("python-packages", [])
 
         raw_config_map: Dict[str, Any] = data.get("config", {})
-        config_map: Dict[str, MomanConfigType] = {}
-        for key, config_t in raw_config_map.items():
-            if config_t not in MomanConfigType:
+        config_map: Dict[str, MomanConfigItem] = {}
+        for key, config_data in (raw_config_map or {}).items():
+            # yaml 会把 on / yes / 8080 等 key 解析为 bool 或者数字, 保存到 modular.json 之后会变成字符串
+            if not isinstance(key, str):
+                raise MomanConfigError(
+                    "config key %r of module %s must be a string, quote it in %s"
+                    % (key, base_config.name, constants.MOMAN_MODULE_CONFIG_NAME)
+                )
+            try:
+                config_map[key] = MomanConfigItem.from_data(config_data)
+            except ValueError as e:
                 raise MomanConfigError(
-                    "type %s not support for config" % config_t
+                    "config %s of module %s is invalid: %s" % (key, base_config.name, e)
                 )
 
-            config_map[key] = MomanConfigType._value2member_map_[config_t]
+        raw_scope: str = data.get("scope", MomanModuleScope.Singleton.value)
+        scope = MomanModuleScope._value2member_map_.get(raw_scope, None)
+        if scope is None:
+            raise MomanConfigError(
+                "scope %s not support for module %s" % (raw_scope, base_config.name)
+            )
+
+        lazy = data.get("lazy", False)
+        if not isinstance(lazy, bool):
+            raise MomanConfigError(
+                "lazy must be true or false for module %s" % base_config.name
+            )
+        if lazy and MomanModuleType.Entry == base_config.module_type:
+            raise MomanConfigError("entry module %s can not be lazy" % base_config.name)
 
         return MomanModuleConfig(
             base_config.module_type, base_config.name, interface,
-            dependencies, packages, config_map
+            dependencies, packages, config_map, scope, lazy
         )
 
     @property
@@ -137,17 +307,25 @@ class MomanModuleConfig(MomanBaseConfig):
         return self.__packages
 
     @property
-    def config_map(self) -> Dict[str, MomanConfigType]:
+    def config_map(self) -> Dict[str, MomanConfigItem]:
         return self.__config_map
 
+    @property
+    def scope(self) -> MomanModuleScope:
+        return self.__scope
+
+    @property
+    def lazy(self) -> bool:
+        return self.__lazy
+
 
 class MomanModuleEntryConfig(MomanModuleConfig):
     def __init__(
         self,
         name: str,
         interface: str,
-        dependencies: Dict[str, MomanModuleDependency] = {},
-        packages: List[str] = [],
+        dependencies: Dict[str, MomanModuleDependency] | NoneType = None,
+        packages: List[str] | NoneType = None,
     ):
         super().__init__(
             MomanModuleType.Entry, name, interface, dependencies, packages
@@ -159,7 +337,7 @@ class MomanModuleImplementConfig(MomanModuleConfig):
         self,
         name: str,
         interface: str,
-        dependencies: Dict[str, MomanModuleDependency] = {},
-        packages: List[str] = [],
+        dependencies: Dict[str, MomanModuleDependency] | NoneType = None,
+        packages: List[str] | NoneType = None,
     ):
         super().__init__(MomanModuleType.Implement, name, interface, dependencies, packages)
@@ -2,20 +2,27 @@
 
 from typing import List, Dict, Tuple, Any
 from pathlib import Path
+import os
 
 from moman_bin import constants, utils
 
 from .config.module import MomanModuleConfig, MomanModuleDependency
 
+# modular.json 结构发生变化时需要更新版本号, 版本不一致时会退回读取 modular.yaml
+MOMAN_MODULAR_SCHEMA_VERSION = 1
+
 
 class MomanModularInfo:
+    # 常驻进程中缓存的项目模型: modular.json 路径 -> (文件签名, 模块信息), 为 None 时不缓存
+    __memo: Dict[Path, Tuple[Tuple[int, int, int, int], "MomanModularInfo"]] | None = None
+
     __entry_name: str
     __entry_path: Path
 
     __interfaces: List[str]
     # MomanModuleConfig 本身不存储 path, 因此使用 path 作为 key 值
     __modules: Dict[str, Tuple[MomanModuleConfig, Path]]
-    __package_count: Dict[str, int] = {}
+    __package_count: Dict[str, int]
 
     def __init__(self, entry_name: str, entry_path: Path,
                  interfaces: List[str],
@@ -24,6 +31,7 @@ class MomanModularInfo:
         self.__entry_path = entry_path
         self.__interfaces = interfaces
         self.__modules = modules
+        self.__package_count = {}
 
         for module_config, _ in modules.values():
             for package in module_config.packages:
@@ -92,9 +100,11 @@ class MomanModularInfo:
                     for dep in module_config.dependencies.values()
                 },
                 "config": {
-                    key: config_t.value for key, config_t in module_config.config_map.items()
+                    key: item.to_data() for key, item in module_config.config_map.items()
                 },
                 "python-packages": module_config.packages,
+                "scope": module_config.scope.value,
+                "lazy": module_config.lazy,
             }
             for module_config, path in self.__modules.values()
         }
@@ -104,8 +114,21 @@ class MomanModularInfo:
         return result
 
     def to_path(self, path: Path):
+        """保存解析结果, modular.json 用于快速加载, modular.yaml 作为可读的导出文件
+
+        内容未发生变化的文件不会被重写
+        """
+        data = self.to_dict()
+
+        json_path = path.joinpath(constants.MOMAN_MODULAR_JSON_FILE)
+        json_changed = utils.write_file_if_changed(json_path, utils.dump_json({
+            "version": MOMAN_MODULAR_SCHEMA_VERSION, "modular": data
+        }))
+
+        # 两个文件的内容一致, json 没有变化时跳过开销较大的 yaml 序列化
         info_path = path.joinpath(constants.MOMAN_MODULAR_FILE)
-        utils.write_yaml(info_path, self.to_dict())
+        if json_changed or not info_path.exists():
+            utils.write_yaml_if_changed(info_path, data)
 
     @staticmethod
     def from_dict(data: Dict[str, Any]) -> "MomanModularInfo":
@@ -119,8 +142,59 @@ class MomanModularInfo:
             modules[key] = (MomanModuleConfig.from_dict(value), Path(value["path"]))
         return MomanModularInfo(entry_name, entry_path, interfaces, modules)
 
+    @staticmethod
+    def enable_memo(enabled: bool = True):
+        """在常驻进程中缓存 from_path 的结果, modular.json 的签名发生变化之后重新读取
+
+        缓存的对象会被多次返回, 修改之后没有保存的命令需要调用 clear_memo 丢弃缓存
+
+        Args:
+            enabled (bool): 是否启用缓存
+        """
+        MomanModularInfo.__memo = {} if enabled else None
+
+    @staticmethod
+    def clear_memo():
+        if MomanModularInfo.__memo is not None:
+            MomanModularInfo.__memo.clear()
+
     @staticmethod
     def from_path(path: Path) -> "MomanModularInfo":
+        # 启用 modular.db 之后, 以数据库中的内容为准
+        from .store import MomanSqliteModularStore
+
+        store = MomanSqliteModularStore.open(path)
+        if store is not None:
+            try:
+                return store.to_info()
+            finally:
+                store.close()
+
+        json_path = path.joinpath(constants.MOMAN_MODULAR_JSON_FILE)
+        if json_path.exists():
+            # 先获取签名再读取, 读取过程中文件发生变化时下次调用会重新读取
+            memo = MomanModularInfo.__memo
+            memo_key = json_path.absolute()
+            signature = None
+            if memo is not None:
+                stat = os.stat(json_path)
+                signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+                cached = memo.get(memo_key, None)
+                if cached is not None and cached[0] == signature:
+                    return cached[1]
+
+            try:
+                data = utils.read_json(json_path)
+            except ValueError:
+                data = None
+
+            if isinstance(data, dict) and data.get("version", None) == MOMAN_MODULAR_SCHEMA_VERSION:
+                info = MomanModularInfo.from_dict(data["modular"])
+                if memo is not None:
+                    memo[memo_key] = (signature, info)
+                return info
+
+        # 旧版本项目中只存在 modular.yaml
         info_path = path.joinpath(constants.MOMAN_MODULAR_FILE)
         return MomanModularInfo.from_dict(utils.read_yaml(info_path))
 
@@ -0,0 +1,325 @@
+# 项目模块信息的读写入口
+# 默认使用 modular.json / modular.yaml 文件, 存在 modular.db 时直接按行读写 sqlite
+
+from typing import Dict, List, Tuple, Any, override
+from types import NoneType
+from abc import ABCMeta, abstractmethod
+from pathlib import Path
+import json
+import sqlite3
+
+from moman_bin import constants, utils
+
+from .config.module import MomanModuleConfig, MomanModuleDependency
+from .modular import MomanModularInfo
+
+# 数据库结构发生变化时需要更新版本号, 版本不一致时需要重新执行 moman modular --db
+MOMAN_MODULAR_DB_VERSION = 3
+
+MOMAN_MODULAR_DB_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS interfaces (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS modules (
+    name TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    interface TEXT NOT NULL,
+    path TEXT NOT NULL,
+    config TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    lazy INTEGER NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dependencies (
+    implement TEXT NOT NULL,
+    dependency TEXT NOT NULL,
+    path TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (implement, dependency)
+);
+CREATE TABLE IF NOT EXISTS packages (
+    implement TEXT NOT NULL,
+    package TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (implement, package)
+);
+"""
+
+MOMAN_MODULAR_DB_TABLES = ["meta", "interfaces", "modules", "dependencies", "packages"]
+
+
+class MomanModularStore(metaclass=ABCMeta):
+    """命令处理过程中对模块信息的读写操作, 修改在 commit 之后才会生效"""
+
+    @abstractmethod
+    def get_module(self, implement_name: str) -> Tuple[MomanModuleConfig, Path] | NoneType:
+        pass
+
+    @abstractmethod
+    def add_interface(self, interface_name: str):
+        pass
+
+    @abstractmethod
+    def add_implement(self, implement: MomanModuleConfig, path: Path):
+        pass
+
+    @abstractmethod
+    def add_module_deps(self, implement_name: str, deps: List[MomanModuleDependency]):
+        pass
+
+    @abstractmethod
+    def add_packages(self, implement_name: str, packages: List[str]):
+        pass
+
+    @abstractmethod
+    def commit(self):
+        pass
+
+    def close(self):
+        """释放资源, 没有 commit 的修改会被丢弃"""
+        pass
+
+    @staticmethod
+    def open(path: Path) -> "MomanModularStore":
+        """存在 modular.db 时使用数据库, 否则使用 modular 文件
+
+        Args:
+            path (Path): 项目路径
+        """
+        store = MomanSqliteModularStore.open(path)
+        if store is not None:
+            return store
+
+        return MomanFileModularStore(path, MomanModularInfo.from_path(path))
+
+
+class MomanFileModularStore(MomanModularStore):
+    __path: Path
+    __modular: MomanModularInfo
+
+    def __init__(self, path: Path, modular: MomanModularInfo):
+        self.__path = path
+        self.__modular = modular
+
+    @override
+    def get_module(self, implement_name: str) -> Tuple[MomanModuleConfig, Path] | NoneType:
+        return self.__modular.modules.get(implement_name, None)
+
+    @override
+    def add_interface(self, interface_name: str):
+        self.__modular.add_interface(interface_name)
+
+    @override
+    def add_implement(self, implement: MomanModuleConfig, path: Path):
+        self.__modular.add_implement(implement, path)
+
+    @override
+    def add_module_deps(self, implement_name: str, deps: List[MomanModuleDependency]):
+        self.__modular.add_module_deps(implement_name, deps)
+
+    @override
+    def add_packages(self, implement_name: str, packages: List[str]):
+        self.__modular.add_packages(implement_name, packages)
+
+    @override
+    def commit(self):
+        # 文件只能整体重写
+        self.__modular.to_path(self.__path)
+
+    @property
+    def modular(self) -> MomanModularInfo:
+        return self.__modular
+
+
+class MomanSqliteModularStore(MomanModularStore):
+    __connection: sqlite3.Connection
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.__connection = connection
+
+    @override
+    def get_module(self, implement_name: str) -> Tuple[MomanModuleConfig, Path] | NoneType:
+        row = self.__connection.execute(
+            "SELECT name, type, interface, path, config, scope, lazy FROM modules WHERE name = ?",
+            (implement_name,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        dep_rows = self.__connection.execute(
+            "SELECT implement, dependency, path FROM dependencies "
+            "WHERE implement = ? ORDER BY position", (implement_name,)
+        ).fetchall()
+        package_rows = self.__connection.execute(
+            "SELECT implement, package FROM packages "
+            "WHERE implement = ? ORDER BY position", (implement_name,)
+        ).fetchall()
+
+        return MomanSqliteModularStore.__module_from_rows(row, dep_rows, package_rows)
+
+    @override
+    def add_interface(self, interface_name: str):
+        self.__connection.execute(
+            "INSERT OR IGNORE INTO interfaces (name, position) "
+            "VALUES (?, (SELECT COUNT(*) FROM interfaces))", (interface_name,)
+        )
+
+    @override
+    def add_implement(self, implement: MomanModuleConfig, path: Path):
+        self.__insert_module(implement, path.absolute())
+
+    @override
+    def add_module_deps(self, implement_name: str, deps: List[MomanModuleDependency]):
+        # 已经存在的依赖只更新路径并保持原有位置, 与 modular 文件中字典的顺序一致
+        for dep in deps:
+            self.__connection.execute(
+                "INSERT INTO dependencies (implement, dependency, path, position) "
+                "VALUES (?, ?, ?, (SELECT COUNT(*) FROM dependencies WHERE implement = ?)) "
+                "ON CONFLICT (implement, dependency) DO UPDATE SET path = excluded.path",
+                (implement_name, dep.implement, str(dep.path), implement_name)
+            )
+
+    @override
+    def add_packages(self, implement_name: str, packages: List[str]):
+        for package in packages:
+            self.__connection.execute(
+                "INSERT OR IGNORE INTO packages (implement, package, position) "
+                "VALUES (?, ?, (SELECT COUNT(*) FROM packages WHERE implement = ?))",
+                (implement_name, package, implement_name)
+            )
+
+    @override
+    def commit(self):
+        self.__connection.commit()
+
+    def save_info(self, modular: MomanModularInfo):
+        """使用完整的模块信息覆盖数据库内容"""
+        connection = self.__connection
+        # 重新建表, 兼容旧版本的数据库结构, 整个过程在同一个事务中完成
+        connection.executescript("BEGIN;\n" + "".join(
+            "DROP TABLE IF EXISTS %s;\n" % table for table in MOMAN_MODULAR_DB_TABLES
+        ) + MOMAN_MODULAR_DB_SCHEMA)
+
+        connection.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+            ("version", str(MOMAN_MODULAR_DB_VERSION)),
+            ("entry_name", modular.entry_name),
+            ("entry_path", str(modular.entry_path)),
+        ])
+        for interface_name in modular.interfaces:
+            self.add_interface(interface_name)
+        for module_config, module_path in modular.modules.values():
+            self.__insert_module(module_config, module_path)
+
+        connection.commit()
+
+    def to_info(self) -> MomanModularInfo:
+        connection = self.__connection
+        meta: Dict[str, str] = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+
+        interfaces = [
+            row[0] for row in connection.execute("SELECT name FROM interfaces ORDER BY position")
+        ]
+
+        dep_rows: Dict[str, List[Tuple]] = {}
+        for row in connection.execute(
+            "SELECT implement, dependency, path FROM dependencies ORDER BY implement, position"
+        ):
+            dep_rows.setdefault(row[0], []).append(row)
+
+        package_rows: Dict[str, List[Tuple]] = {}
+        for row in connection.execute(
+            "SELECT implement, package FROM packages ORDER BY implement, position"
+        ):
+            package_rows.setdefault(row[0], []).append(row)
+
+        modules: Dict[str, Tuple[MomanModuleConfig, Path]] = {}
+        for row in connection.execute(
+            "SELECT name, type, interface, path, config, scope, lazy FROM modules ORDER BY position"
+        ):
+            modules[row[0]] = MomanSqliteModularStore.__module_from_rows(
+                row, dep_rows.get(row[0], []), package_rows.get(row[0], [])
+            )
+
+        return MomanModularInfo(
+            meta["entry_name"], Path(meta["entry_path"]), interfaces, modules
+        )
+
+    @override
+    def close(self):
+        self.__connection.close()
+
+    def __insert_module(self, module_config: MomanModuleConfig, path: Path):
+        name = module_config.name
+        self.__connection.execute(
+            "INSERT OR REPLACE INTO modules (name, type, interface, path, config, scope, lazy, position) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, "
+            "COALESCE((SELECT position FROM modules WHERE name = ?), (SELECT COUNT(*) FROM modules)))",
+            (
+                name, module_config.module_type.value, module_config.interface, str(path),
+                json.dumps({key: item.to_data() for key, item in module_config.config_map.items()}),
+                module_config.scope.value, int(module_config.lazy), name,
+            )
+        )
+        self.add_module_deps(name, list(module_config.dependencies.values()))
+        self.add_packages(name, module_config.packages)
+
+    @staticmethod
+    def __module_from_rows(
+        row: Tuple, dep_rows: List[Tuple], package_rows: List[Tuple]
+    ) -> Tuple[MomanModuleConfig, Path]:
+        name, module_type, interface, path, config, scope, lazy = row
+
+        # 与 modular 文件中的模块结构保持一致, 复用配置的解析逻辑
+        data: Dict[str, Any] = {
+            "name": name,
+            "type": module_type,
+            "interface": interface,
+            "dependencies": {
+                dependency: {"implement": dependency, "path": dep_path}
+                for _, dependency, dep_path in dep_rows
+            },
+            "config": json.loads(config),
+            "python-packages": [package for _, package in package_rows],
+            "scope": scope,
+            "lazy": bool(lazy),
+        }
+
+        return MomanModuleConfig.from_dict(data), Path(path)
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return path.joinpath(constants.MOMAN_MODULAR_DB_FILE).exists()
+
+    @staticmethod
+    def open(path: Path, create: bool = False) -> "MomanSqliteModularStore | NoneType":
+        """打开项目的 modular.db
+
+        Args:
+            path (Path): 项目路径
+            create (bool): 数据库不存在时是否创建
+
+        Returns:
+            MomanSqliteModularStore | NoneType: 数据库不存在或者版本不一致时返回 None
+        """
+        db_file = path.joinpath(constants.MOMAN_MODULAR_DB_FILE)
+        if not create and not db_file.exists():
+            return None
+
+        connection = sqlite3.connect(db_file)
+        connection.executescript(MOMAN_MODULAR_DB_SCHEMA)
+
+        if not create:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != str(MOMAN_MODULAR_DB_VERSION):
+                utils.MomanLogger.warn(
+                    "modular db version mismatch, run `moman modular --db` to rebuild it"
+                )
+                connection.close()
+                return None
+
+        return MomanSqliteModularStore(connection)
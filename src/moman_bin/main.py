@@ -1,9 +1,20 @@
-from moman_bin.cli import MomanCliExecutor
+import sys
+
+from moman_bin.client import forward_to_daemon
 
 
 def main():
+    # 项目中运行着 daemon 时交给 daemon 执行, 跳过导入模块和解析项目的开销
+    code = forward_to_daemon(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
+
+    from moman_bin.cli import MomanCliExecutor
+
     executor = MomanCliExecutor()
-    executor.exec()
+    # 与 daemon 中执行时一致, 命令失败时返回非零的退出码
+    if not executor.exec():
+        sys.exit(1)
 
 
 if __name__ == "__main__":
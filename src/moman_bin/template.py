@@ -16,7 +16,7 @@ class {interface_class_name}Interface(MomanModuleInterface):
     # 在下面定义你需要的抽象方法
 
     @abstractmethod
-    def your_function(self, param1: str, param2: int) -> str:
+    {async_prefix}def your_function(self, param1: str, param2: int) -> str:
         pass
 """
 
@@ -32,11 +32,11 @@ class {implement_class_name}Implement({interface_class_name}):
         super().__init__({upper_implement_name}_IMPLEMENT_NAME)
 
     @override
-    def on_start(self):
+    {async_prefix}def on_start(self):
         pass
 
     @override
-    def on_stop(self):
+    {async_prefix}def on_stop(self):
         pass
 
     # 在下面实现之前定义的接口
@@ -80,8 +80,17 @@ dependencies: []
 # 依赖的 python 模块内容
 python-packages: []
 
-# 配置信息
+# 配置信息: string / number / float / bool / list / dict
+# 可以直接声明类型 `key: number`, 也可以同时指定默认值 `key: {{type: number, default: 8}}`
+# 代码中通过只读的 self.config.key 读取 (list / dict 冻结为 tuple / 只读 mapping), get_config(key) 返回可以修改的副本
 config: {{}}
+
+# 实例作用域: singleton (全局唯一) / per-dependent (每个依赖方独立) / transient (每次获取都创建)
+scope: "singleton"
+
+# 是否延迟创建: 为 true 时获取到的是代理对象, 第一次使用时才导入、构造并启动模块
+# 在异步代码中第一次使用异步模块时, on_start 以任务的方式执行, 代理对象的异步方法会先等待启动完成
+lazy: false
 """
 
 GITIGNORE_FILE_TEMPLATE = """\
@@ -110,6 +119,8 @@ dependencies: []
 # 依赖 python 模块列表
 python-packages: []
 
-# 配置信息
+# 配置信息: string / number / float / bool / list / dict
+# 可以直接声明类型 `key: number`, 也可以同时指定默认值 `key: {{type: number, default: 8}}`
+# 代码中通过只读的 self.config.key 读取 (list / dict 冻结为 tuple / 只读 mapping), get_config(key) 返回可以修改的副本
 config: {{}}
 """
@@ -1,13 +1,32 @@
-from typing import Dict, Any
+from typing import Dict, List, Any
 from pathlib import Path
 from enum import Enum
+import hashlib
+import json
+import os
+import stat
+import threading
 
 from termcolor import colored
 import yaml
 
+# 文件锁只在 unix 上可用, 其他平台只在进程内互斥
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from moman_bin import constants
+
+# 优先使用 libyaml 实现的解析器, 不可用时退回纯 python 实现
+try:
+    from yaml import CSafeLoader as MomanYamlLoader, CSafeDumper as MomanYamlDumper
+except ImportError:
+    from yaml import SafeLoader as MomanYamlLoader, SafeDumper as MomanYamlDumper
+
 
 def yaml_to_dict(data: str) -> Dict[str, Any]:
-    return yaml.safe_load(data)
+    return yaml.load(data, Loader=MomanYamlLoader)
 
 
 def read_file(file_path: Path) -> str:
@@ -17,19 +36,152 @@ def read_file(file_path: Path) -> str:
 
 def read_yaml(file_path: Path) -> Dict:
     with open(file_path, "r", encoding="utf-8") as f:
-        result = yaml.safe_load(f)
+        result = yaml.load(f, Loader=MomanYamlLoader)
 
         return result
 
 
 def write_file(file_path: Path, data: str):
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(data)
+    """先写入同目录下的临时文件再重命名, 其他进程读到的总是完整的旧文件或者新文件
+
+    已经存在的文件保留原有的权限, 符号链接会写入其指向的文件
+    """
+    file_path = Path(file_path)
+    if file_path.is_symlink():
+        file_path = file_path.resolve()
+
+    # 进程号和线程号保证同时写入同一文件的临时文件互不冲突
+    temp_file = file_path.with_name("%s.tmp%d-%d" % (file_path.name, os.getpid(), threading.get_ident()))
+    try:
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write(data)
+        try:
+            os.chmod(temp_file, stat.S_IMODE(os.stat(file_path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(temp_file, file_path)
+    except BaseException:
+        temp_file.unlink(missing_ok=True)
+        raise
 
 
 def write_yaml(file_path: Path, data: Dict[str, Any]):
-    with open(file_path, "w", encoding="utf-8") as f:
-        yaml.dump(data, f)
+    write_file(file_path, dump_yaml(data))
+
+
+def dump_yaml(data: Dict[str, Any]) -> str:
+    return yaml.dump(data, Dumper=MomanYamlDumper)
+
+
+def write_file_if_changed(file_path: Path, data: str) -> bool:
+    """仅当内容发生变化时才写入文件, 避免无意义地刷新文件修改时间
+
+    Args:
+        file_path (Path): 文件路径
+        data (str): 文件内容
+
+    Returns:
+        bool: 是否发生了写入
+    """
+    try:
+        if read_file(file_path) == data:
+            return False
+    except FileNotFoundError:
+        pass
+
+    write_file(file_path, data)
+    return True
+
+
+def write_yaml_if_changed(file_path: Path, data: Dict[str, Any]) -> bool:
+    return write_file_if_changed(file_path, dump_yaml(data))
+
+
+def read_json(file_path: Path) -> Any:
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(file_path: Path, data: Any):
+    write_file(file_path, json.dumps(data, sort_keys=True))
+
+
+def dump_json(data: Any) -> str:
+    # 使用紧凑格式并对 key 排序, 保证相同数据的输出完全一致
+    return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
+
+def file_digest(file_path: Path) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class MomanProjectLock:
+    """项目的建议锁, 通过 fcntl.flock 锁定 .moman/lock, 保护读取-修改-写入模块信息的过程
+
+    所有写入都通过重命名完成, 只读取的命令不需要加锁; 同一线程中可以重入,
+    同一进程的其他线程以及其他进程会等待锁被释放
+
+    Args:
+        path (Path): 项目路径
+    """
+
+    # 同一进程中的线程互斥, 持有期间不会释放, 因此重入时不需要再次 flock
+    __mutex = threading.RLock()
+    # 锁文件 -> [文件描述符, 重入次数]
+    __held: Dict[Path, List[int]] = {}
+
+    __lock_file: Path
+
+    def __init__(self, path: Path):
+        self.__lock_file = path.joinpath(constants.MOMAN_LOCK_FILE).absolute()
+
+    def __enter__(self) -> "MomanProjectLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *_):
+        self.release()
+
+    def acquire(self):
+        """获取锁, 其他进程持有锁时一直等待"""
+        MomanProjectLock.__mutex.acquire()
+        try:
+            held = MomanProjectLock.__held.get(self.__lock_file, None)
+            if held is not None:
+                held[1] += 1
+                return
+
+            fd = -1
+            if fcntl is not None:
+                self.__lock_file.parent.mkdir(exist_ok=True)
+                fd = os.open(self.__lock_file, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+                try:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        MomanLogger.info("waiting for another moman process, lock: %s" % self.__lock_file)
+                        fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+
+            MomanProjectLock.__held[self.__lock_file] = [fd, 1]
+        except BaseException:
+            MomanProjectLock.__mutex.release()
+            raise
+
+    def release(self):
+        try:
+            held = MomanProjectLock.__held[self.__lock_file]
+            held[1] -= 1
+            if held[1] == 0:
+                del MomanProjectLock.__held[self.__lock_file]
+                # 关闭文件描述符时释放 flock
+                if held[0] >= 0:
+                    os.close(held[0])
+        finally:
+            MomanProjectLock.__mutex.release()
 
 
 class MomanLogType(Enum):